@@ -1,15 +1,35 @@
-import re
-import cv2
+from __future__ import annotations
+
+import logging
 from abc import ABC, abstractmethod
-from typing import Dict, List, AnyStr, Tuple
-from config_log import logger
-from definitions import RESIZED_SHAPES_PNG
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .cache import ResultCache
+from .config_log import logger
+from .connectors import ConnectorDetector
+from .definitions import RESIZED_SHAPES_PNG
+from .image_input import ImageSource, load_image
+from .lazy import cv2, numpy
+from .metrics import NULL_METRICS, Metrics, MetricsRegistry, NullMetrics
+from .preprocess import PreprocessConfig, threshold as preprocess_threshold
+from .read_text import TextReader
+from .result import Result
+from .shape import START_STOP, Shape
+from .spatial import suppress_near_duplicates
 
 
 class AbstractRecognition(ABC):
     """Recognition Class - complete process."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        duplicate_tolerance: float = 5,
+        cache: Optional[ResultCache] = None,
+        preprocess: Optional[PreprocessConfig] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        text_reader: Optional[TextReader] = None,
+        connector_detector: Optional[ConnectorDetector] = None,
+    ):
         """Construct the beginning attributes for recognising shapes.
 
         Parameters
@@ -17,34 +37,91 @@ class AbstractRecognition(ABC):
         :param img : cv2 image with shapes to be read
         :param x : int x-coordinate from center of the shape.
         :param y : int y-coordinate from center of the shape.
+        :param shapes : Shape records by their centre coordinates.
+        :param rectangles, diamonds, inputs : classified Shape records.
+        :param duplicate_tolerance : float distance in pixels under which two centres are the same shape.
+        :param cache : optional ResultCache used by recognise().
+        :param preprocess : PreprocessConfig, the defaults keep the full resolution and a fixed threshold.
+        :param metrics : optional MetricsRegistry, recognise() then attaches Metrics to every Result and adds them.
+        :param text_reader : optional read_text.TextReader, recognise() then sets shape.text of every shape.
+        :param connector_detector : optional ConnectorDetector, recognise() then sets result.connectors.
 
         """
         self.img: cv2 = None
         self.x: int = 0
         self.y: int = 0
-        self.shapes_dictionary: Dict = {}
-        self.rectangles: List = []
-        self.diamonds: List = []
-        self.inputs: List = []
+        self.shapes: Dict[Tuple[int, int], Shape] = {}
+        self.rectangles: List[Shape] = []
+        self.diamonds: List[Shape] = []
+        self.inputs: List[Shape] = []
+        self.duplicate_tolerance: float = duplicate_tolerance
+        self.cache: Optional[ResultCache] = cache
+        self.preprocess: PreprocessConfig = preprocess or PreprocessConfig()
+        self.metrics: Optional[MetricsRegistry] = metrics
+        self.text_reader: Optional[TextReader] = text_reader
+        self.connector_detector: Optional[ConnectorDetector] = connector_detector
+
+    def parameters(self) -> Dict:
+        """Parameters which change the recognition result, a part of the cache key."""
+        return {
+            "duplicate_tolerance": self.duplicate_tolerance,
+            "preprocess": self.preprocess.to_dict(),
+            "text": self.text_reader.parameters() if self.text_reader is not None else None,
+            "connectors": self.connector_detector.parameters() if self.connector_detector is not None else None,
+        }
+
+    def reset(self) -> None:
+        """Forget the image and shapes of a previous run, so the instance can recognise another image."""
+        self.img = None
+        self.x = 0
+        self.y = 0
+        self.shapes = {}
+        self.rectangles = []
+        self.diamonds = []
+        self.inputs = []
+
+    def recognised_shapes(self) -> List[Shape]:
+        """All recognised Shape records: rectangles, diamonds, inputs and Start/Stop blocks."""
+        start_stop = [shape for shape in self.shapes.values() if shape.kind == START_STOP]
+        return self.rectangles + self.diamonds + self.inputs + start_stop
+
+    @property
+    def shapes_dictionary(self) -> Dict:
+        """
+        Legacy output view of self.shapes.
+
+        {"centre x coordinate, centre y coordinate":{"Type of shape": list of points}}
+
+        A recognised Start/Stop block has its ellipse instead of the points: [[cx, cy], [width, height], angle].
+        """
+        dictionary = {}
+        for shape in self.shapes.values():
+            if shape.ellipse is None:
+                points = shape.vertices[:, None, :].tolist()
+            else:
+                cx, cy, width, height, angle = shape.ellipse
+                points = [[cx, cy], [width, height], angle]
+            dictionary[shape.key] = {shape.outline: points}
+        return dictionary
 
     @abstractmethod
-    def read_image(self, path_to_picture_file: AnyStr = RESIZED_SHAPES_PNG) -> cv2:
+    def read_image(self, source: ImageSource = RESIZED_SHAPES_PNG) -> cv2:
         """
-        Read an image from file.
-        Ask a user if none path was given.
+        Read an image into self.img.
 
-        :param path_to_picture_file: Filepath to the picture
+        :param source: Filepath to the picture, encoded picture bytes or a decoded image
         :return: cv2
         """
         pass
 
-    def _convert_to_gray(self) -> cv2:
+    def _convert_to_gray(self, img: numpy.ndarray = None) -> cv2:
         """
-        Convert image into grayscale image and set a threshold.
+        Convert image into grayscale image and set a threshold with the self.preprocess method.
+        :param img: BGR image, self.img by default
         :return: gray picture, threshold
         """
-        gray = cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
-        _, threshold = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+        gray = cv2.cvtColor(self.img if img is None else img, cv2.COLOR_BGR2GRAY)
+        threshold = preprocess_threshold(gray, self.preprocess)
 
         return gray, threshold
 
@@ -56,6 +133,63 @@ class AbstractRecognition(ABC):
         """
         pass
 
+    @abstractmethod
+    def iter_shapes(
+        self,
+        image: ImageSource,
+        chunk_size: int = 64,
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+        regions: Optional[Sequence[Tuple[int, int, int, int]]] = None,
+    ) -> Iterator[Shape]:
+        """
+        Recognise shapes in the image and yield each one as soon as it is classified.
+        Nothing is stored on the instance, so it can be reused for other images.
+
+        :param image: path, encoded bytes or decoded image, see load_image()
+        :param chunk_size: number of shapes classified together
+        :param metrics: Metrics to record stage timings and counters in
+        :param regions: x0, y0, x1, y1 boxes of the image to search, the whole image if None
+        :return: Iterator over recognised Shape records
+        """
+        pass
+
+    def recognise(self, image: ImageSource) -> Result:
+        """
+        Recognise all shapes in the image. Safe to call concurrently on one instance.
+        With self.cache, a result of the same pixels and parameters is returned from the cache.
+        With self.metrics, the Result carries Metrics of this call, also added to the registry.
+        With self.text_reader, text inside the shapes is read from the same decoded image.
+        With self.connector_detector, lines between the shapes are found as result.connectors.
+
+        :param image: path, encoded bytes or decoded image, see load_image()
+        :return: Result with recognised Shape records
+        """
+        metrics = Metrics() if self.metrics is not None else NULL_METRICS
+        start = metrics.clock()
+        image = load_image(image)
+        metrics.add_time("load", start)
+        result = None
+        if self.cache is not None:
+            key = self.cache.key(image, self.parameters())
+            result = self.cache.get(key)
+            if result is not None:
+                metrics.count("cache_hits")
+
+        if result is None:
+            height, width = image.shape[:2]
+            result = Result(list(self.iter_shapes(image, metrics=metrics)), (width, height))
+            if self.text_reader is not None:
+                self.text_reader.read(image, result.shapes, metrics)
+            if self.connector_detector is not None:
+                result.connectors = self.connector_detector.detect(image, result.shapes, self.preprocess, metrics)
+            if self.cache is not None:
+                self.cache.put(key, result)
+        if self.metrics is not None:
+            metrics.add_time("total", start)
+            result.metrics = metrics
+            self.metrics.add(metrics)
+        return result
+
     @staticmethod
     def _find_center_point_of_shape(shape: cv2) -> (int, int):
         """
@@ -65,9 +199,9 @@ class AbstractRecognition(ABC):
         if shape["m00"] != 0.0:  # finding center point of shape
             x = int(shape["m10"] / shape["m00"])
             y = int(shape["m01"] / shape["m00"])
-            logger.debug(f"m00 center value: {shape['m00']}")
-            logger.debug(f"m00 center value: {shape['m10']}")
-            logger.debug(f"m00 center value: {shape['m01']}")
+            logger.debug(
+                "m00, m10, m01 center values: %s, %s, %s", shape["m00"], shape["m10"], shape["m01"]
+            )
             return x, y
         else:
             return None, None
@@ -75,9 +209,9 @@ class AbstractRecognition(ABC):
     @abstractmethod
     def recognise_shape(self, approx: List) -> Dict:
         """
-        Make a decision if a shape is quadrilateral or ellipsoid. Create a proper self.shapes_dictionary.
+        Make a decision if a shape is quadrilateral or ellipsoid. Store a Shape record in self.shapes.
 
-        Structure of the dictionary:
+        Structure of the returned (legacy) self.shapes_dictionary view of the dictionary:
 
         {"centre x coordinate, centre y coordinate":{"Type of shape": array(list of points)}}
 
@@ -86,14 +220,21 @@ class AbstractRecognition(ABC):
             {'Quadrilateral': array([[[477, 384]], [[349, 499]], [[477, 614]],
                 [[605, 499]]])},
         'c.x:332, c.y:215':
-            {'Start/Stop': array([[[144, 210]], [[153, 245]], [[187, 276]],
-                [[313, 310]], [[451, 289]], [[494, 264]], [[168, 169]]],)}}
+            {'Start/Stop': [[332.0, 215.5], [350.2, 141.6], 1.3]}}
 
         :param approx: List of approximated centres
         :return: Dictionaries with quadrilateral and ellipsoid shapes.
         """
         pass
 
+    def classify_shapes(self) -> None:
+        """
+        Classify every shape collected in self.shapes in a single batch.
+        Fill self.rectangles, self.diamonds, self.inputs and remove repetitive records once.
+        """
+        self.recognise_ellipsoid()
+        self.recognise_quadrilateral()
+
     @abstractmethod
     def recognise_quadrilateral(self) -> None:
         """
@@ -113,59 +254,43 @@ class AbstractRecognition(ABC):
 
         x and y can be inaccurate between themselves (around 5 pixels)
 
-        Insert centre coordinates into appropriate lists: rectangles, diamonds, inputs.
+        Insert Shape records into appropriate lists: rectangles, diamonds, inputs.
         """
         pass
 
     @abstractmethod
-    def recognise_ellipsoid(self) -> Dict:
+    def recognise_ellipsoid(self) -> None:
         """Recognise start/end blocks."""
         pass
 
-    def _clear_up_similar_inputs_from_rectangles_and_diamonds(self) -> None:
-        """
-        Delete similar centre records from list self.inputs - to avoid repetitive points.
-        every record which stayed will be recognised correctly as self.input
-            example data structures:
-                    self.rectangles['c.x:338, c.y:251', 'c.x:1647, c.y:160', 'c.x:1025, c.y:251', 'c.x:1975, c.y:359']
-                    self.diamonds: ['c.x:1416, c.y:879', 'c.x:426, c.y:730', 'c.x:1067, c.y:658']
-                    self.inputs: ['c.x:2349, c.y:887', 'c.x:2044, c.y:660', 'c.x:1647, c.y:160', 'c.x:1025, c.y:251',
-                                  'c.x:1975, c.y:359', 'c.x:2350, c.y:887', 'c.x:2044, c.y:659', 'c.x:338, c.y:251']
-        """
-        for element in list(self.inputs):
-            if element in self.rectangles or element in self.diamonds:
-                self.inputs.remove(element)
-        self._clear_up_similar_inputs_from_inputs()
-        logger.info(f"Cleared list of inputs: {self.inputs}")
-        self._clear_up_similar_inputs_from_inputs()
-
-    def _clear_up_similar_inputs_from_inputs(self) -> None:
-        """
-        Delete repetitive inputs from self.inputs.
-        """
-        list_of_repetitive_items = []
-        for element in self.inputs:
-            x_cord = int((re.search("c\.x:([0-9]*)", element).group(1)))
-            logger.debug(f"x_cord: {x_cord}")
-
-            # TODO - TO REFACTOR - check if element in self.inputs[self.inputs.index(element)+1::]
-            if not abs((self.inputs.index(element)) - len(self.inputs)) < 0:
-                for sub_element in range(
-                    self.inputs.index(element) + 1, len(self.inputs)
-                ):
-                    x_sub_cord = int(
-                        (re.search("c\.x:([0-9]*)", self.inputs[sub_element])).group(1)
-                    )
-                    if abs(x_cord - x_sub_cord) < 5:
-                        logger.debug(f"x_sub_cord: {x_sub_cord}")
-                        list_of_repetitive_items.append(
-                            self.inputs[sub_element]
-                        )  # pes. x^2 complexity - to refactor
-
-        logger.critical(list_of_repetitive_items)
-
-        for element in list_of_repetitive_items:
-            self.inputs.remove(element)
+    def _clear_up_similar_shapes(self) -> None:
+        """
+        Delete similar centre records from self.rectangles, self.diamonds and self.inputs - to avoid repetitive points.
+        Nested contours of one block give records with almost the same centre. A record is dropped when
+        a record before it, in order rectangles, diamonds, inputs, has its centre closer than
+        self.duplicate_tolerance pixels on both axes.
+            example centres of the records:
+                    self.rectangles: (338, 251), (1647, 160), (1025, 251), (1975, 359)
+                    self.diamonds: (1416, 879), (426, 730), (1067, 658)
+                    self.inputs: (2349, 887), (2044, 660), (1647, 160), (1025, 251),
+                                 (1975, 359), (2350, 887), (2044, 659), (338, 251)
+            self.inputs after clearing: (2349, 887), (2044, 660)
+        """
+        shapes = self.rectangles + self.diamonds + self.inputs
+        keep = suppress_near_duplicates(
+            numpy.array([shape.centre for shape in shapes]), self.duplicate_tolerance
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Repetitive shapes: %s", [shape for shape, kept in zip(shapes, keep) if not kept])
+
+        rectangles_end = len(self.rectangles)
+        diamonds_end = rectangles_end + len(self.diamonds)
+        self.rectangles = [shape for shape, kept in zip(shapes[:rectangles_end], keep[:rectangles_end]) if kept]
+        self.diamonds = [
+            shape for shape, kept in zip(shapes[rectangles_end:diamonds_end], keep[rectangles_end:diamonds_end]) if kept
+        ]
+        self.inputs = [shape for shape, kept in zip(shapes[diamonds_end:], keep[diamonds_end:]) if kept]
+        logger.debug("Cleared list of inputs: %s", self.inputs)
 
     @staticmethod
     def cut_nested_empty_list(nested_list: List) -> List:
@@ -178,5 +303,5 @@ class AbstractRecognition(ABC):
         improved_list = []
         for element in nested_list:
             improved_list.append(element[0])
-        logger.error(f"improved_list: {improved_list}")
+        logger.debug("improved_list: %s", improved_list)
         return improved_list
@@ -0,0 +1,447 @@
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .cache import ResultCache
+from .columnar import NPY, ColumnarWriter
+from .config_log import configure_logging, logger
+from .connectors import ConnectorDetector
+from .export import VSDX, export_path, export_result
+from .frames import FrameChanges, changed_frames, iter_frames, read_ahead
+from .image_input import IMAGE_EXTENSIONS
+from .jobqueue import JobQueue, LeaseKeeper, worker_name
+from .lazy import LazyModule
+from .metrics import MetricsRegistry
+from .preprocess import PreprocessConfig
+from .read_text import TextReader
+from .recognition import Recognition
+from .shared_frames import FramePool, FrameRef, attach_frame
+
+process = LazyModule("concurrent.futures.process")  # imports multiprocessing
+
+_recognition: Optional[Recognition] = None  # one instance per worker process
+_export: Optional[Tuple[str, str]] = None  # directory and format of the worker's exports
+
+
+def expand_inputs(inputs: Iterable[str], extensions: Tuple[str, ...] = IMAGE_EXTENSIONS) -> List[str]:
+    """
+    Turn files, glob patterns and directories into a list of image paths.
+
+    Directories are searched recursively for files with the extensions. Files and patterns which
+    match nothing are kept, so they are reported as failures instead of silently skipped.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if name.lower().endswith(extensions)
+                )
+        elif glob.has_magic(item):
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            paths.append(item)
+    return paths
+
+
+def _init_worker(
+    loglevel: int,
+    duplicate_tolerance: float,
+    cache_dir: Optional[str],
+    preprocess: Optional[PreprocessConfig],
+    metrics: bool,
+    ocr_lang: Optional[str],
+    connectors: bool,
+    export: Optional[Tuple[str, str]],
+) -> None:
+    global _recognition, _export
+    _export = export
+    configure_logging(loglevel)
+    cache = ResultCache(directory=cache_dir) if cache_dir else None
+    _recognition = Recognition(
+        duplicate_tolerance=duplicate_tolerance,
+        cache=cache,
+        preprocess=preprocess,
+        metrics=MetricsRegistry() if metrics else None,
+        text_reader=TextReader(lang=ocr_lang, workers=2) if ocr_lang else None,
+        connector_detector=ConnectorDetector() if connectors else None,
+    )
+
+
+def recognise_file(path: str) -> Dict:
+    """
+    Recognise shapes in one image with the worker's Recognition instance.
+
+    :return: JSON serialisable record with path, ok, seconds and shapes (or error), with metrics
+        if the worker collects them and the path of the exported diagram if the worker exports.
+    """
+    global _recognition
+    if _recognition is None:
+        _recognition = Recognition()
+    start = time.perf_counter()
+    try:
+        result = _recognition.recognise(path)
+        if _export is not None:
+            export = export_path(path, *_export)
+            os.makedirs(os.path.dirname(export) or ".", exist_ok=True)
+            export_result(result, export, _export[1])
+    except Exception as error:  # one broken image must not stop the batch
+        return {
+            "path": path,
+            "ok": False,
+            "seconds": time.perf_counter() - start,
+            "error": f"{type(error).__name__}: {error}",
+        }
+    record = {
+        "path": path,
+        "ok": True,
+        "seconds": time.perf_counter() - start,
+        **result.to_dict(),
+    }
+    if result.metrics is not None:
+        record["metrics"] = result.metrics.to_dict()
+    if _export is not None:
+        record["export"] = export
+    return record
+
+
+def recognise_frame(ref: FrameRef, index: int) -> Dict:
+    """
+    Recognise a decoded frame from a FramePool slot with the worker's Recognition instance.
+    The frame is read in place, only the compact record goes back to the pool process.
+
+    :param index: number of the frame in its sequence, "frame" of the record.
+    :return: JSON serialisable record with frame, ok, seconds and shapes (or error), with metrics
+        if the worker collects them.
+    """
+    global _recognition
+    if _recognition is None:
+        _recognition = Recognition()
+    start = time.perf_counter()
+    try:
+        result = _recognition.recognise(attach_frame(ref))
+    except Exception as error:  # one broken frame must not stop the others
+        return {
+            "frame": index,
+            "ok": False,
+            "seconds": time.perf_counter() - start,
+            "error": f"{type(error).__name__}: {error}",
+        }
+    record = {
+        "frame": index,
+        "ok": True,
+        "seconds": time.perf_counter() - start,
+        **result.to_dict(),
+    }
+    if result.metrics is not None:
+        record["metrics"] = result.metrics.to_dict()
+    return record
+
+
+def run_batch(
+    paths: List[str],
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    loglevel: Optional[int] = None,
+    duplicate_tolerance: float = 5,
+    cache_dir: Optional[str] = None,
+    preprocess: Optional[PreprocessConfig] = None,
+    metrics: bool = False,
+    ocr_lang: Optional[str] = None,
+    connectors: bool = False,
+    export_dir: Optional[str] = None,
+    export_format: str = VSDX,
+) -> Iterator[Dict]:
+    """
+    Recognise images in a pool of processes and yield a record per image as soon as it is done.
+
+    :param paths: image paths, see expand_inputs().
+    :param workers: number of processes, os.cpu_count() by default.
+    :param ordered: yield records in the order of paths - a slow image holds back the ones after it.
+    :param loglevel: logging level of the workers, the current level by default.
+    :param cache_dir: directory of a ResultCache shared by the workers, no cache if None.
+    :param preprocess: PreprocessConfig of the workers, the defaults if None.
+    :param metrics: add stage timings and counters to every record, see metrics.Metrics.
+    :param ocr_lang: read text inside the shapes with Tesseract in this language, no OCR if None.
+    :param connectors: find lines between the shapes, see connectors.ConnectorDetector.
+    :param export_dir: write a diagram of every image into this directory, see export.export_path().
+    :param export_format: format of the diagrams, one of export.FORMATS.
+    """
+    with _executor(
+        workers, loglevel, duplicate_tolerance, cache_dir, preprocess, metrics, ocr_lang, connectors,
+        (export_dir, export_format) if export_dir else None,
+    ) as executor:
+        if ordered:
+            yield from executor.map(recognise_file, paths)
+        else:
+            futures = [executor.submit(recognise_file, path) for path in paths]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+def run_frames(
+    frames: Iterable,
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    slots: Optional[int] = None,
+    loglevel: Optional[int] = None,
+    duplicate_tolerance: float = 5,
+    cache_dir: Optional[str] = None,
+    preprocess: Optional[PreprocessConfig] = None,
+    metrics: bool = False,
+    ocr_lang: Optional[str] = None,
+    connectors: bool = False,
+) -> Iterator[Dict]:
+    """
+    Recognise decoded frames - e.g. from a video or a camera - in a pool of processes, handing them
+    over in shared memory (see shared_frames.FramePool) instead of pickling them. Yield a record per
+    frame as soon as it is done, see recognise_frame().
+
+    At most slots frames are in flight: the next frame is taken from frames only when a slot is free,
+    so a fast source does not fill the memory.
+
+    :param frames: BGR or grayscale numpy.ndarray frames.
+    :param slots: shared buffers, twice the number of workers by default.
+    Other parameters as in run_batch().
+    """
+    workers = workers or os.cpu_count() or 1
+    slots = slots or 2 * workers
+    pending = {}  # future: frame reference
+    order = deque()  # futures in the order of frames
+    with FramePool(slots) as pool, _executor(
+        workers, loglevel, duplicate_tolerance, cache_dir, preprocess, metrics, ocr_lang, connectors, None
+    ) as executor:
+
+        def finish(future) -> Dict:
+            pool.release(pending.pop(future))
+            return future.result()
+
+        def drain(until: int) -> Iterator[Dict]:
+            while len(pending) > until:
+                if ordered:
+                    yield finish(order.popleft())
+                else:
+                    for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                        yield finish(future)
+
+        for index, frame in enumerate(frames):
+            yield from drain(slots - 1)
+            ref = pool.put(frame)
+            future = executor.submit(recognise_frame, ref, index)
+            pending[future] = ref
+            if ordered:
+                order.append(future)
+        yield from drain(0)
+
+
+def run_sequences(
+    paths: List[str],
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    slots: Optional[int] = None,
+    min_change: float = 0.001,
+    step: int = 1,
+    loglevel: Optional[int] = None,
+    duplicate_tolerance: float = 5,
+    cache_dir: Optional[str] = None,
+    preprocess: Optional[PreprocessConfig] = None,
+    metrics: bool = False,
+    ocr_lang: Optional[str] = None,
+    connectors: bool = False,
+) -> Iterator[Dict]:
+    """
+    Recognise pages of multi-page images and frames of videos which changed since the last recognised
+    one of the same file, see frames.FrameChanges. Yield a record per recognised frame, with the path
+    and the number of the frame in its file - a file which cannot be read gives one failed record.
+
+    Files are decoded and compared in a background thread, read ahead until all slots of
+    run_frames() are taken, and recognised in its process pool.
+
+    :param paths: paths of the files, see expand_inputs().
+    :param min_change: fraction of a frame thumbnail which has to change, see frames.FrameChanges.
+    :param step: look at every step-th page or frame only.
+    Other parameters as in run_frames().
+    """
+    sources = []  # path and number in the file of every frame handed to run_frames()
+    failures = deque()
+
+    def frames() -> Iterator:
+        for path in paths:
+            try:
+                for index, frame in changed_frames(iter_frames(path, step), FrameChanges(min_change)):
+                    sources.append((path, index))
+                    yield frame
+            except Exception as error:  # one broken file must not stop the others
+                failures.append(
+                    {"path": path, "ok": False, "seconds": 0.0, "error": f"{type(error).__name__}: {error}"}
+                )
+
+    workers = workers or os.cpu_count() or 1
+    slots = slots or 2 * workers
+    records = run_frames(
+        read_ahead(frames(), slots), workers, ordered, slots, loglevel, duplicate_tolerance, cache_dir, preprocess,
+        metrics, ocr_lang, connectors,
+    )
+    for record in records:
+        while failures:
+            yield failures.popleft()
+        path, record["frame"] = sources[record["frame"]]
+        yield {"path": path, **record}
+    yield from failures
+
+
+def recognise_queued(
+    queue_path: str, lease_seconds: float, max_attempts: int, claim_size: int = 4, wait: Optional[float] = None
+) -> Dict:
+    """
+    Recognise images from a JobQueue with the worker's Recognition instance until the queue is empty.
+
+    Jobs are claimed claim_size at a time and their leases renewed while the worker holds them, see
+    jobqueue.LeaseKeeper; a recognised image is completed with its record, see recognise_file(), a
+    failed one goes back to the queue until it has no attempts left.
+
+    :param wait: keep polling for new jobs every wait seconds instead of returning when none is left.
+    :return: summary of the worker: its name and the numbers of done and failed images
+    """
+    worker = worker_name()
+    summary = {"worker": worker, "done": 0, "failed": 0}
+    with JobQueue(queue_path, lease_seconds, max_attempts) as queue:
+        with LeaseKeeper(queue_path, worker, lease_seconds) as leases:
+            while True:
+                jobs = queue.claim(worker, claim_size)
+                if not jobs:
+                    if wait is None:
+                        return summary
+                    time.sleep(wait)
+                    continue
+                leases.hold(jobs)
+                for job in jobs:
+                    record = recognise_file(job.path)
+                    if record["ok"]:
+                        summary["done"] += queue.complete(job, worker, record, record["seconds"])
+                    else:
+                        summary["failed"] += queue.fail(job, worker, record["error"], record["seconds"])
+                        logger.error("%s: %s", job.path, record["error"])
+                    leases.release(job)
+
+
+def run_queue(
+    queue_path: str,
+    workers: Optional[int] = None,
+    lease_seconds: float = 600,
+    max_attempts: int = 3,
+    wait: Optional[float] = None,
+    loglevel: Optional[int] = None,
+    duplicate_tolerance: float = 5,
+    cache_dir: Optional[str] = None,
+    preprocess: Optional[PreprocessConfig] = None,
+    metrics: bool = False,
+    ocr_lang: Optional[str] = None,
+    connectors: bool = False,
+    export_dir: Optional[str] = None,
+    export_format: str = VSDX,
+) -> Iterator[Dict]:
+    """
+    Recognise images from a jobqueue.JobQueue in a pool of processes until it is empty, see
+    recognise_queued(). Yield the summary of every worker process when it stops.
+
+    Results are kept in the queue, see JobQueue.records(). Any number of nodes can run workers on one
+    queue file; a worker which dies leaves its jobs to be claimed again when their lease expires, so
+    a run can be restarted at any time - done images are never recognised again.
+
+    :param queue_path: SQLite file of the queue.
+    :param lease_seconds: time a worker has for an image before others may take it.
+    :param max_attempts: claims of an image before it is failed for good.
+    Other parameters as in run_batch().
+    """
+    workers = workers or os.cpu_count() or 1
+    with _executor(
+        workers, loglevel, duplicate_tolerance, cache_dir, preprocess, metrics, ocr_lang, connectors,
+        (export_dir, export_format) if export_dir else None,
+    ) as executor:
+        futures = [
+            executor.submit(recognise_queued, queue_path, lease_seconds, max_attempts, wait=wait)
+            for _ in range(workers)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _executor(
+    workers: Optional[int],
+    loglevel: Optional[int],
+    duplicate_tolerance: float,
+    cache_dir: Optional[str],
+    preprocess: Optional[PreprocessConfig],
+    metrics: bool,
+    ocr_lang: Optional[str],
+    connectors: bool,
+    export: Optional[Tuple[str, str]],
+) -> "process.ProcessPoolExecutor":
+    """Process pool whose workers have a Recognition set up by _init_worker()."""
+    return process.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            loglevel or logger.getEffectiveLevel(), duplicate_tolerance, cache_dir, preprocess, metrics, ocr_lang,
+            connectors, export,
+        ),
+    )
+
+
+def _tally(records: Iterable[Dict], summary: Dict, metrics: Optional[MetricsRegistry]) -> Iterator[Dict]:
+    """Pass records through, counting them into the summary and logging failures."""
+    for record in records:
+        summary["images"] += 1
+        summary["failed"] += not record["ok"]
+        if metrics is not None and "metrics" in record:
+            metrics.add(record["metrics"])
+        if not record["ok"]:
+            logger.error("%s: %s", record["path"], record["error"])
+        yield record
+
+
+def write_json_lines(
+    records: Iterable[Dict], output: TextIO = sys.stdout, metrics: Optional[MetricsRegistry] = None
+) -> Dict:
+    """
+    Write records as JSON Lines, flushing every line. Return a summary of the batch.
+
+    :param metrics: registry to add metrics of the records to.
+    """
+    summary = {"images": 0, "failed": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    for record in _tally(records, summary, metrics):
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def write_columnar(
+    records: Iterable[Dict],
+    directory: str,
+    output_format: str = NPY,
+    shard_images: int = 100000,
+    metrics: Optional[MetricsRegistry] = None,
+) -> Dict:
+    """
+    Append records to columnar shards in the directory, see columnar.ColumnarWriter. Return a
+    summary of the batch.
+
+    :param metrics: registry to add metrics of the records to.
+    """
+    summary = {"images": 0, "failed": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    with ColumnarWriter(directory, output_format, shard_images) as writer:
+        for record in _tally(records, summary, metrics):
+            writer.append(record)
+    summary["seconds"] = time.perf_counter() - start
+    return summary
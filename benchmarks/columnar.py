@@ -0,0 +1,113 @@
+"""
+Loading recognition output of many images for analytics: JSON Lines against columnar shards.
+
+A few synthetic flowcharts are recognised and their records repeated for every image, then written
+as JSON Lines and with columnar.ColumnarWriter. The query counts the Diamond blocks whose centre lies
+in the top left quarter of the image: JSON Lines are parsed line by line, the .npy shards are memory
+mapped and filtered column by column, Parquet (if pyarrow is installed) is read column by column.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.columnar --images 100000 --blocks 30
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from ..columnar import NPY, PARQUET, ColumnarWriter, parquet_available, read_shards
+from ..config_log import logger
+from ..recognition import Recognition
+from ..shape import DIAMOND
+from .synthetic import RESOLUTIONS, render_flowchart
+
+WIDTH, HEIGHT = RESOLUTIONS["1080p"]
+REGION = (0, 0, WIDTH // 2, HEIGHT // 2)
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def query_json_lines(path: str) -> int:
+    x, y, width, height = REGION
+    count = 0
+    with open(path) as lines:
+        for line in lines:
+            for shape in json.loads(line)["shapes"]:
+                cx, cy = shape["centre"]
+                count += shape["kind"] == DIAMOND and x <= cx < x + width and y <= cy < y + height
+    return count
+
+
+def query_npy(directory: str) -> int:
+    return sum(len(shard.rows(kinds=[DIAMOND], region=REGION)) for shard in read_shards(directory))
+
+
+def query_parquet(directory: str) -> int:
+    import pyarrow.compute
+    import pyarrow.dataset
+
+    x, y, width, height = REGION
+    shapes = pyarrow.dataset.dataset(
+        [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+         if name.endswith(".parquet") and not name.endswith(".images.parquet")],
+    )
+    field = pyarrow.compute.field
+    return shapes.count_rows(
+        filter=(field("kind") == DIAMOND) & (field("x") >= x) & (field("x") < x + width)
+        & (field("y") >= y) & (field("y") < y + height)
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=100000)
+    parser.add_argument("--blocks", type=int, default=30, help="Blocks per flowchart (default: 30).")
+    parser.add_argument("--charts", type=int, default=8, help="Different flowcharts recognised (default: 8).")
+    parser.add_argument("--shard-images", type=int, default=100000)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    recognition = Recognition()
+    images = (render_flowchart(args.blocks, seed=seed, size=(WIDTH, HEIGHT))[0] for seed in range(args.charts))
+    charts = [{"ok": True, **recognition.recognise(image).to_dict()} for image in images]
+    records = [{"path": f"archive/{image:08d}.png", **charts[image % len(charts)]} for image in range(args.images)]
+    shapes = sum(len(record["shapes"]) for record in records)
+    print(f"{args.images} images, {shapes} shapes\n")
+
+    formats = [NPY] + [PARQUET] * parquet_available()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.jsonl")
+        start = time.perf_counter()
+        with open(path, "w") as output:
+            for record in records:
+                output.write(json.dumps(record) + "\n")
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        count = query_json_lines(path)
+        results.append(("JSON Lines", write_seconds, time.perf_counter() - start, os.path.getsize(path), count))
+
+        for output_format in formats:
+            shards = os.path.join(directory, output_format)
+            start = time.perf_counter()
+            with ColumnarWriter(shards, output_format, args.shard_images) as writer:
+                for record in records:
+                    writer.append(record)
+            write_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            count = query_npy(shards) if output_format == NPY else query_parquet(shards)
+            results.append((output_format, write_seconds, time.perf_counter() - start, directory_size(shards), count))
+
+    print(f"{'output':<12}{'write [s]':>10}{'query [s]':>11}{'speed-up':>10}{'size [MB]':>11}{'diamonds':>10}")
+    for name, write_seconds, query_seconds, size, count in results:
+        print(
+            f"{name:<12}{write_seconds:>10.2f}{query_seconds:>11.3f}{results[0][2] / query_seconds:>9.0f}x"
+            f"{size / 2 ** 20:>11.1f}{count:>10}"
+        )
+    return 0 if len({count for *_, count in results}) == 1 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Time of finding connectors on synthetic flowcharts with arrows, checked against the drawn edges.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.connectors 100@1080p 1000@4K 10000@8K
+"""
+import argparse
+import sys
+import time
+
+from ..config_log import logger
+from ..connectors import ConnectorDetector
+from ..recognition import Recognition
+from ..spatial import GridIndex
+from .suite import parse_case
+from .synthetic import render_flowchart
+
+CASES = ("100@1080p", "1000@4K", "10000@8K")
+
+
+def matched_edges(result, edges, tolerance: float = 8) -> int:
+    """Number of drawn edges (tail centre, head centre) found as directed connectors."""
+    centres = {shape.id: shape.centre for shape in result.shapes}
+    found = GridIndex(tolerance)
+    for connector in result.connectors:
+        if connector.directed:
+            found.insert(*centres[connector.source], centres[connector.target])
+    return sum(
+        any(abs(x - head[0]) < tolerance and abs(y - head[1]) < tolerance for x, y in found.query(*tail, tolerance))
+        for tail, head in edges
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="*", default=list(CASES), help=f"Cases to run (default: {' '.join(CASES)}).")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    detector = ConnectorDetector()
+    print(f"{'case':<14}{'shapes':>8}{'edges':>8}{'found':>8}{'matched':>9}{'time':>12}")
+    for case in args.cases:
+        n_shapes, size, _ = parse_case(case)
+        image, expected = render_flowchart(n_shapes, size=size, connectors=True)
+        result = Recognition().recognise(image)
+        seconds = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result.connectors = detector.detect(image, result.shapes)
+            seconds = min(seconds, time.perf_counter() - start)
+        print(
+            f"{case:<14}{len(result.shapes):>8}{len(expected['edges']):>8}{len(result.connectors):>8}"
+            f"{matched_edges(result, expected['edges']):>9}{seconds * 1000:>10.1f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Microbenchmark of the Start/Stop classifier: cv2.fitEllipse() for every candidate against classify_ellipsoids().
+
+Candidates are ellipses, stadiums and noisy blobs of 12 to 36 points; both ways are also checked
+against the kind every candidate was drawn as.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.ellipsoid_classifier --sizes 100 1000 10000 100000
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import cv2
+import numpy
+
+from ..classify import ELLIPSOID_TOLERANCE, _fit_residual, classify_ellipsoids
+
+
+def _stadium(cx: float, cy: float, length: float, width: float, angle: float, points: int) -> numpy.ndarray:
+    """Points along a stadium: two half circles joined by straight sides, which need no points."""
+    radius = width / 2
+    half = numpy.linspace(-numpy.pi / 2, numpy.pi / 2, points // 2)
+    ends = numpy.concatenate(
+        [
+            numpy.stack([length / 2 - radius + radius * numpy.cos(half), radius * numpy.sin(half)], axis=1),
+            numpy.stack([radius - length / 2 - radius * numpy.cos(half), -radius * numpy.sin(half)], axis=1),
+        ]
+    )
+    cos, sin = numpy.cos(numpy.radians(angle)), numpy.sin(numpy.radians(angle))
+    return ends @ numpy.array([[cos, sin], [-sin, cos]]) + (cx, cy)
+
+
+def _random_candidates(size: int, seed: int = 0) -> Tuple[List[numpy.ndarray], numpy.ndarray]:
+    """Outlines with a pixel of noise and whether each one is a Start/Stop block."""
+    rng = numpy.random.default_rng(seed)
+    outlines, expected = [], []
+    for kind in rng.integers(0, 3, size).tolist():
+        cx, cy = rng.uniform(200, 5000, 2)
+        length, width = sorted(rng.uniform(60, 400, 2), reverse=True)
+        angle, points = rng.uniform(0, 180), int(rng.integers(12, 37))
+        if kind == 0:
+            t = numpy.linspace(0, 2 * numpy.pi, points, endpoint=False)
+            outline = numpy.stack([length / 2 * numpy.cos(t), width / 2 * numpy.sin(t)], axis=1)
+            cos, sin = numpy.cos(numpy.radians(angle)), numpy.sin(numpy.radians(angle))
+            outline = outline @ numpy.array([[cos, sin], [-sin, cos]]) + (cx, cy)
+        elif kind == 1:
+            outline = _stadium(cx, cy, length, width, angle, points)
+        else:
+            t = numpy.sort(rng.uniform(0, 2 * numpy.pi, points))
+            radius = width / 2 * rng.uniform(0.5, 1.5, points)
+            outline = numpy.stack([cx + radius * numpy.cos(t), cy + radius * numpy.sin(t)], axis=1)
+        outlines.append(numpy.round(outline + rng.integers(-1, 2, outline.shape)).astype(numpy.int32))
+        expected.append(kind < 2)
+    return outlines, numpy.array(expected)
+
+
+def _per_shape(outlines: List[numpy.ndarray]) -> numpy.ndarray:
+    """Fit an ellipse to every candidate and accept it when all points lie close to the fit."""
+    accepted = []
+    for outline in outlines:
+        points = outline.astype(numpy.float32)
+        accepted.append(_fit_residual(points, cv2.fitEllipse(points)) <= 2 * ELLIPSOID_TOLERANCE)
+    return numpy.array(accepted)
+
+
+def _batch(outlines: List[numpy.ndarray]) -> numpy.ndarray:
+    return classify_ellipsoids(outlines)[0]
+
+
+def _best_of(run, outlines: List[numpy.ndarray], repeat: int) -> Tuple[float, numpy.ndarray]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        labels = run(outlines)
+        best = min(best, time.perf_counter() - start)
+    return best, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'candidates':>10}{'per shape [ms]':>16}{'batch [ms]':>12}{'speed-up':>10}{'per shape ok':>14}{'batch ok':>10}"
+    )
+    for size in args.sizes:
+        outlines, expected = _random_candidates(size)
+        old, old_labels = _best_of(_per_shape, outlines, args.repeat)
+        new, new_labels = _best_of(_batch, outlines, args.repeat)
+        print(
+            f"{size:>10}{old * 1e3:>16.2f}{new * 1e3:>12.2f}{old / new:>9.1f}x"
+            f"{(old_labels == expected).mean():>14.1%}{(new_labels == expected).mean():>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
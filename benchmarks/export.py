@@ -0,0 +1,69 @@
+"""
+Time and peak memory of exporting diagrams with thousands of blocks to .vsdx, draw.io and JSON.
+
+The diagrams are generated as Result objects, a grid of blocks joined into one path, so the cost of
+recognition does not count. Peak memory is measured with tracemalloc, on top of the Result.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.export --shapes 1000 10000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy
+
+from ..connectors import Connector
+from ..export import FORMATS, EXTENSIONS, export_result
+from ..result import Result
+from ..shape import DIAMOND, INPUT, RECTANGLE, START_STOP, Shape
+
+KINDS = (RECTANGLE, DIAMOND, INPUT, START_STOP)
+
+
+def grid_result(n_shapes: int, cell: int = 120) -> Result:
+    """A Result with n_shapes blocks on a square grid, block i connected to block i + 1."""
+    columns = max(1, int(numpy.ceil(numpy.sqrt(n_shapes))))
+    shapes = []
+    for index in range(n_shapes):
+        row, column = divmod(index, columns)
+        x, y = column * cell + cell // 2, row * cell + cell // 2
+        vertices = numpy.array([[x - 40, y - 25], [x - 40, y + 25], [x + 40, y + 25], [x + 40, y - 25]], numpy.int32)
+        shapes.append(Shape(x, y, KINDS[index % len(KINDS)], vertices, (x - 40, y - 25, 81, 51), 4000.0, index,
+                            f"block {index}"))
+    connectors = [
+        Connector(index, index + 1, shapes[index].centre, shapes[index + 1].centre, id=index)
+        for index in range(n_shapes - 1)
+    ]
+    size = (columns * cell, (n_shapes // columns + 1) * cell)
+    return Result(shapes, size, connectors=connectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'shapes':>8}  {'format':<8}{'time':>10}{'peak memory':>14}{'size':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_shapes in args.shapes:
+            result = grid_result(n_shapes)
+            for output_format in FORMATS:
+                path = os.path.join(directory, "diagram" + EXTENSIONS[output_format])
+                start = time.perf_counter()
+                export_result(result, path, output_format)
+                seconds = time.perf_counter() - start
+                tracemalloc.start()  # slows the writer down, so it is a separate run
+                export_result(result, path, output_format)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"{n_shapes:>8}  {output_format:<8}{seconds * 1000:>8.0f}ms{peak / 2 ** 20:>12.2f}MB"
+                    f"{os.path.getsize(path) / 2 ** 20:>10.1f}MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cost of recognising a screen recording of a whiteboard session: every frame against the changed frames only.
+
+A synthetic flowchart is drawn a strip at a time over a recording with sensor noise and MJPG
+compression artefacts in every frame; shapes and connectors are recognised. All ways read the video
+with frames.iter_frames(), the last one also looks at only two frames a second. The last result of
+each is checked against the finished chart.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.frames --seconds 60 --fps 10 --resolution 1080p --blocks 40
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy
+
+from ..config_log import logger
+from ..connectors import ConnectorDetector
+from ..frames import iter_frames, recognise_frames
+from ..recognition import Recognition
+from .synthetic import RESOLUTIONS, render_flowchart
+
+
+def write_recording(path: str, blocks: int, seconds: float, fps: int, size, stages: int, seed: int = 0) -> int:
+    """
+    Write a video in which a flowchart with labels and arrows appears strip by strip, from the left,
+    in stages spread evenly over the first 90% of it.
+
+    :return: number of blocks of the finished chart
+    """
+    chart, expected = render_flowchart(blocks, seed=seed, size=size, labels=True, connectors=True)
+    rng = numpy.random.default_rng(seed)
+    noise = [rng.normal(0, 2, chart.shape[:2]).astype(numpy.int16)[..., None] for _ in range(8)]
+    frames = int(seconds * fps)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    shown, frame = -1, None
+    for index in range(frames):
+        stage = min(stages, int(index / (0.9 * frames) * stages) + 1)
+        if stage != shown:
+            frame = numpy.full_like(chart, 255)
+            right = size[0] * stage // stages
+            frame[:, :right] = chart[:, :right]
+            frame = frame.astype(numpy.int16)
+            shown = stage
+        writer.write(numpy.clip(frame + noise[index % len(noise)], 0, 255).astype(numpy.uint8))
+    writer.release()
+    return sum(count for kind, count in expected.items() if kind != "edges")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--resolution", choices=RESOLUTIONS, default="1080p")
+    parser.add_argument("--blocks", type=int, default=40)
+    parser.add_argument("--stages", type=int, default=20, help="Times new blocks appear (default: 20).")
+    args = parser.parse_args()
+    logger.disabled = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "board.avi")
+        blocks = write_recording(
+            path, args.blocks, args.seconds, args.fps, RESOLUTIONS[args.resolution], args.stages
+        )
+        recognition = Recognition(connector_detector=ConnectorDetector())
+
+        start = time.perf_counter()
+        every = [recognition.recognise(frame) for _, frame in iter_frames(path)]
+        every_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        changed = list(recognise_frames(path, recognition))
+        changed_seconds = time.perf_counter() - start
+
+        step = max(1, args.fps // 2)
+        start = time.perf_counter()
+        sampled = list(recognise_frames(path, recognition, step=step))
+        sampled_seconds = time.perf_counter() - start
+
+    print(f"{'':>22}{'recognitions':>14}{'time [s]':>10}{'speed-up':>10}{'last shapes':>13}")
+    rows = (
+        ("every frame", len(every), every_seconds, every[-1]),
+        ("changed only", len(changed), changed_seconds, changed[-1][1]),
+        (f"changed, step {step}", len(sampled), sampled_seconds, sampled[-1][1]),
+    )
+    for name, recognitions, seconds, last in rows:
+        print(f"{name:>22}{recognitions:>14}{seconds:>10.2f}{every_seconds / seconds:>9.1f}x{len(last.shapes):>13}")
+    return 0 if all(len(last.shapes) == blocks for *_, last in rows) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Import time of pic2block modules and start-up time of the pic2block command, against a budget.
+
+Every measurement runs a fresh interpreter with python -X importtime, so nothing is cached in
+memory, and the best of --repeat runs counts. Importing must not load the heavy dependencies
+(HEAVY) - they are loaded at first use, by the recognition of the first image.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.import_time --budget-ms 60
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Tuple
+
+MODULES = ("pic2block.main", "pic2block.result", "pic2block.recognition", "pic2block.service")
+HEAVY = ("cv2", "numpy", "asyncio", "multiprocessing", "pytesseract", "pyarrow")
+
+
+def import_time(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import the module in a fresh interpreter.
+
+    :return: cumulative import time of the module in milliseconds, cumulative times of all imported modules
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    ).stderr
+    imported = {}
+    for line in output.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            imported[name.strip()] = int(cumulative) / 1000
+    return imported[module], imported
+
+
+def command_time() -> float:
+    """Wall time of python -m pic2block --help in milliseconds."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "pic2block", "--help"],
+        capture_output=True, check=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=60, help="Budget of importing pic2block.main.")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<26}{'import':>10}  heavy modules loaded")
+    for module in MODULES:
+        best, imported = min((import_time(module) for _ in range(args.repeat)), key=lambda timing: timing[0])
+        heavy = [name for name in HEAVY if name in imported]
+        failed |= bool(heavy)
+        print(f"{module:<26}{best:>8.1f}ms  {', '.join(heavy) or '-'}")
+        if module == "pic2block.main" and best > args.budget_ms:
+            print(f"pic2block.main takes {best:.1f}ms to import, over the budget of {args.budget_ms:.0f}ms")
+            failed = True
+    print(f"{'pic2block --help':<26}{min(command_time() for _ in range(args.repeat)):>8.1f}ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
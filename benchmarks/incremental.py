@@ -0,0 +1,66 @@
+"""
+Time of recognising an edited diagram again: a full pass against incremental recognition of the change.
+
+One block in the middle of a synthetic flowchart is erased and drawn again as a rectangle, the
+incremental result is checked against the full pass.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.incremental 100@1080p 1000@4K 10000@8K
+"""
+import argparse
+import sys
+import time
+
+import cv2
+
+from ..config_log import logger
+from ..incremental import IncrementalRecognition
+from ..recognition import Recognition
+from .suite import parse_case
+from .synthetic import render_flowchart
+
+CASES = ("100@1080p", "1000@4K", "10000@8K")
+
+
+def best_time(function, repeat: int) -> float:
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="*", default=list(CASES), help=f"Cases to run (default: {' '.join(CASES)}).")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    recognition = Recognition()
+    incremental = IncrementalRecognition(recognition)
+    print(f"{'case':<14}{'shapes':>8}{'full':>12}{'incremental':>14}{'speed-up':>10}{'same':>6}")
+    for case in args.cases:
+        n_shapes, size, _ = parse_case(case)
+        image, _ = render_flowchart(n_shapes, size=size)
+        previous = incremental.recognise(image)
+        edited = image.copy()
+        x, y, w, h = previous.shapes[len(previous.shapes) // 2].bbox
+        edited[y - 8:y + h + 8, x - 8:x + w + 8] = 255
+        cv2.rectangle(edited, (x, y), (x + w, y + h), (0, 0, 0), 3)
+
+        full = best_time(lambda: recognition.recognise(edited), args.repeat)
+        partial = best_time(lambda: incremental.recognise(edited, previous), args.repeat)
+        same = sorted((shape.kind, shape.centre) for shape in recognition.recognise(edited).shapes) == sorted(
+            (shape.kind, shape.centre) for shape in incremental.recognise(edited, previous).shapes
+        )
+        print(
+            f"{case:<14}{len(previous.shapes):>8}{full * 1000:>10.1f}ms{partial * 1000:>12.1f}ms"
+            f"{full / partial:>9.1f}x{'yes' if same else 'NO':>6}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Overhead of the SQLite job queue: enqueueing a backfill and claiming/completing jobs from many processes.
+
+Jobs are completed without recognising anything, so the numbers are the ceiling the queue puts on
+a fleet of workers. Claiming several jobs at once takes the lock less often.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.jobqueue --jobs 100000 --processes 1 4 8 --claim-size 1 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ..jobqueue import JobQueue, worker_name
+
+
+def drain(path: str, claim_size: int) -> int:
+    """Claim and complete jobs until none is left, return their number."""
+    worker = worker_name()
+    done = 0
+    with JobQueue(path) as queue:
+        while True:
+            jobs = queue.claim(worker, claim_size)
+            if not jobs:
+                return done
+            for job in jobs:
+                done += queue.complete(job, worker, {"path": job.path, "ok": True, "shapes": []}, 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=1000000, help="Jobs enqueued (default: 1000000).")
+    parser.add_argument("--drained", type=int, default=5000, help="Jobs drained in every case (default: 5000).")
+    parser.add_argument("--processes", type=int, nargs="*", default=[1, 4, 8])
+    parser.add_argument("--claim-size", type=int, nargs="*", default=[1, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with JobQueue(os.path.join(directory, "backfill.db")) as queue:
+            paths = [f"archive/{index:08d}.png" for index in range(args.jobs)]
+            start = time.perf_counter()
+            queue.enqueue(paths)
+            enqueued = time.perf_counter() - start
+            start = time.perf_counter()
+            queue.enqueue(paths)  # a restart with the same inputs
+            again = time.perf_counter() - start
+        print(f"enqueue {args.jobs} jobs: {enqueued:.2f}s, again on a restart: {again:.2f}s\n")
+
+        print(f"{'processes':>10}{'claim size':>12}{'jobs/s':>10}")
+        for processes in args.processes:
+            for claim_size in args.claim_size:
+                path = os.path.join(directory, f"drain-{processes}-{claim_size}.db")
+                with JobQueue(path) as queue:
+                    queue.enqueue(f"archive/{index:08d}.png" for index in range(args.drained))
+                start = time.perf_counter()
+                with ProcessPoolExecutor(processes) as executor:
+                    done = sum(executor.map(drain, [path] * processes, [claim_size] * processes))
+                seconds = time.perf_counter() - start
+                print(f"{processes:>10}{claim_size:>12}{done / seconds:>10.0f}")
+
+if __name__ == "__main__":
+    main()
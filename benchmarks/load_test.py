@@ -0,0 +1,123 @@
+"""
+Load test of the HTTP recognition service: latency percentiles, throughput and rejected requests.
+
+Without --url a service is started in this process on a free localhost port. Every client keeps
+one connection open and posts the image again as soon as it gets an answer, 429 answers are
+counted and not retried.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.load_test --clients 16 --requests 400
+    python -m pic2block.benchmarks.load_test --url http://127.0.0.1:8080 --image scan.png
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+import cv2
+import numpy
+
+from ..config_log import logger
+from ..service import RecognitionService
+from .synthetic import RESOLUTIONS, render_flowchart
+
+
+def percentile(values: List[float], percent: float) -> float:
+    return float(numpy.percentile(values, percent)) if values else float("nan")
+
+
+async def _client(host: str, port: int, image: bytes, requests: List[int], results: List[Tuple[int, float]]) -> None:
+    """Post the image over one connection while requests are left, append (status, seconds) to results."""
+    reader, writer = await asyncio.open_connection(host, port)
+    head = (
+        f"POST /recognise HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: image/png\r\n"
+        f"Content-Length: {len(image)}\r\n\r\n"
+    ).encode()
+    try:
+        while requests:
+            requests.pop()
+            start = time.perf_counter()
+            writer.write(head + image)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            results.append((status, time.perf_counter() - start))
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, image: bytes, clients: int, requests: int) -> Dict:
+    """Send requests posts of the image from clients concurrent connections."""
+    remaining = list(range(requests))
+    results: List[Tuple[int, float]] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, image, remaining, results) for _ in range(clients)))
+    seconds = time.perf_counter() - start
+
+    ok = [latency for status, latency in results if status == 200]
+    statuses: Dict[int, int] = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "requests": len(results),
+        "seconds": seconds,
+        "throughput": len(ok) / seconds,
+        "statuses": statuses,
+        "p50": percentile(ok, 50),
+        "p95": percentile(ok, 95),
+        "p99": percentile(ok, 99),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Address of a running service (default: start one in this process).")
+    parser.add_argument("--image", help="Image to post (default: a synthetic flowchart).")
+    parser.add_argument("--shapes", type=int, default=50, help="Blocks of the synthetic flowchart.")
+    parser.add_argument("--resolution", default="1080p", choices=RESOLUTIONS)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent connections.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4, help="Worker threads of the in-process service.")
+    parser.add_argument("--queue-size", type=int, default=16, help="Queue limit of the in-process service.")
+    args = parser.parse_args()
+    logger.disabled = True
+
+    if args.image:
+        with open(args.image, "rb") as file:
+            image = file.read()
+    else:
+        drawing, _ = render_flowchart(args.shapes, size=RESOLUTIONS[args.resolution])
+        image = cv2.imencode(".png", drawing)[1].tobytes()
+
+    service = None
+    if args.url:
+        address = urlsplit(args.url)
+        host, port = address.hostname, address.port or 80
+    else:
+        service = RecognitionService(workers=args.workers, queue_size=args.queue_size)
+        host, port = service.start_in_thread()
+    try:
+        result = asyncio.run(run_load(host, port, image, args.clients, args.requests))
+    finally:
+        if service is not None:
+            service.stop_thread()
+
+    print(f"{result['requests']} requests from {args.clients} clients in {result['seconds']:.2f}s")
+    print(f"throughput {result['throughput']:.1f} images/s")
+    print(f"latency    p50 {result['p50'] * 1000:.1f}ms  p95 {result['p95'] * 1000:.1f}ms  p99 {result['p99'] * 1000:.1f}ms")
+    print(f"statuses   {' '.join(f'{status}: {count}' for status, count in sorted(result['statuses'].items()))}")
+    return 0 if 200 in result["statuses"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
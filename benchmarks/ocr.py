@@ -0,0 +1,52 @@
+"""
+Time of reading block text one Tesseract call per block against TextReader's packed sheets.
+
+Needs pytesseract and the tesseract program. Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.ocr --shapes 50
+"""
+import argparse
+import sys
+import time
+
+import pytesseract
+
+from ..config_log import logger
+from ..read_text import TextReader, crop_regions, tesseract_available
+from ..recognition import Recognition
+from .synthetic import RESOLUTIONS, render_flowchart
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", type=int, default=50)
+    parser.add_argument("--resolution", default="1080p", choices=RESOLUTIONS)
+    parser.add_argument("--lang", default="eng")
+    args = parser.parse_args()
+    logger.disabled = True
+    if not tesseract_available():
+        print("the tesseract program was not found", file=sys.stderr)
+        return 1
+
+    image, _ = render_flowchart(args.shapes, size=RESOLUTIONS[args.resolution], labels=True)
+    shapes = Recognition().recognise(image).shapes
+
+    start = time.perf_counter()
+    per_block = [pytesseract.image_to_string(crop, lang=args.lang).strip() for crop in crop_regions(image, shapes)]
+    per_block_seconds = time.perf_counter() - start
+
+    with TextReader(lang=args.lang) as reader:
+        start = time.perf_counter()
+        reader.read(image, shapes)
+        sheet_seconds = time.perf_counter() - start
+        sheets = reader.stats()["sheets"]
+
+    same = sum(" ".join(text.split()) == " ".join(shape.text.split()) for text, shape in zip(per_block, shapes))
+    print(f"{len(shapes)} blocks")
+    print(f"per block  {len(shapes):>5} calls {per_block_seconds * 1000:>10.1f}ms")
+    print(f"sheets     {sheets:>5} calls {sheet_seconds * 1000:>10.1f}ms")
+    print(f"same text in {same} of {len(shapes)} blocks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Latency and peak memory of recognition with different preprocessing settings on a large image.
+
+Peak memory is measured with tracemalloc, which sees NumPy buffers (OpenCV results are NumPy
+arrays) but not OpenCV's internal temporary buffers.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.preprocess --shapes 100 --scale 3
+"""
+import argparse
+import time
+import tracemalloc
+
+from ..config_log import logger
+from ..preprocess import ADAPTIVE, OTSU, PreprocessConfig
+from ..recognition import Recognition
+from .synthetic import KINDS, render_flowchart
+
+CONFIGS = {
+    "baseline": PreprocessConfig(),
+    "otsu": PreprocessConfig(threshold=OTSU),
+    "adaptive": PreprocessConfig(threshold=ADAPTIVE),
+    "max 2000": PreprocessConfig(max_dimension=2000),
+    "tiles 1024": PreprocessConfig(tile_size=1024, tile_overlap=512),
+    "max 2000 + tiles 1024": PreprocessConfig(max_dimension=2000, tile_size=1024, tile_overlap=256),
+    "draw (old default)": PreprocessConfig(draw=True),
+}
+
+
+def _run(image, config: PreprocessConfig):
+    recognition = Recognition(preprocess=config)
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = recognition.recognise(image)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", type=int, default=100)
+    parser.add_argument("--scale", type=float, default=3.0, help="3 with 100 shapes gives ~12MP.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    image, counts = render_flowchart(args.shapes, scale=args.scale)
+    height, width = image.shape[:2]
+    print(f"{width}x{height} ({width * height / 1e6:.1f}MP), expected {counts}")
+    print(f"{'config':<24}{'best [s]':>10}{'peak [MB]':>11}  correct")
+    for name, config in CONFIGS.items():
+        runs = [_run(image.copy(), config) for _ in range(args.repeat)]
+        result = runs[0][0]
+        found = {
+            "rectangles": len(result.rectangles),
+            "diamonds": len(result.diamonds),
+            "inputs": len(result.inputs),
+            "start_stop": len(result.start_stop),
+        }
+        correct = all(found[kind] == counts[kind] for kind in KINDS)
+        seconds = min(run[1] for run in runs)
+        peak = max(run[2] for run in runs) / 2 ** 20
+        print(f"{name:<24}{seconds:>10.3f}{peak:>11.1f}  {'yes' if correct else found}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Microbenchmark of the quadrilateral classifier: per-shape Python checks against classify_quadrilaterals().
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.quadrilateral_classifier --sizes 100 1000 10000 100000
+"""
+import argparse
+import time
+
+import numpy
+
+from ..base import AbstractRecognition
+from ..classify import canonicalise_quadrilaterals, classify_quadrilaterals
+from ..config_log import logger
+
+
+def _random_quadrilaterals(size: int, seed: int = 0) -> numpy.ndarray:
+    """Rectangles, diamonds and parallelograms with a few pixels of noise, in random vertex order."""
+    rng = numpy.random.default_rng(seed)
+    cx, cy = rng.integers(100, 5000, (2, size))
+    w, h = rng.integers(40, 200, (2, size))
+    slant = w // 5
+    zero = numpy.zeros(size, dtype=w.dtype)
+    templates = numpy.array(
+        [
+            [[-w, -h], [-w, h], [w, h], [w, -h]],
+            [[zero, -h], [-w, zero], [zero, h], [w, zero]],
+            [[-w + slant, -h], [-w, h], [w - slant, h], [w, -h]],
+        ]
+    )  # (kind, vertex, axis, shape)
+    kinds = rng.integers(0, 3, size)
+    quadrilaterals = templates[kinds, :, :, numpy.arange(size)] // 2  # (shape, vertex, axis)
+    quadrilaterals += numpy.stack([cx, cy], axis=-1)[:, None, :] + rng.integers(-2, 3, quadrilaterals.shape)
+    return numpy.roll(quadrilaterals, int(rng.integers(0, 4)), axis=1)
+
+
+def _per_shape(quadrilaterals: numpy.ndarray) -> list:
+    """The checks recognise_quadrilateral() used to run for every shape, on the nested vertex lists."""
+    labels = []
+    for nested in quadrilaterals[:, :, None, :].tolist():
+        coordinates = AbstractRecognition.cut_nested_empty_list(nested)
+        logger.info(f"Checking similarities on coordinates: {coordinates}")
+        if (
+            abs(coordinates[0][0] - coordinates[1][0]) < 5
+            and abs(coordinates[1][1] - coordinates[2][1]) < 5
+            and abs(coordinates[2][0] - coordinates[3][0]) < 5
+            and abs(coordinates[0][1] - coordinates[3][1]) < 5
+        ):
+            labels.append("Rectangle")
+        elif abs(coordinates[0][0] - coordinates[2][0]) < 5 and abs(coordinates[1][1] - coordinates[3][1]) < 5:
+            labels.append("Diamond")
+        elif abs(coordinates[0][1] - coordinates[3][1]) < 5 and abs(coordinates[1][1] - coordinates[2][1]) < 5:
+            labels.append("Input")
+        else:
+            labels.append("Quadrilateral")
+    return labels
+
+
+def _batch(quadrilaterals: numpy.ndarray) -> numpy.ndarray:
+    return classify_quadrilaterals(canonicalise_quadrilaterals(quadrilaterals))
+
+
+def _best_of(run, quadrilaterals: numpy.ndarray, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(quadrilaterals)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    print(f"{'quadrilaterals':>14}{'per shape [ms]':>16}{'batch [ms]':>12}{'speed-up':>10}")
+    for size in args.sizes:
+        quadrilaterals = _random_quadrilaterals(size)
+        old = _best_of(_per_shape, quadrilaterals, args.repeat)
+        new = _best_of(_batch, quadrilaterals, args.repeat)
+        print(f"{size:>14}{old * 1e3:>16.2f}{new * 1e3:>12.2f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
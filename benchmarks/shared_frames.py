@@ -0,0 +1,105 @@
+"""
+Handing decoded frames to worker processes: pickled through the pool's pipe against shared memory
+(batch.run_frames with shared_frames.FramePool).
+
+"handoff" workers only read one pixel, so the time is the cost of moving frames between processes;
+"recognise" workers recognise the frames, as run_frames() does.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.shared_frames --resolution 4K 8K --frames 32 --workers 4
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy
+
+from .. import batch
+from ..batch import run_frames
+from ..config_log import logger
+from ..shared_frames import FramePool, FrameRef, attach_frame
+from .synthetic import RESOLUTIONS, render_flowchart
+
+
+def _touch_pickled(frame: numpy.ndarray, index: int) -> int:
+    return int(frame[0, 0, 0])
+
+
+def _touch_shared(ref: FrameRef) -> int:
+    return int(attach_frame(ref)[0, 0, 0])
+
+
+def _recognise_pickled(frame: numpy.ndarray, index: int) -> dict:
+    return {"frame": index, **batch._recognition.recognise(frame).to_dict()}
+
+
+def pickled(frames, workers: int, recognise: bool) -> int:
+    """Submit frames as arguments, at most 2 * workers in flight like run_frames(). Return the shape count."""
+    if recognise:
+        executor = batch._executor(workers, None, 5, None, None, False, None, False, None)
+        task = _recognise_pickled
+    else:
+        executor = ProcessPoolExecutor(workers)
+        task = _touch_pickled
+    results, pending = [], set()
+    with executor:
+        for index, frame in enumerate(frames):
+            if len(pending) == 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                results.extend(future.result() for future in done)
+            pending.add(executor.submit(task, frame, index))
+        results.extend(future.result() for future in pending)
+    return sum(len(result["shapes"]) for result in results) if recognise else 0
+
+
+def shared(frames, workers: int, recognise: bool) -> int:
+    """Hand frames over in a FramePool. Return the shape count."""
+    if recognise:
+        return sum(len(record["shapes"]) for record in run_frames(frames, workers=workers))
+    with FramePool(2 * workers) as pool, ProcessPoolExecutor(workers) as executor:
+        pending = {}
+        for frame in frames:
+            if len(pending) == 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    pool.release(pending.pop(future))
+            ref = pool.put(frame)
+            pending[executor.submit(_touch_shared, ref)] = ref
+        for future in pending:
+            future.result()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolution", nargs="+", default=["4K", "8K"], choices=sorted(RESOLUTIONS))
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--shapes", type=int, default=100, help="Blocks drawn on every frame.")
+    args = parser.parse_args()
+    logger.disabled = True
+
+    print(f"{'resolution':<12}{'frame':>8}  {'mode':<10}{'pickled':>12}{'shared':>12}{'speed-up':>10}")
+    for resolution in args.resolution:
+        samples = [render_flowchart(args.shapes, seed=seed, size=RESOLUTIONS[resolution])[0] for seed in range(4)]
+        frames = [samples[index % len(samples)] for index in range(args.frames)]
+        for mode in ("handoff", "recognise"):
+            seconds = {}
+            counts = {}
+            for name, path in (("pickled", pickled), ("shared", shared)):
+                start = time.perf_counter()
+                counts[name] = path(frames, args.workers, mode == "recognise")
+                seconds[name] = (time.perf_counter() - start) / len(frames)
+            assert counts["pickled"] == counts["shared"], counts
+            print(
+                f"{resolution:<12}{samples[0].nbytes / 2 ** 20:>6.0f}MB  {mode:<10}"
+                f"{seconds['pickled'] * 1000:>10.1f}ms{seconds['shared'] * 1000:>10.1f}ms"
+                f"{seconds['pickled'] / seconds['shared']:>9.1f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Compare per-contour classification (old find_contours) with the single batch pass.
+
+Run with the package installed (pip install -e .):
+    python -m pic2block.benchmarks.single_pass --sizes 100 500 1000 2000 --repeat 3
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+
+from ..config_log import logger
+from ..definitions import SHAPES_DIR
+from ..recognition import Recognition
+from .synthetic import render_flowchart
+
+
+def _per_contour(recognition: Recognition) -> None:
+    """Old find_contours loop: classify the whole dictionary after every contour."""
+    _, threshold = recognition._convert_to_gray()
+    contours, _ = cv2.findContours(threshold, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours[1:]:
+        approx = cv2.approxPolyDP(contour, 0.01 * cv2.arcLength(contour, True), True)
+        cv2.drawContours(recognition.img, [contour], 0, (255, 0, 0), 5)
+        x, y = recognition._find_center_point_of_shape(shape=cv2.moments(contour))
+        if all(v is not None for v in (x, y)):
+            recognition.x, recognition.y = x, y
+        recognition.recognise_shape(approx)
+
+
+def _single_pass(recognition: Recognition) -> None:
+    recognition.find_contours()
+
+
+def _time(run, image, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        recognition = Recognition()
+        recognition.img = image.copy()
+        start = time.perf_counter()
+        run(recognition)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    cases = [(os.path.basename(path), cv2.imread(path)) for path in sorted(glob.glob(os.path.join(SHAPES_DIR, "*.png")))]
+    cases += [(f"synthetic-{size}", render_flowchart(size)[0]) for size in args.sizes]
+
+    print(f"{'image':<24}{'per-contour [s]':>16}{'single pass [s]':>16}{'speed-up':>10}")
+    for name, image in cases:
+        old = _time(_per_contour, image, args.repeat)
+        new = _time(_single_pass, image, args.repeat)
+        print(f"{name:<24}{old:>16.4f}{new:>16.4f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
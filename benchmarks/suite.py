@@ -0,0 +1,180 @@
+"""
+Time every stage of Recognition on synthetic flowcharts and check the counts against ground truth.
+
+A case is N@RESOLUTION, e.g. 1000@4K - N blocks fitted in a 3840x2160 canvas (see
+benchmarks.synthetic.RESOLUTIONS), with a +text suffix every block has a label. Stages are timed by iter_shapes() with metrics.Metrics,
+the shapes are counted from an end-to-end recognise() run.
+
+Results are written as JSON, so runs can be compared over time:
+    python -m pic2block.benchmarks.suite -o before.json
+    python -m pic2block.benchmarks.suite --baseline before.json
+
+The exit status is 1 when a case has more wrong counts than in the baseline (or any wrong count
+with --strict).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy
+
+from ..config_log import logger
+from ..metrics import Metrics
+from ..recognition import Recognition
+from .synthetic import KINDS, RESOLUTIONS, render_flowchart
+
+CASES = ("10@720p", "100@1080p", "1000@4K", "1000@4K+text", "10000@8K")
+STAGES = ("preprocess", "find_contours", "prune", "approx", "classify", "dedup")
+
+
+def parse_case(case: str) -> Tuple[int, Tuple[int, int], bool]:
+    """
+    Turn N@RESOLUTION[+text] (a name from RESOLUTIONS or WIDTHxHEIGHT) into n_shapes, (width, height)
+    and whether blocks have labels.
+    """
+    shapes, _, resolution = case.partition("@")
+    resolution, _, suffix = resolution.partition("+")
+    if resolution in RESOLUTIONS:
+        return int(shapes), RESOLUTIONS[resolution], suffix == "text"
+    width, _, height = resolution.lower().partition("x")
+    return int(shapes), (int(width), int(height)), suffix == "text"
+
+
+def _staged(recognition: Recognition, image: numpy.ndarray) -> Metrics:
+    """Recognise the image with stage timings and counters."""
+    metrics = Metrics()
+    for _ in recognition.iter_shapes(image, metrics=metrics):
+        pass
+    return metrics
+
+
+def run_case(case: str, repeat: int = 3, seed: int = 0) -> Dict:
+    """Render the case, time it repeat times (best time per stage) and count the recognised shapes."""
+    n_shapes, size, labels = parse_case(case)
+    image, expected = render_flowchart(n_shapes, seed=seed, size=size, labels=labels)
+    recognition = Recognition()
+
+    seconds = dict.fromkeys(STAGES + ("total", "recognise"), float("inf"))
+    for _ in range(repeat):
+        metrics = _staged(recognition, image)
+        stages = {stage: metrics.seconds.get(stage, 0.0) for stage in STAGES}
+        stages["total"] = sum(stages.values())
+        start = time.perf_counter()
+        result = recognition.recognise(image)
+        stages["recognise"] = time.perf_counter() - start
+        seconds = {stage: min(seconds[stage], stages[stage]) for stage in seconds}
+
+    found = {
+        "rectangles": len(result.rectangles),
+        "diamonds": len(result.diamonds),
+        "inputs": len(result.inputs),
+        "start_stop": len(result.start_stop),
+    }
+    return {
+        "case": case,
+        "shapes": n_shapes,
+        "width": size[0],
+        "height": size[1],
+        "seconds": seconds,
+        "counts": metrics.counts,
+        "expected": expected,
+        "found": found,
+        "errors": sum(abs(found[kind] - expected[kind]) for kind in KINDS),
+    }
+
+
+def approximated(counts: Dict[str, int]) -> int:
+    """Number of contours which got to the per-contour approxPolyDP() after pruning."""
+    skipped = ("pruned", "nested", "tile_border")
+    return counts.get("contours", 0) - sum(counts.get(name, 0) for name in skipped)
+
+
+def environment() -> Dict:
+    """Versions and machine the results come from."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict], baseline: Dict) -> List[str]:
+    """Print time ratios against the baseline run. Return cases whose counts got worse."""
+    previous = {result["case"]: result for result in baseline["cases"]}
+    worse = []
+    print(f"\ncompared with {baseline['environment'].get('commit')} from {baseline['environment'].get('time')}")
+    for result in results:
+        before = previous.get(result["case"])
+        if before is None:
+            continue
+        ratio = result["seconds"]["total"] / before["seconds"]["total"]
+        errors = f"errors {before['errors']} -> {result['errors']}"
+        print(f"{result['case']:<14}{ratio:>8.2f}x time  {errors}")
+        if result["errors"] > before["errors"]:
+            worse.append(result["case"])
+    return worse
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="*", default=list(CASES), help=f"Cases to run (default: {' '.join(CASES)}).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON file for the results (default: benchmarks/results/suite-TIME.json).")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with.")
+    parser.add_argument("--strict", action="store_true", help="Fail on any wrong count, not only on worse ones.")
+    args = parser.parse_args(argv)
+    logger.disabled = True
+
+    print(
+        f"{'case':<14}" + "".join(f"{stage:>14}" for stage in STAGES + ("total",))
+        + f"{'contours':>10}{'approxed':>10}  counts"
+    )
+    results = []
+    for case in args.cases:
+        result = run_case(case, args.repeat, args.seed)
+        results.append(result)
+        counts = "ok" if not result["errors"] else f"{result['errors']} wrong: {result['found']}"
+        print(
+            f"{case:<14}"
+            + "".join(f"{result['seconds'][stage] * 1000:>12.1f}ms" for stage in STAGES + ("total",))
+            + f"{result['counts'].get('contours', 0):>10}{approximated(result['counts']):>10}  {counts}"
+        )
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", time.strftime("suite-%Y%m%d-%H%M%S.json")
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump({"environment": environment(), "cases": results}, file, indent=2)
+    print(f"\nresults written to {output}")
+
+    failed = [result["case"] for result in results if result["errors"]] if args.strict else []
+    if args.baseline:
+        with open(args.baseline) as file:
+            failed += compare(results, json.load(file))
+    if failed:
+        print(f"wrong counts: {', '.join(sorted(set(failed)))}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
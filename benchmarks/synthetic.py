@@ -0,0 +1,163 @@
+"""Render synthetic flowcharts with a known number of blocks of each kind."""
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy
+
+KINDS = ("rectangles", "diamonds", "inputs", "start_stop")
+
+LABELS = {
+    "rectangles": "x = {}",
+    "diamonds": "x > {}?",
+    "inputs": "read {}",
+    "start_stop": "Start",
+}
+
+CELL_WIDTH = 120
+CELL_HEIGHT = 90
+STROKE = 2
+
+
+def _draw_label(image: numpy.ndarray, text: str, cx: int, cy: int, w: int, h: int) -> None:
+    """Write text centred at cx, cy, sized to fit in the middle of a w x h block."""
+    (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 1)
+    font_scale = min(0.45 * w / text_w, 0.3 * h / text_h)
+    thickness = max(1, round(font_scale * 1.5))
+    (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    origin = (cx - text_w // 2, cy + text_h // 2)
+    cv2.putText(image, text, origin, cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 0), thickness, cv2.LINE_AA)
+
+
+def _draw_block(
+    image: numpy.ndarray, kind: str, cx: int, cy: int, w: int, h: int, stroke: int = STROKE
+) -> None:
+    """Draw one block of the given kind centred at cx, cy."""
+    if kind == "start_stop":
+        cv2.ellipse(image, (cx, cy), (w // 2, h // 2), 0, 0, 360, (0, 0, 0), stroke)
+        return
+    if kind == "rectangles":
+        points = [(cx - w // 2, cy - h // 2), (cx - w // 2, cy + h // 2),
+                  (cx + w // 2, cy + h // 2), (cx + w // 2, cy - h // 2)]
+    elif kind == "diamonds":
+        points = [(cx, cy - h // 2), (cx - w // 2, cy), (cx, cy + h // 2), (cx + w // 2, cy)]
+    else:
+        slant = w // 5
+        points = [(cx - w // 2 + slant, cy - h // 2), (cx - w // 2, cy + h // 2),
+                  (cx + w // 2 - slant, cy + h // 2), (cx + w // 2, cy - h // 2)]
+    cv2.polylines(image, [numpy.array(points, dtype=numpy.int32)], True, (0, 0, 0), stroke)
+
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+    "8K": (7680, 4320),
+}
+
+
+def fit_scale(n_shapes: int, width: int, height: int) -> float:
+    """Biggest scale at which a grid of n_shapes cells fits in width x height with a half cell margin."""
+    scale = math.sqrt(width * height / (n_shapes * CELL_WIDTH * CELL_HEIGHT))
+    while scale > 0.1:
+        cell_w, cell_h = int(CELL_WIDTH * scale), int(CELL_HEIGHT * scale)
+        if (width - cell_w // 2) // cell_w * ((height - cell_h // 2) // cell_h) >= n_shapes:
+            return scale
+        scale *= 0.98
+    raise ValueError(f"{n_shapes} shapes do not fit in {width}x{height}")
+
+
+def render_flowchart(
+    n_shapes: int,
+    seed: int = 0,
+    scale: float = 1.0,
+    size: Optional[Tuple[int, int]] = None,
+    labels: bool = False,
+    connectors: bool = False,
+) -> Tuple[numpy.ndarray, Dict]:
+    """
+    Render n_shapes blocks laid out on a grid over a white BGR canvas.
+
+    :param n_shapes: number of blocks to draw, kinds are picked round-robin in a shuffled order.
+    :param seed: seed for block order and size jitter.
+    :param scale: multiply the cell size and the stroke, e.g. to reach a target resolution.
+    :param size: width, height of the canvas, e.g. RESOLUTIONS["8K"]. The scale is fitted to it.
+    :param labels: write a short text into every block, like in real diagrams.
+    :param connectors: join the blocks by arrows into one path, snaking left to right and back row by row.
+    :return: image, ground truth counts per kind; with connectors also "edges" - [tail block centre,
+        head block centre] of every arrow.
+    """
+    rng = random.Random(seed)
+    if size is None:
+        columns = max(1, math.ceil(math.sqrt(n_shapes * CELL_HEIGHT / CELL_WIDTH)))
+        cell_w, cell_h = int(CELL_WIDTH * scale), int(CELL_HEIGHT * scale)
+        rows = max(1, math.ceil(n_shapes / columns))
+        size = (columns * cell_w + cell_w // 2, rows * cell_h + cell_h // 2)
+    else:
+        scale = fit_scale(n_shapes, *size)
+        cell_w, cell_h = int(CELL_WIDTH * scale), int(CELL_HEIGHT * scale)
+        columns = max(1, math.ceil(math.sqrt(n_shapes * cell_h / cell_w)))
+        columns = min(max(columns, math.ceil(n_shapes / ((size[1] - cell_h // 2) // cell_h))),
+                      (size[0] - cell_w // 2) // cell_w)
+    stroke = max(STROKE, round(STROKE * scale))
+    image = numpy.full((size[1], size[0], 3), 255, numpy.uint8)
+
+    kinds = [KINDS[index % len(KINDS)] for index in range(n_shapes)]
+    rng.shuffle(kinds)
+    counts: Dict = dict.fromkeys(KINDS, 0)
+    blocks = []
+    for index, kind in enumerate(kinds):
+        row, column = divmod(index, columns)
+        if connectors and row % 2:
+            column = columns - 1 - column
+        cx = column * cell_w + cell_w // 2 + cell_w // 4
+        cy = row * cell_h + cell_h // 2 + cell_h // 4
+        w = int(cell_w * rng.uniform(0.55, 0.7))
+        h = int(cell_h * rng.uniform(0.45, 0.6))
+        _draw_block(image, kind, cx, cy, w, h, stroke)
+        if labels:
+            _draw_label(image, LABELS[kind].format(index), cx, cy, w, h)
+        counts[kind] += 1
+        blocks.append((kind, cx, cy, w, h))
+    if connectors:
+        counts["edges"] = [
+            _draw_arrow(image, tail, head, stroke) for tail, head in zip(blocks, blocks[1:])
+        ]
+    return image, counts
+
+
+def _half_width(kind: str, w: int) -> int:
+    """Distance from the centre to the left or right outline along the middle line of a block."""
+    return w // 2 - w // 10 if kind == "inputs" else w // 2
+
+
+def _draw_arrow(image: numpy.ndarray, tail: Tuple, head: Tuple, stroke: int) -> List[List[int]]:
+    """
+    Draw a straight arrow with a filled head between the outlines of two neighbouring blocks.
+
+    :param tail, head: kind, cx, cy, w, h of the blocks, in one row or one column.
+    :return: [tail centre, head centre]
+    """
+    tail_kind, tail_x, tail_y, tail_w, tail_h = tail
+    head_kind, head_x, head_y, head_w, head_h = head
+    if tail_y == head_y:
+        direction = 1 if head_x > tail_x else -1
+        start = (tail_x + direction * _half_width(tail_kind, tail_w), tail_y)
+        end = (head_x - direction * _half_width(head_kind, head_w), head_y)
+    else:
+        direction = 1 if head_y > tail_y else -1
+        start = (tail_x, tail_y + direction * (tail_h // 2))
+        end = (head_x, head_y - direction * (head_h // 2))
+    length = math.hypot(end[0] - start[0], end[1] - start[1])
+    unit_x, unit_y = (end[0] - start[0]) / length, (end[1] - start[1]) / length
+    size = min(5 * stroke, length / 2)
+    base = (end[0] - unit_x * size, end[1] - unit_y * size)
+    cv2.line(image, start, (round(base[0]), round(base[1])), (0, 0, 0), stroke)
+    triangle = [
+        end,
+        (base[0] - unit_y * size / 2, base[1] + unit_x * size / 2),
+        (base[0] + unit_y * size / 2, base[1] - unit_x * size / 2),
+    ]
+    cv2.fillPoly(image, [numpy.round(numpy.array(triangle)).astype(numpy.int32)], (0, 0, 0))
+    return [[tail_x, tail_y], [head_x, head_y]]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .config_log import logger
+from .lazy import numpy
+from .result import Result
+
+
+class ResultCache:
+    """
+    Cache of recognition results keyed by a hash of the decoded pixels and the recognition parameters.
+
+    Two tiers:
+        - memory: LRU of at most max_entries results
+        - disk (optional): directory with one JSON file per result, the least recently used files
+          are deleted when together they take more than max_bytes. The directory can be shared by
+          many processes.
+
+    Results are kept in their to_dict() form, every hit returns a new Result object.
+    """
+
+    def __init__(self, max_entries: int = 256, directory: Optional[str] = None, max_bytes: int = 256 * 2 ** 20):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    @staticmethod
+    def key(image: numpy.ndarray, parameters: Dict) -> str:
+        """Hash of the image pixels, their layout and the recognition parameters."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([image.shape, image.dtype.str, parameters], sort_keys=True).encode())
+        digest.update(numpy.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Result]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return Result.from_dict(data)
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, data)
+        return Result.from_dict(data)
+
+    def put(self, key: str, result: Result) -> None:
+        data = result.to_dict()
+        with self._lock:
+            self._remember(key, data)
+        if self.directory is not None:
+            self._write_disk(key, data)
+
+    def stats(self) -> Dict:
+        """Counters of the cache, e.g. for logs or metrics."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _remember(self, key: str, data: Dict) -> None:
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return data
+
+    def _write_disk(self, key: str, data: Dict) -> None:
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(data, file)
+        size = os.path.getsize(temporary)
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)  # the same result written again, e.g. by another process
+        except OSError:
+            replaced = 0
+        os.replace(temporary, path)  # readers never see half written files
+        with self._lock:
+            self._disk_bytes += size - replaced
+            if self._disk_bytes > self.max_bytes:
+                self._evict_disk()
+
+    def _disk_files(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:  # deleted by another process
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the directory fits in max_bytes."""
+        files = sorted(self._disk_files(), key=lambda file: file[2])
+        self._disk_bytes = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self._disk_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+        logger.debug("Result cache evicted down to %s bytes", self._disk_bytes)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import math
+from typing import Sequence, Tuple
+
+from .lazy import cv2, numpy
+from .shape import DIAMOND, INPUT, QUADRILATERAL, RECTANGLE
+
+VERTEX_TOLERANCE = 5  # pixels
+SLOPE_TOLERANCE = 0.02  # extra tolerance per pixel of length, ~1 degree for hand drawn lines
+ELLIPSOID_TOLERANCE = 0.05  # relative, of the area and perimeter
+
+
+def canonicalise_quadrilaterals(quadrilaterals: numpy.ndarray) -> numpy.ndarray:
+    """
+    Put the vertices of every quadrilateral in one order.
+
+    The vertices go counter-clockwise on the screen (top, left, bottom, right for a diamond) and start
+    at the top-most vertex, the left-most one on ties.
+
+    :param quadrilaterals: (N, 4, 2) array of vertices in any cyclic order.
+    :return: (N, 4, 2) array with reordered vertices.
+    """
+    quadrilaterals = numpy.asarray(quadrilaterals).reshape(-1, 4, 2)
+    x, y = quadrilaterals[..., 0], quadrilaterals[..., 1]
+    signed_area = (x * numpy.roll(y, -1, axis=1) - numpy.roll(x, -1, axis=1) * y).sum(axis=1)
+    quadrilaterals = numpy.where(
+        (signed_area > 0)[:, None, None], quadrilaterals[:, ::-1], quadrilaterals
+    )
+
+    top = quadrilaterals[..., 1] == quadrilaterals[..., 1].min(axis=1, keepdims=True)
+    start = numpy.argmin(numpy.where(top, quadrilaterals[..., 0], numpy.inf), axis=1)
+    order = (start[:, None] + numpy.arange(4)) % 4
+    return numpy.take_along_axis(quadrilaterals, order[..., None], axis=1)
+
+
+def _axis_aligned(vectors: numpy.ndarray, tolerance: float, slope: float) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Masks of (.., 2) vectors which are horizontal and vertical."""
+    dx, dy = numpy.abs(vectors[..., 0]), numpy.abs(vectors[..., 1])
+    return dy < tolerance + slope * dx, dx < tolerance + slope * dy
+
+
+def classify_quadrilaterals(
+    quadrilaterals: numpy.ndarray,
+    tolerance: float = VERTEX_TOLERANCE,
+    slope: float = SLOPE_TOLERANCE,
+) -> numpy.ndarray:
+    """
+    Recognise rectangles, diamonds and inputs among quadrilaterals in one batch.
+
+    Similarity, checked in that order:
+        rectangle (exercise block): every edge is horizontal or vertical, alternately
+        diamond (if block): one diagonal is horizontal and the other one vertical
+        input (parallelogram): diagonals cross in their middles and two opposite edges are horizontal
+
+    Every predicate holds for any cyclic order of vertices, in both directions.
+    Coordinates can be inaccurate by tolerance pixels plus slope pixels per pixel of length.
+
+    :param quadrilaterals: (N, 4, 2) array of vertices.
+    :param tolerance: absolute tolerance in pixels.
+    :param slope: relative tolerance, for lines which are not drawn exactly straight.
+    :return: (N,) array with RECTANGLE, DIAMOND, INPUT or QUADRILATERAL (not recognised) labels.
+    """
+    quadrilaterals = numpy.asarray(quadrilaterals, dtype=numpy.float64).reshape(-1, 4, 2)
+    edges = numpy.roll(quadrilaterals, -1, axis=1) - quadrilaterals
+    horizontal, vertical = _axis_aligned(edges, tolerance, slope)
+    rectangle = (horizontal[:, 0] & vertical[:, 1] & horizontal[:, 2] & vertical[:, 3]) | (
+        vertical[:, 0] & horizontal[:, 1] & vertical[:, 2] & horizontal[:, 3]
+    )
+
+    diagonals = quadrilaterals[:, 2:] - quadrilaterals[:, :2]
+    horizontal_diagonal, vertical_diagonal = _axis_aligned(diagonals, tolerance, slope)
+    diamond = (vertical_diagonal[:, 0] & horizontal_diagonal[:, 1]) | (
+        horizontal_diagonal[:, 0] & vertical_diagonal[:, 1]
+    )
+
+    middles_distance = numpy.abs(diagonals[:, 0] + 2 * quadrilaterals[:, 0] - diagonals[:, 1] - 2 * quadrilaterals[:, 1])
+    diagonals_length = numpy.linalg.norm(diagonals, axis=2).sum(axis=1)
+    parallelogram = numpy.all(middles_distance < 2 * tolerance + (slope * diagonals_length)[:, None], axis=1)
+    horizontal_pair = (horizontal[:, 0] & horizontal[:, 2]) | (horizontal[:, 1] & horizontal[:, 3])
+
+    labels = numpy.full(len(quadrilaterals), QUADRILATERAL, dtype=object)
+    labels[parallelogram & horizontal_pair] = INPUT
+    labels[diamond] = DIAMOND
+    labels[rectangle] = RECTANGLE
+    return labels
+
+
+def _outline_features(outlines: Sequence[numpy.ndarray]) -> Tuple[numpy.ndarray, ...]:
+    """
+    Area, perimeter, centroid, principal angle and the extents along the principal axes of polygons
+    with any numbers of points, all at once.
+
+    The points of all polygons go into one array; sums over every polygon are numpy.add.reduceat()
+    of it, moments by the shoelace formula. Every polygon is moved to its first point before, so the
+    products stay exact on 8K images.
+
+    :return: area, perimeter, cx, cy, angle (radians), length along the angle, length across it
+    """
+    sizes = numpy.array([len(outline) for outline in outlines])
+    starts = numpy.cumsum(sizes) - sizes
+    points = numpy.concatenate([numpy.asarray(outline, dtype=numpy.float64).reshape(-1, 2) for outline in outlines])
+    origins = points[starts]
+    points = points - numpy.repeat(origins, sizes, axis=0)
+    following = numpy.arange(1, len(points) + 1)
+    following[starts + sizes - 1] = starts
+    x, y = points[:, 0], points[:, 1]
+    xn, yn = points[following, 0], points[following, 1]
+    cross = x * yn - xn * y
+
+    signed_area = numpy.add.reduceat(cross, starts) / 2
+    cx = numpy.add.reduceat((x + xn) * cross, starts) / (6 * signed_area)
+    cy = numpy.add.reduceat((y + yn) * cross, starts) / (6 * signed_area)
+    xx = numpy.add.reduceat((x * x + x * xn + xn * xn) * cross, starts) / (12 * signed_area) - cx * cx
+    yy = numpy.add.reduceat((y * y + y * yn + yn * yn) * cross, starts) / (12 * signed_area) - cy * cy
+    xy = numpy.add.reduceat((x * yn + 2 * x * y + 2 * xn * yn + xn * y) * cross, starts) / (24 * signed_area) - cx * cy
+    angle = numpy.arctan2(2 * xy, xx - yy) / 2  # of the major axis
+
+    cos, sin = numpy.repeat(numpy.cos(angle), sizes), numpy.repeat(numpy.sin(angle), sizes)
+    dx, dy = x - numpy.repeat(cx, sizes), y - numpy.repeat(cy, sizes)
+    along, across = dx * cos + dy * sin, dy * cos - dx * sin
+    length = numpy.maximum.reduceat(along, starts) - numpy.minimum.reduceat(along, starts)
+    width = numpy.maximum.reduceat(across, starts) - numpy.minimum.reduceat(across, starts)
+    perimeter = numpy.add.reduceat(numpy.hypot(xn - x, yn - y), starts)
+    return numpy.abs(signed_area), perimeter, cx + origins[:, 0], cy + origins[:, 1], angle, length, width
+
+
+def _deviation(
+    area: numpy.ndarray, perimeter: numpy.ndarray, length: numpy.ndarray, width: numpy.ndarray
+) -> numpy.ndarray:
+    """
+    Relative distance of the area and the perimeter of outlines from the range between the ones of an
+    ellipse and a stadium (a rectangle with half circles on the short sides) with the same extents.
+    Zero or less within the range.
+    """
+    long, short = numpy.maximum(length, width), numpy.minimum(length, width)
+    a, b = long / 2, short / 2
+    ellipse_area = math.pi * a * b
+    stadium_area = (long - short) * short + math.pi * b * b
+    ellipse_perimeter = math.pi * (3 * (a + b) - numpy.sqrt((3 * a + b) * (a + 3 * b)))  # Ramanujan
+    stadium_perimeter = 2 * (long - short) + 2 * math.pi * b
+    return numpy.maximum.reduce(
+        [
+            1 - area / ellipse_area,
+            area / stadium_area - 1,
+            1 - perimeter / ellipse_perimeter,
+            perimeter / stadium_perimeter - 1,
+        ]
+    )
+
+
+def _fit_residual(outline: numpy.ndarray, ellipse: Tuple) -> float:
+    """Largest relative distance of the outline points from the ellipse, 0 when all lie on it."""
+    (cx, cy), (width, height), angle = ellipse
+    if width <= 0 or height <= 0:
+        return math.inf
+    angle = math.radians(angle)
+    dx, dy = outline[:, 0] - cx, outline[:, 1] - cy
+    u = (dx * math.cos(angle) + dy * math.sin(angle)) / (width / 2)
+    v = (dy * math.cos(angle) - dx * math.sin(angle)) / (height / 2)
+    return float(numpy.abs(numpy.hypot(u, v) - 1).max())
+
+
+def classify_ellipsoids(
+    outlines: Sequence[numpy.ndarray], tolerance: float = ELLIPSOID_TOLERANCE
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Recognise Start/Stop blocks - ellipses and stadiums - among outlines of many points in one batch.
+
+    Features of all outlines are computed at once (see _outline_features()): the area and the
+    perimeter have to lie between the ones of an ellipse and of a stadium with the extents of the
+    outline along its principal axes. The check is independent of rotation and scale. Outlines within
+    tolerance are Start/Stop blocks; the ones within 3 * tolerance are ambiguous, only they are
+    fitted by cv2.fitEllipse() and accepted if no point is farther than 2 * tolerance from the fitted
+    ellipse. Noisy contours fail both.
+
+    :param outlines: (N_i, 2) arrays of approximated points, in order along the outline.
+    :param tolerance: relative tolerance of the area and the perimeter.
+    :return: (N,) bool mask of Start/Stop blocks, (N, 5) array of their ellipses as cx, cy, width,
+        height (full axes) and angle in degrees - the cv2.RotatedRect form, as cv2.fitEllipse() returns it.
+    """
+    ellipses = numpy.zeros((len(outlines), 5))
+    if not len(outlines):
+        return numpy.zeros(0, dtype=bool), ellipses
+    with numpy.errstate(divide="ignore", invalid="ignore"):  # degenerate outlines end up as NaN, never accepted
+        area, perimeter, cx, cy, angle, length, width = _outline_features(outlines)
+        deviation = _deviation(area, perimeter, length, width)
+    accepted = deviation <= tolerance
+    ambiguous = (deviation <= 3 * tolerance) & ~accepted
+    ellipses[:] = numpy.stack([cx, cy, length, width, numpy.degrees(angle)], axis=1)
+
+    for index in numpy.flatnonzero(ambiguous).tolist():
+        outline = numpy.asarray(outlines[index], dtype=numpy.float32).reshape(-1, 2)
+        ellipse = cv2.fitEllipse(outline)
+        if _fit_residual(outline, ellipse) <= 2 * tolerance:
+            accepted[index] = True
+            ellipses[index] = (*ellipse[0], *ellipse[1], ellipse[2])
+    return accepted, ellipses
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .lazy import LazyModule, numpy, optional_module
+from .result import Result
+from .shape import DIAMOND, ELLIPSOID, INPUT, QUADRILATERAL, RECTANGLE, START_STOP
+
+pyarrow = optional_module("pyarrow")  # Parquet output is optional, the .npy shards need numpy only
+parquet = LazyModule("pyarrow.parquet") if pyarrow is not None else None
+
+NPY = "npy"
+PARQUET = "parquet"
+FORMATS = (NPY, PARQUET)
+
+INDEX = "index.json"
+KINDS = (QUADRILATERAL, ELLIPSOID, START_STOP, RECTANGLE, DIAMOND, INPUT)  # codes of the kind column
+
+# .npy files of a shard: one row per shape, per image, or per vertex
+SHAPE_COLUMNS = ("image", "id", "kind", "centre", "bbox", "area", "ellipse", "vertex_offsets")
+IMAGE_COLUMNS = ("shape_offsets", "size", "frame", "ok")
+
+
+def parquet_available() -> bool:
+    """True if pyarrow is installed for Parquet output."""
+    return pyarrow is not None
+
+
+def _shard_name(number: int) -> str:
+    return f"shard-{number:05d}"
+
+
+class ColumnarWriter:
+    """Appends recognition results to a directory of columnar shards, one row per shape.
+
+    Every image gets an id, counted on from the images already in the directory, so a writer opened
+    on it again appends. Images are collected in memory and written as a shard of shard_images
+    images; index.json lists the shards with their first image id and row counts and is replaced
+    after every shard, so a crashed run loses only its last, unwritten shard.
+
+    A NPY shard is a directory of .npy files which numpy.load(mmap_mode="r") maps without reading
+    them (see read_shards()): per shape image, id, kind (a code into index["kinds"]), centre,
+    bbox, area, ellipse (NaN unless START_STOP) and vertex_offsets into vertices, an (M, 2) array
+    of all points of the shard; per image shape_offsets into the shape rows, size, frame (-1 for
+    still images) and ok; paths and errors of the images in images.json.
+    A PARQUET shard is shard-N.parquet with the shape rows - vertices as a list column - and
+    shard-N.images.parquet, for readers like pandas, Polars, DuckDB or Spark. Needs pyarrow.
+
+    Attributes
+
+    directory : str
+        Directory of the shards, created when missing.
+    output_format : str
+        NPY or PARQUET; a directory keeps the format it was created with.
+    shard_images : int
+        Images per shard.
+    images : int
+        Images in the directory, written or not, also the id of the next image.
+    """
+
+    def __init__(self, directory: str, output_format: str = NPY, shard_images: int = 100000):
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown columnar format {output_format!r}, use one of {', '.join(FORMATS)}")
+        index = read_index(directory) if os.path.exists(os.path.join(directory, INDEX)) else None
+        if index is not None and index["format"] != output_format:
+            raise ValueError(f"{directory} holds {index['format']} shards, cannot append {output_format}")
+        if output_format == PARQUET and not parquet_available():
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_images = shard_images
+        self.output_format = output_format
+        self._index = index or {"format": output_format, "kinds": list(KINDS), "images": 0, "shapes": 0, "shards": []}
+        self._codes = {kind: code for code, kind in enumerate(self._index["kinds"])}
+        self.images = self._index["images"]
+        self._clear()
+
+    def _clear(self) -> None:
+        self._first_image = self.images
+        self._paths: List[Optional[str]] = []
+        self._errors: Dict[str, str] = {}
+        self._frames: List[int] = []
+        self._sizes: List[Tuple[int, int]] = []
+        self._ok: List[bool] = []
+        self._shape_counts: List[int] = []
+        self._ids: List[int] = []
+        self._kinds: List[int] = []
+        self._centres: List[List[int]] = []
+        self._bboxes: List[List[int]] = []
+        self._areas: List[float] = []
+        self._ellipses: List[List[float]] = []
+        self._vertex_counts: List[int] = []
+        self._vertices: List[int] = []
+
+    def _code(self, kind: str) -> int:
+        code = self._codes.get(kind)
+        if code is None:  # a kind added after the directory was created
+            code = self._codes[kind] = len(self._index["kinds"])
+            self._index["kinds"].append(kind)
+        return code
+
+    def append(self, record: Dict) -> int:
+        """
+        Add the record of one image - of batch.recognise_file() or batch.run_sequences(), or
+        Result.to_dict() with a path - and return its image id.
+        """
+        image = self.images
+        self._paths.append(record.get("path"))
+        self._frames.append(record.get("frame", -1))
+        ok = record.get("ok", True)
+        self._ok.append(ok)
+        if not ok:
+            self._errors[str(image)] = record.get("error", "")
+        self._sizes.append(tuple(record.get("size") or (0, 0)))
+        shapes = record.get("shapes") or []
+        self._shape_counts.append(len(shapes))
+        for shape in shapes:
+            self._ids.append(shape["id"] if shape["id"] is not None else -1)
+            self._kinds.append(self._code(shape["kind"]))
+            self._centres.append(shape["centre"])
+            self._bboxes.append(shape["bbox"] or [-1, -1, -1, -1])
+            self._areas.append(shape["area"])
+            self._ellipses.append(shape.get("ellipse") or [numpy.nan] * 5)
+            self._vertex_counts.append(len(shape["vertices"]))
+            for point in shape["vertices"]:
+                self._vertices.extend(point)
+        self.images += 1
+        if len(self._paths) >= self.shard_images:
+            self.flush()
+        return image
+
+    def append_result(self, result: Result, path: Optional[str] = None, frame: int = -1) -> int:
+        """Add a Result of Recognition.recognise() and return its image id."""
+        return self.append({"path": path, "frame": frame, "ok": True, **result.to_dict()})
+
+    def _columns(self) -> Tuple[Dict[str, numpy.ndarray], Dict[str, numpy.ndarray], numpy.ndarray]:
+        shape_counts = numpy.array(self._shape_counts, dtype=numpy.int64)
+        image_ids = numpy.arange(self._first_image, self.images, dtype=numpy.int64)
+        shapes = {
+            "image": numpy.repeat(image_ids, shape_counts),
+            "id": numpy.array(self._ids, dtype=numpy.int32),
+            "kind": numpy.array(self._kinds, dtype=numpy.uint8),
+            "centre": numpy.array(self._centres, dtype=numpy.int32).reshape(-1, 2),
+            "bbox": numpy.array(self._bboxes, dtype=numpy.int32).reshape(-1, 4),
+            "area": numpy.array(self._areas, dtype=numpy.float64),
+            "ellipse": numpy.array(self._ellipses, dtype=numpy.float32).reshape(-1, 5),
+            "vertex_offsets": numpy.concatenate(([0], numpy.cumsum(self._vertex_counts, dtype=numpy.int64))),
+        }
+        images = {
+            "shape_offsets": numpy.concatenate(([0], numpy.cumsum(shape_counts))),
+            "size": numpy.array(self._sizes, dtype=numpy.int32).reshape(-1, 2),
+            "frame": numpy.array(self._frames, dtype=numpy.int64),
+            "ok": numpy.array(self._ok, dtype=bool),
+        }
+        return shapes, images, numpy.array(self._vertices, dtype=numpy.int32).reshape(-1, 2)
+
+    def flush(self) -> None:
+        """Write the collected images as a shard and update the index. Does nothing without images."""
+        if not self._paths:
+            return
+        shapes, images, vertices = self._columns()
+        name = _shard_name(len(self._index["shards"]))
+        if self.output_format == NPY:
+            self._write_npy(os.path.join(self.directory, name), shapes, images, vertices)
+        else:
+            self._write_parquet(os.path.join(self.directory, name), shapes, images, vertices)
+        self._index["shards"].append(
+            {"name": name, "first_image": self._first_image, "images": len(self._paths), "shapes": len(self._ids)}
+        )
+        self._index["images"] = self.images
+        self._index["shapes"] += len(self._ids)
+        temporary = os.path.join(self.directory, INDEX + ".tmp")
+        with open(temporary, "w") as index:
+            json.dump(self._index, index, indent=1)
+        os.replace(temporary, os.path.join(self.directory, INDEX))
+        self._clear()
+
+    def _write_npy(self, path: str, shapes: Dict, images: Dict, vertices: numpy.ndarray) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name, column in (*shapes.items(), *images.items(), ("vertices", vertices)):
+            numpy.save(os.path.join(path, name + ".npy"), column)
+        with open(os.path.join(path, "images.json"), "w") as output:
+            json.dump({"paths": self._paths, "errors": self._errors}, output)
+
+    def _write_parquet(self, path: str, shapes: Dict, images: Dict, vertices: numpy.ndarray) -> None:
+        kinds = pyarrow.DictionaryArray.from_arrays(shapes["kind"], self._index["kinds"])
+        points = pyarrow.FixedSizeListArray.from_arrays(vertices.reshape(-1), 2)
+        table = pyarrow.table({
+            "image": shapes["image"],
+            "id": shapes["id"],
+            "kind": kinds,
+            "x": shapes["centre"][:, 0],
+            "y": shapes["centre"][:, 1],
+            **{name: shapes["bbox"][:, axis] for axis, name in enumerate(("left", "top", "width", "height"))},
+            "area": shapes["area"],
+            "ellipse": pyarrow.FixedSizeListArray.from_arrays(shapes["ellipse"].reshape(-1), 5),
+            "vertices": pyarrow.ListArray.from_arrays(shapes["vertex_offsets"].astype(numpy.int32), points),
+        })
+        parquet.write_table(table, path + ".parquet")
+        parquet.write_table(
+            pyarrow.table({
+                "image": numpy.arange(self._first_image, self.images, dtype=numpy.int64),
+                "path": self._paths,
+                "frame": images["frame"],
+                "width": images["size"][:, 0],
+                "height": images["size"][:, 1],
+                "ok": images["ok"],
+                "error": [self._errors.get(str(image)) for image in range(self._first_image, self.images)],
+                "shapes": numpy.diff(images["shape_offsets"]),
+            }),
+            path + ".images.parquet",
+        )
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_index(directory: str) -> Dict:
+    """index.json of a columnar directory: format, kinds, images, shapes and the list of shards."""
+    with open(os.path.join(directory, INDEX)) as index:
+        return json.load(index)
+
+
+class Shard:
+    """Memory-mapped columns of one NPY shard, see ColumnarWriter for the columns.
+
+    Nothing is read until a column is used, and then only the pages touched, so filtering a
+    column of millions of rows reads just that column.
+
+    Attributes
+
+    directory : str
+        Directory of the shard's .npy files.
+    columns : Dict[str, numpy.ndarray]
+        Shape, image and vertex columns by name, e.g. shard.columns["centre"].
+    first_image : int
+        Id of the first image of the shard; image rows are image id - first_image.
+    kinds : List[str]
+        Kind of every code of the kind column.
+    """
+
+    def __init__(self, directory: str, entry: Dict, kinds: List[str]):
+        self.directory = os.path.join(directory, entry["name"])
+        self.first_image = entry["first_image"]
+        self.kinds = kinds
+        self.columns = {
+            name: numpy.load(os.path.join(self.directory, name + ".npy"), mmap_mode="r")
+            for name in (*SHAPE_COLUMNS, *IMAGE_COLUMNS, "vertices")
+        }
+        self._images: Optional[Dict] = None
+
+    def __getitem__(self, name: str) -> numpy.ndarray:
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(self.columns["image"])
+
+    def rows(
+        self, kinds: Optional[Iterable[str]] = None, region: Optional[Tuple[int, int, int, int]] = None
+    ) -> numpy.ndarray:
+        """
+        Indices of the shapes of the kinds whose centre lies in the region.
+
+        :param region: x, y, width and height, all shapes if None.
+        """
+        mask = numpy.ones(len(self), dtype=bool)
+        if kinds is not None:
+            codes = [code for code, kind in enumerate(self.kinds) if kind in set(kinds)]
+            mask &= numpy.isin(self.columns["kind"], codes)
+        if region is not None:
+            x, y, width, height = region
+            centre = self.columns["centre"]
+            mask &= (centre[:, 0] >= x) & (centre[:, 0] < x + width) & (centre[:, 1] >= y) & (centre[:, 1] < y + height)
+        return numpy.flatnonzero(mask)
+
+    def vertices(self, row: int) -> numpy.ndarray:
+        """(N, 2) points of the shape in a row, empty for START_STOP (see the ellipse column)."""
+        offsets = self.columns["vertex_offsets"]
+        return self.columns["vertices"][offsets[row]:offsets[row + 1]]
+
+    def image_rows(self, image: int) -> slice:
+        """Rows of the shapes of an image id."""
+        offsets = self.columns["shape_offsets"]
+        local = image - self.first_image
+        return slice(int(offsets[local]), int(offsets[local + 1]))
+
+    def image_path(self, image: int) -> Optional[str]:
+        """Path of an image id, read from images.json at the first call."""
+        if self._images is None:
+            with open(os.path.join(self.directory, "images.json")) as images:
+                self._images = json.load(images)
+        return self._images["paths"][image - self.first_image]
+
+
+def read_shards(directory: str) -> Iterator[Shard]:
+    """Memory-map the NPY shards of a columnar directory, in the order they were written."""
+    index = read_index(directory)
+    if index["format"] != NPY:
+        raise ValueError(f"{directory} holds {index['format']} shards, read them with pyarrow")
+    for entry in index["shards"]:
+        yield Shard(directory, entry, index["kinds"])
@@ -1,11 +1,24 @@
 import logging
 
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())  # a library only logs where the application configured it to
 
 c_handler = logging.StreamHandler()
 c_format = logging.Formatter(
     "%(asctime)s - line: %(lineno)d - %(levelname)s - %(message)s"
 )
 c_handler.setFormatter(c_format)
-logger.addHandler(c_handler)
-logger.setLevel(logging.DEBUG)
+
+
+def configure_logging(level: int = logging.WARNING) -> logging.Logger:
+    """
+    Set the level of the pic2block logger and print its messages to stderr - from the CLI flags,
+    in batch workers or by a library caller which wants the messages without its own handlers.
+
+    Messages on the per-contour path are formatted lazily, so below this level they cost
+    only the level check.
+    """
+    if c_handler not in logger.handlers:
+        logger.addHandler(c_handler)
+    logger.setLevel(level)
+    return logger
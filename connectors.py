@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import math
+import time
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from .lazy import cv2, numpy
+from .metrics import NULL_METRICS, Metrics, NullMetrics
+from .preprocess import PreprocessConfig, downscale, threshold as preprocess_threshold
+from .shape import Shape
+
+
+class Connector:
+    """Line between two recognised shapes, an edge of the diagram graph.
+
+    Attributes
+
+    id : int
+        Number of the connector within its Result.
+    source, target : int
+        Ids of the shapes, the arrow points at target.
+    tail, head : Tuple[int, int]
+        Points where the line meets source and target.
+    directed : bool
+        False when no single arrowhead told the direction (none or on both ends), source is then
+        the shape with the lower id.
+    """
+
+    __slots__ = ("id", "source", "target", "tail", "head", "directed")
+
+    def __init__(
+        self,
+        source: int,
+        target: int,
+        tail: Tuple[int, int],
+        head: Tuple[int, int],
+        directed: bool = True,
+        id: Optional[int] = None,
+    ):
+        self.id = id
+        self.source = source
+        self.target = target
+        self.tail = tail
+        self.head = head
+        self.directed = directed
+
+    def to_dict(self) -> Dict:
+        """Plain, JSON serialisable form of the connector."""
+        return {
+            "id": self.id,
+            "source": self.source,
+            "target": self.target,
+            "tail": list(self.tail),
+            "head": list(self.head),
+            "directed": self.directed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Connector":
+        """Create a Connector from its to_dict() form."""
+        return cls(
+            data["source"], data["target"], tuple(data["tail"]), tuple(data["head"]), data["directed"], data["id"]
+        )
+
+    def __repr__(self) -> str:
+        arrow = "->" if self.directed else "--"
+        return f"Connector({self.source} {arrow} {self.target})"
+
+
+def adjacency(connectors: Sequence[Connector]) -> Dict[int, List[int]]:
+    """Directed graph of shape ids, target ids per source id. Undirected connectors go both ways."""
+    graph: Dict[int, List[int]] = {}
+    for connector in connectors:
+        graph.setdefault(connector.source, []).append(connector.target)
+        if not connector.directed:
+            graph.setdefault(connector.target, []).append(connector.source)
+    return graph
+
+
+def stroke_width(ink: numpy.ndarray) -> int:
+    """
+    Typical width of lines in pixels, from the distance transform of the ink.
+
+    Across a line of width s the distance to the background rises from 1 to s / 2 and falls back,
+    most ink lies in lines, so the median distance is about s / 4. Filled parts (arrowheads, bold
+    text) have larger distances but little weight in the median.
+    """
+    distances = cv2.distanceTransform(ink, cv2.DIST_L1, 3)
+    values = distances[distances > 0]
+    if not len(values):
+        return 1
+    return int(2 * numpy.median(values)) + 1
+
+
+def find_connectors(
+    binary: numpy.ndarray,
+    shapes: Sequence[Shape],
+    scale: float = 1.0,
+    margin: Optional[int] = None,
+    attach_distance: Optional[int] = None,
+    head_ratio: float = 1.4,
+) -> List[Connector]:
+    """
+    Find lines joining the shapes and the direction of their arrowheads.
+
+    Shapes with a margin around their outline are painted into a label image, the ink left
+    outside of them falls apart into one connected component per connector (with its arrowhead).
+    The label image dilated by attach_distance is a raster spatial index: one lookup per pixel
+    tells the shape a connector pixel is close to, so line ends are attached without comparing
+    connectors with shapes. The ink of a component close to one shape is the end of the connector
+    at that shape; an end whose ink is wider than head_ratio times the narrowest end of the
+    component carries an arrowhead. All of it is a few whole-image passes and a sort of the pixels
+    near the shapes, so the time grows with the image size and the number of connectors.
+
+    A component close to more than two shapes (a line which branches) gives an edge from every tail
+    to every head, or between every two shapes if it has no single direction.
+
+    :param binary: threshold image, white background stays 255 (see preprocess.threshold()).
+    :param shapes: recognised shapes in the coordinates of the original image.
+    :param scale: scale of binary to the original image, results are mapped back with it.
+    :param margin: pixels around a shape outline which still belong to the shape, by default one and
+        a half stroke width - the vertices lie on the inner edge of the outline, corners stick out.
+    :param attach_distance: maximal gap between a line end and a shape, by default 4 stroke widths.
+    :return: connectors in the original image coordinates, with ids of the shapes (the index in
+        shapes for a shape without an id).
+    """
+    connectors, _, _ = _find_connectors(binary, shapes, scale, margin, attach_distance, head_ratio)
+    return connectors
+
+
+def _find_connectors(
+    binary: numpy.ndarray,
+    shapes: Sequence[Shape],
+    scale: float = 1.0,
+    margin: Optional[int] = None,
+    attach_distance: Optional[int] = None,
+    head_ratio: float = 1.4,
+    window: Optional[Tuple[int, int, int, int]] = None,
+    regions: Optional[Sequence[Tuple[int, int, int, int]]] = None,
+    points: Sequence[Tuple[int, int]] = (),
+) -> Tuple[List[Connector], bool, List[bool]]:
+    """
+    find_connectors() in a window of binary, optionally only for lines reaching into regions.
+
+    :param window: x0, y0, x1, y1 part of binary to search, the whole image if None.
+    :param regions: x0, y0, x1, y1 boxes of binary inside the window; only lines with ink in one of
+        them give connectors, all lines if None.
+    :param points: x, y points of the original image to look up.
+    :return: connectors; whether one of the lines comes closer than attach_distance to a side of the
+        window inside the image, so it may go on outside; for every point, whether it lies on one of
+        the lines.
+    """
+    height, width = binary.shape[:2]
+    x0, y0, x1, y1 = window if window is not None else (0, 0, width, height)
+    if len(shapes) < 2:
+        return [], False, [False] * len(points)
+    ink = (binary[y0:y1, x0:x1] == 0).astype(numpy.uint8)
+    stroke = stroke_width(ink)
+    margin = stroke + max(1, stroke // 2) if margin is None else max(0, round(margin * scale))
+    attach = 4 * stroke if attach_distance is None else max(1, round(attach_distance * scale))
+
+    zone = numpy.zeros(ink.shape, numpy.float32)  # index of the shape + 1, exact up to 2 ** 24
+    for index, shape in enumerate(shapes):
+        if shape.ellipse is not None:
+            (cx, cy), (w, h), angle = shape.rotated_rect
+            ellipse = (cx * scale - x0, cy * scale - y0), (w * scale, h * scale), angle
+            cv2.ellipse(zone, ellipse, index + 1, -1)
+            cv2.ellipse(zone, ellipse, index + 1, 2 * margin + 1)
+        else:
+            vertices = numpy.round(shape.vertices * scale - (x0, y0)).astype(numpy.int32)
+            cv2.fillPoly(zone, [vertices.reshape(-1, 1, 2)], index + 1)
+            cv2.polylines(zone, [vertices.reshape(-1, 1, 2)], True, index + 1, 2 * margin + 1)
+    ink[zone > 0] = 0
+    count, components = cv2.connectedComponents(ink, connectivity=8, ltype=cv2.CV_32S)
+    band = cv2.dilate(zone, numpy.ones((2 * attach + 1, 2 * attach + 1), numpy.uint8))
+
+    lines = numpy.ones(count, bool)  # components which give connectors
+    if regions is not None:
+        lines[:] = False
+        for left, top, right, bottom in regions:
+            lines[components[max(0, top - y0):bottom - y0, max(0, left - x0):right - x0]] = True
+    lines[0] = False
+    sides = [
+        components[:, :attach] if x0 > 0 else None,
+        components[:, -attach:] if x1 < width else None,
+        components[:attach] if y0 > 0 else None,
+        components[-attach:] if y1 < height else None,
+    ]
+    cut = any(lines[side].any() for side in sides if side is not None)
+    reach = math.ceil(1 / scale)  # a point rounded to the original image is a pixel or more off
+    on_lines = []
+    for x, y in points:
+        left, top = round(x * scale) - x0, round(y * scale) - y0
+        near = components[max(0, top - reach):max(0, top + reach + 1), max(0, left - reach):max(0, left + reach + 1)]
+        on_lines.append(bool(lines[near].any()))
+
+    ys, xs = numpy.nonzero(ink & (band > 0))
+    keep = lines[components[ys, xs]]
+    ys, xs = ys[keep], xs[keep]
+    if not len(xs):
+        return [], cut, on_lines
+    near = band[ys, xs].astype(numpy.intp) - 1
+    centres = numpy.array([shape.centre for shape in shapes], dtype=numpy.float64) * scale - (x0, y0)
+    keys = components[ys, xs].astype(numpy.int64) * len(shapes) + near
+    distances = (xs - centres[near, 0]) ** 2 + (ys - centres[near, 1]) ** 2
+    order = numpy.lexsort((distances, keys))  # by end, the pixel closest to the shape first
+    keys, xs, ys = keys[order], xs[order], ys[order]
+    starts = numpy.flatnonzero(numpy.r_[True, keys[1:] != keys[:-1]])
+
+    pixels = numpy.diff(numpy.r_[starts, len(keys)])
+    extent = numpy.maximum(
+        numpy.maximum.reduceat(xs, starts) - numpy.minimum.reduceat(xs, starts),
+        numpy.maximum.reduceat(ys, starts) - numpy.minimum.reduceat(ys, starts),
+    ) + 1
+    widths = pixels / extent
+    ends = pixels >= stroke  # a few pixels are a touching glyph or noise, not a line end
+    end_components = (keys[starts] // len(shapes))[ends].tolist()
+    end_shapes = (keys[starts] % len(shapes))[ends].tolist()
+    corners = numpy.stack([xs[starts] + x0, ys[starts] + y0], axis=1)[ends]
+    end_points = numpy.round(corners / scale).astype(int).tolist()
+    end_widths = widths[ends].tolist()
+
+    ids = [index if shape.id is None else shape.id for index, shape in enumerate(shapes)]
+    connectors: List[Connector] = []
+    first = 0
+    while first < len(end_components):
+        last = first
+        while last + 1 < len(end_components) and end_components[last + 1] == end_components[first]:
+            last += 1
+        if last > first:
+            _connect(
+                [(ids[end_shapes[i]], tuple(end_points[i]), end_widths[i]) for i in range(first, last + 1)],
+                head_ratio,
+                connectors,
+            )
+        first = last + 1
+    for index, connector in enumerate(connectors):
+        connector.id = index
+    return connectors, cut, on_lines
+
+
+def _connect(ends: List[Tuple[int, Tuple[int, int], float]], head_ratio: float, connectors: List[Connector]) -> None:
+    """Append edges of one connector component with (shape id, point, width) ends."""
+    narrowest = min(width for _, _, width in ends)
+    heads = [end for end in ends if end[2] >= head_ratio * narrowest]
+    tails = [end for end in ends if end[2] < head_ratio * narrowest]
+    if heads and tails:
+        connectors.extend(
+            Connector(tail[0], head[0], tail[1], head[1]) for tail in tails for head in heads
+        )
+        return
+    for one, other in combinations(sorted(ends), 2):
+        connectors.append(Connector(one[0], other[0], one[1], other[1], directed=False))
+
+
+def _overlaps(bbox: Tuple[int, int, int, int], scale: float, window: Tuple[int, int, int, int]) -> bool:
+    """True if the x, y, width, height box of the original image overlaps the x0, y0, x1, y1 window of binary."""
+    x, y, width, height = bbox
+    left, top, right, bottom = x * scale, y * scale, (x + width) * scale, (y + height) * scale
+    return left < window[2] and window[0] < right and top < window[3] and window[1] < bottom
+
+
+class ConnectorDetector:
+    """Find connectors between recognised shapes, see find_connectors().
+
+    detect() thresholds the image again with the PreprocessConfig of the recognition, and downscales
+    it with its max_dimension; detect_changes() takes the threshold image recognition made and finds
+    again only the connectors of an edited image which changed.
+
+    Attributes
+
+    margin : int
+        Pixels around a shape outline which still belong to the shape, None for 1.5 stroke widths.
+    attach_distance : int
+        Maximal gap between a line end and a shape, None for 4 stroke widths.
+    head_ratio : float
+        How much wider than the other end of a line an arrowhead is.
+    """
+
+    def __init__(self, margin: Optional[int] = None, attach_distance: Optional[int] = None, head_ratio: float = 1.4):
+        self.margin = margin
+        self.attach_distance = attach_distance
+        self.head_ratio = head_ratio
+
+    def parameters(self) -> Dict:
+        """Parameters which change the found connectors, a part of the result cache key."""
+        return {"margin": self.margin, "attach_distance": self.attach_distance, "head_ratio": self.head_ratio}
+
+    def detect(
+        self,
+        image: numpy.ndarray,
+        shapes: Sequence[Shape],
+        preprocess: Optional[PreprocessConfig] = None,
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+    ) -> List[Connector]:
+        """
+        Connectors between the shapes recognised in the image.
+
+        :param image: decoded BGR image the shapes were recognised in.
+        :param preprocess: thresholding and downscaling settings, the defaults if None.
+        :param metrics: Metrics to record the "connectors" stage time and the number of connectors in.
+        """
+        start = time.perf_counter()
+        preprocess = preprocess or PreprocessConfig()
+        gray, scale = downscale(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), preprocess.max_dimension)
+        connectors = find_connectors(
+            preprocess_threshold(gray, preprocess), shapes, scale, self.margin, self.attach_distance, self.head_ratio
+        )
+        metrics.add_time("connectors", start)
+        metrics.count("connectors", len(connectors))
+        return connectors
+
+    def detect_changes(
+        self,
+        binary: numpy.ndarray,
+        scale: float,
+        shapes: Sequence[Shape],
+        previous: Optional[Sequence[Connector]] = None,
+        kept: Iterable[int] = (),
+        regions: Optional[Sequence[Tuple[int, int, int, int]]] = None,
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+    ) -> List[Connector]:
+        """
+        Connectors of an edited image, found again only where it changed.
+
+        Lines with ink in one of the regions are searched for in a window around the regions, grown
+        until none of these lines comes close to its border - at most to the whole image. Previous
+        connectors between kept shapes are taken over, unless one of their ends lies on such a line.
+
+        :param binary: threshold image the shapes were recognised in, see preprocess.threshold().
+        :param scale: scale of binary to the original image.
+        :param shapes: all shapes of the edited image, with their final ids.
+        :param previous: connectors of the earlier version, None to find all connectors.
+        :param kept: ids of the shapes taken over unchanged from the earlier version.
+        :param regions: x0, y0, x1, y1 boxes of the original image which changed, None to find all connectors.
+        :param metrics: Metrics to record the "connectors" stage time and the number of connectors in.
+        """
+        start = time.perf_counter()
+        if previous is None or regions is None:
+            connectors = find_connectors(binary, shapes, scale, self.margin, self.attach_distance, self.head_ratio)
+        else:
+            connectors = self._update(binary, scale, shapes, previous, set(kept), regions)
+        metrics.add_time("connectors", start)
+        metrics.count("connectors", len(connectors))
+        return connectors
+
+    def _update(
+        self,
+        binary: numpy.ndarray,
+        scale: float,
+        shapes: Sequence[Shape],
+        previous: Sequence[Connector],
+        kept: Set[int],
+        regions: Sequence[Tuple[int, int, int, int]],
+    ) -> List[Connector]:
+        """Previous connectors which did not change and the ones found in the window, see detect_changes()."""
+        taken = [connector for connector in previous if connector.source in kept and connector.target in kept]
+        found: List[Connector] = []
+        if regions:
+            height, width = binary.shape[:2]
+            boxes = [
+                (int(left * scale), int(top * scale), min(width, math.ceil(right * scale)),
+                 min(height, math.ceil(bottom * scale)))
+                for left, top, right, bottom in regions
+            ]
+            points = [point for connector in taken for point in (connector.tail, connector.head)]
+            grow = 64
+            while True:
+                window = (
+                    max(0, min(box[0] for box in boxes) - grow),
+                    max(0, min(box[1] for box in boxes) - grow),
+                    min(width, max(box[2] for box in boxes) + grow),
+                    min(height, max(box[3] for box in boxes) + grow),
+                )
+                inside = [shape for shape in shapes if _overlaps(shape.bbox, scale, window)]
+                found, cut, on_lines = _find_connectors(
+                    binary, inside, scale, self.margin, self.attach_distance, self.head_ratio, window, boxes, points
+                )
+                if not cut:
+                    break
+                grow *= 2
+            taken = [connector for index, connector in enumerate(taken) if not any(on_lines[2 * index:2 * index + 2])]
+        connectors = [
+            Connector(connector.source, connector.target, connector.tail, connector.head, connector.directed)
+            for connector in taken
+        ] + found
+        for index, connector in enumerate(connectors):
+            connector.id = index
+        return connectors
+
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import zipfile
+from typing import BinaryIO, Callable, Iterator, Optional, TextIO, Union
+
+from .lazy import LazyModule, numpy
+from .result import Result
+from .shape import DIAMOND, INPUT, RECTANGLE, START_STOP, Shape
+
+saxutils = LazyModule("xml.sax.saxutils")  # pulls in urllib and http.client
+
+VSDX = "vsdx"
+DRAWIO = "drawio"
+JSON_GRAPH = "json"
+FORMATS = (VSDX, DRAWIO, JSON_GRAPH)
+EXTENSIONS = {VSDX: ".vsdx", DRAWIO: ".drawio", JSON_GRAPH: ".json"}
+
+DPI = 96  # pixels per inch of the exported page, Visio measures in inches
+
+_VISIO_MAIN = "http://schemas.microsoft.com/office/visio/2012/main"
+_RELATIONSHIPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_RELATIONSHIPS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_VSDX_PARTS = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/visio/document.xml" ContentType="application/vnd.ms-visio.drawing.main+xml"/>'
+        '<Override PartName="/visio/pages/pages.xml" ContentType="application/vnd.ms-visio.pages+xml"/>'
+        '<Override PartName="/visio/pages/page1.xml" ContentType="application/vnd.ms-visio.page+xml"/>'
+        '<Override PartName="/docProps/core.xml" '
+        'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+        '<Override PartName="/docProps/app.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        f'<Relationships xmlns="{_PACKAGE_RELATIONSHIPS}">'
+        '<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/document" '
+        'Target="visio/document.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+        'Target="docProps/core.xml"/>'
+        f'<Relationship Id="rId3" Type="{_RELATIONSHIPS}/extended-properties" Target="docProps/app.xml"/>'
+        '</Relationships>'
+    ),
+    "docProps/core.xml": (
+        '<cp:coreProperties '
+        'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:creator>pic2block</dc:creator></cp:coreProperties>'
+    ),
+    "docProps/app.xml": (
+        '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+        '<Application>pic2block</Application></Properties>'
+    ),
+    "visio/document.xml": (
+        f'<VisioDocument xmlns="{_VISIO_MAIN}" xmlns:r="{_RELATIONSHIPS}" xml:space="preserve">'
+        '<DocumentSettings TopPage="0" DefaultTextStyle="0" DefaultLineStyle="0" DefaultFillStyle="0"/>'
+        '<Colors/><FaceNames/><StyleSheets>'
+        '<StyleSheet ID="0" NameU="No Style" Name="No Style">'
+        '<Cell N="LineWeight" V="0.01041666666666667"/><Cell N="LineColor" V="#000000"/>'
+        '<Cell N="LinePattern" V="1"/><Cell N="FillForegnd" V="#ffffff"/><Cell N="FillPattern" V="1"/>'
+        '<Cell N="CharColor" V="#000000"/><Cell N="VerticalAlign" V="1"/>'
+        '<Section N="Character"><Row IX="0"><Cell N="Size" V="0.1111111111111111"/></Row></Section>'
+        '<Section N="Paragraph"><Row IX="0"><Cell N="HorzAlign" V="1"/></Row></Section>'
+        '</StyleSheet></StyleSheets></VisioDocument>'
+    ),
+    "visio/_rels/document.xml.rels": (
+        f'<Relationships xmlns="{_PACKAGE_RELATIONSHIPS}">'
+        '<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/pages" '
+        'Target="pages/pages.xml"/></Relationships>'
+    ),
+    "visio/pages/_rels/pages.xml.rels": (
+        f'<Relationships xmlns="{_PACKAGE_RELATIONSHIPS}">'
+        '<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/page" '
+        'Target="page1.xml"/></Relationships>'
+    ),
+}
+
+# draw.io styles of the shape kinds, anything else is drawn as a rectangle
+_DRAWIO_STYLES = {
+    RECTANGLE: "rounded=0;whiteSpace=wrap;html=1;",
+    DIAMOND: "rhombus;whiteSpace=wrap;html=1;",
+    INPUT: "shape=parallelogram;perimeter=parallelogramPerimeter;whiteSpace=wrap;html=1;",
+    START_STOP: "ellipse;whiteSpace=wrap;html=1;",
+}
+
+
+def _number(value: float) -> str:
+    return f"{value:.4f}".rstrip("0").rstrip(".") or "0"
+
+
+def _cell(name: str, value: Union[float, str], formula: Optional[str] = None) -> str:
+    value = _number(value) if isinstance(value, float) else value
+    formula = f" F={saxutils.quoteattr(formula)}" if formula else ""
+    return f'<Cell N="{name}" V="{value}"{formula}/>'
+
+
+def _vsdx_shape(shape: Shape, sheet: int, page_height: float, dpi: float) -> str:
+    """Visio XML of one 2-D shape, its outline is the Geometry section in inches from the bottom left."""
+    left, top, width, height = shape.bbox
+    w, h = width / dpi, height / dpi
+    cells = [
+        _cell("PinX", (left + width / 2) / dpi),
+        _cell("PinY", page_height - (top + height / 2) / dpi),
+        _cell("Width", w),
+        _cell("Height", h),
+        _cell("LocPinX", w / 2, "Width*0.5"),
+        _cell("LocPinY", h / 2, "Height*0.5"),
+    ]
+    if shape.kind == START_STOP:
+        rows = (
+            f'<Row T="Ellipse" IX="1">{_cell("X", w / 2)}{_cell("Y", h / 2)}{_cell("A", w)}{_cell("B", h / 2)}'
+            f'{_cell("C", w / 2)}{_cell("D", h)}</Row>'
+        )
+    else:
+        points = [((x - left) / dpi, (top + height - y) / dpi) for x, y in shape.vertices.tolist()]
+        points.append(points[0])
+        rows = "".join(
+            f'<Row T="{"MoveTo" if index == 0 else "LineTo"}" IX="{index + 1}">{_cell("X", x)}{_cell("Y", y)}</Row>'
+            for index, (x, y) in enumerate(points)
+        )
+    text = f"<Text>{saxutils.escape(shape.text)}</Text>" if shape.text else ""
+    return (
+        f'<Shape ID="{sheet}" NameU="{shape.kind}.{sheet}" Type="Shape" LineStyle="0" FillStyle="0" TextStyle="0">'
+        f'{"".join(cells)}<Section N="Geometry" IX="0">{rows}</Section>{text}</Shape>'
+    )
+
+
+def _vsdx_connector(begin, end, sheet: int, directed: bool, page_height: float, dpi: float) -> str:
+    """Visio XML of a straight 1-D connector from begin to end (pixels)."""
+    begin_x, begin_y = begin[0] / dpi, page_height - begin[1] / dpi
+    end_x, end_y = end[0] / dpi, page_height - end[1] / dpi
+    length = math.hypot(end_x - begin_x, end_y - begin_y)
+    cells = [
+        _cell("PinX", (begin_x + end_x) / 2),
+        _cell("PinY", (begin_y + end_y) / 2),
+        _cell("Width", length),
+        _cell("Height", 0.0),
+        _cell("LocPinX", length / 2, "Width*0.5"),
+        _cell("LocPinY", 0.0),
+        _cell("Angle", math.atan2(end_y - begin_y, end_x - begin_x)),
+        _cell("BeginX", begin_x),
+        _cell("BeginY", begin_y),
+        _cell("EndX", end_x),
+        _cell("EndY", end_y),
+        _cell("ObjType", "2"),
+        _cell("EndArrow", "13" if directed else "0"),
+    ]
+    rows = (
+        f'<Row T="MoveTo" IX="1">{_cell("X", 0.0)}{_cell("Y", 0.0)}</Row>'
+        f'<Row T="LineTo" IX="2">{_cell("X", length)}{_cell("Y", 0.0)}</Row>'
+    )
+    return (
+        f'<Shape ID="{sheet}" NameU="Dynamic connector.{sheet}" Type="Shape" LineStyle="0" FillStyle="0" '
+        f'TextStyle="0">{"".join(cells)}<Section N="Geometry" IX="0">{_cell("NoFill", "1")}{rows}</Section></Shape>'
+    )
+
+
+def iter_vsdx_page(result: Result, dpi: float = DPI) -> Iterator[str]:
+    """
+    Chunks of the Visio page XML: one per shape and connector, then the glue of connectors to shapes.
+
+    Visio sheet ids start at 1, shape id N is sheet N + 1 and connector sheets follow the shapes.
+    """
+    page_height = result.size[1] / dpi
+    ids = [index if shape.id is None else shape.id for index, shape in enumerate(result.shapes)]
+    sheets = numpy.zeros(max(ids, default=-1) + 1, dtype=numpy.int32)  # sheet of every shape id
+    sheets[ids] = numpy.arange(1, len(ids) + 1)
+    yield f'{_HEADER}<PageContents xmlns="{_VISIO_MAIN}" xmlns:r="{_RELATIONSHIPS}" xml:space="preserve"><Shapes>'
+    for index, shape in enumerate(result.shapes):
+        yield _vsdx_shape(shape, index + 1, page_height, dpi)
+    connectors = result.connectors or []
+    first_connector = len(result.shapes) + 1
+    for index, connector in enumerate(connectors):
+        yield _vsdx_connector(
+            connector.tail, connector.head, first_connector + index, connector.directed, page_height, dpi
+        )
+    yield "</Shapes>"
+    if connectors:
+        yield "<Connects>"
+        for index, connector in enumerate(connectors):
+            sheet = first_connector + index
+            yield (
+                f'<Connect FromSheet="{sheet}" FromCell="BeginX" FromPart="9" '
+                f'ToSheet="{sheets[connector.source]}" ToCell="PinX" ToPart="3"/>'
+                f'<Connect FromSheet="{sheet}" FromCell="EndX" FromPart="12" '
+                f'ToSheet="{sheets[connector.target]}" ToCell="PinX" ToPart="3"/>'
+            )
+        yield "</Connects>"
+    yield "</PageContents>"
+
+
+def write_vsdx(result: Result, output: Union[str, os.PathLike, BinaryIO], dpi: float = DPI) -> None:
+    """
+    Write the result as a Visio .vsdx drawing - zipped XML, no Visio needed.
+
+    The page is streamed into the archive shape by shape, so memory does not grow with the diagram.
+
+    :param output: path or binary file, it has to be seekable for zipfile.
+    :param dpi: pixels of the image per inch of the page.
+    """
+    width, height = result.size
+    pages = (
+        f'<Pages xmlns="{_VISIO_MAIN}" xmlns:r="{_RELATIONSHIPS}" xml:space="preserve">'
+        '<Page ID="0" NameU="Page-1" Name="Page-1"><PageSheet LineStyle="0" FillStyle="0" TextStyle="0">'
+        f'{_cell("PageWidth", width / dpi)}{_cell("PageHeight", height / dpi)}'
+        '<Cell N="PageScale" V="1" U="IN_F"/><Cell N="DrawingScale" V="1" U="IN_F"/>'
+        '<Cell N="DrawingSizeType" V="0"/></PageSheet><Rel r:id="rId1"/></Page></Pages>'
+    )
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, part in _VSDX_PARTS.items():
+            archive.writestr(name, _HEADER + part)
+        archive.writestr("visio/pages/pages.xml", _HEADER + pages)
+        with archive.open("visio/pages/page1.xml", "w") as page:
+            for chunk in iter_vsdx_page(result, dpi):
+                page.write(chunk.encode("utf-8"))
+
+
+def write_drawio(result: Result, output: TextIO) -> None:
+    """Write the result as draw.io (diagrams.net) XML, one mxCell per shape and connector."""
+    width, height = result.size
+    output.write(
+        '<mxfile host="pic2block"><diagram id="page-1" name="Page-1">'
+        f'<mxGraphModel dx="{width}" dy="{height}" pageWidth="{width}" pageHeight="{height}">'
+        '<root><mxCell id="0"/><mxCell id="1" parent="0"/>\n'
+    )
+    for index, shape in enumerate(result.shapes):
+        left, top, w, h = shape.bbox
+        style = _DRAWIO_STYLES.get(shape.kind, _DRAWIO_STYLES[RECTANGLE])
+        output.write(
+            f'<mxCell id="s{index if shape.id is None else shape.id}" value={saxutils.quoteattr(shape.text or "")} '
+            f'style="{style}" vertex="1" parent="1">'
+            f'<mxGeometry x="{left}" y="{top}" width="{w}" height="{h}" as="geometry"/></mxCell>\n'
+        )
+    for index, connector in enumerate(result.connectors or []):
+        arrow = "classic" if connector.directed else "none"
+        output.write(
+            f'<mxCell id="c{index if connector.id is None else connector.id}" '
+            f'style="edgeStyle=none;html=1;endArrow={arrow};" edge="1" parent="1" '
+            f'source="s{connector.source}" target="s{connector.target}">'
+            '<mxGeometry relative="1" as="geometry">'
+            f'<mxPoint x="{connector.tail[0]}" y="{connector.tail[1]}" as="sourcePoint"/>'
+            f'<mxPoint x="{connector.head[0]}" y="{connector.head[1]}" as="targetPoint"/>'
+            '</mxGeometry></mxCell>\n'
+        )
+    output.write("</root></mxGraphModel></diagram></mxfile>\n")
+
+
+def write_graph_json(result: Result, output: TextIO) -> None:
+    """
+    Write the diagram graph as node-link JSON (networkx.node_link_graph() reads it), a line per node
+    and link.
+    """
+    output.write(f'{{"directed": true, "multigraph": true, "graph": {{"size": {json.dumps(list(result.size))}}},\n')
+    output.write('"nodes": [')
+    for index, shape in enumerate(result.shapes):
+        node = {
+            "id": index if shape.id is None else shape.id,
+            "kind": shape.kind,
+            "text": shape.text,
+            "centre": [shape.x, shape.y],
+            "bbox": list(shape.bbox) if shape.bbox is not None else None,
+        }
+        output.write(("\n" if index == 0 else ",\n") + json.dumps(node))
+    output.write('\n],\n"links": [')
+    for index, connector in enumerate(result.connectors or []):
+        link = {
+            "id": connector.id,
+            "source": connector.source,
+            "target": connector.target,
+            "directed": connector.directed,
+        }
+        output.write(("\n" if index == 0 else ",\n") + json.dumps(link))
+    output.write("\n]}\n")
+
+
+def export_result(result: Result, path: Union[str, os.PathLike], output_format: Optional[str] = None) -> None:
+    """
+    Write the result to path in output_format, one of FORMATS, by default the one of the path extension.
+
+    :raise ValueError: for an unknown format.
+    """
+    path = os.fspath(path)
+    if output_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        output_format = {".xml": DRAWIO, **{ext: name for name, ext in EXTENSIONS.items()}}.get(extension)
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown export format of {path}, use one of: {', '.join(FORMATS)}")
+    if output_format == VSDX:
+        write_vsdx(result, path)
+        return
+    writer: Callable[[Result, TextIO], None] = write_drawio if output_format == DRAWIO else write_graph_json
+    with open(path, "w", encoding="utf-8") as output:
+        writer(result, output)
+
+
+def export_path(image_path: str, directory: str, output_format: str = VSDX) -> str:
+    """
+    Path of the export of an image in directory, mirroring the image path so that equal file names
+    from different directories do not collide, e.g. scans/a/1.png -> directory/scans/a/1.vsdx.
+    """
+    parts = [
+        "_" if part == ".." else part
+        for part in os.path.normpath(os.path.splitdrive(image_path)[1]).split(os.sep)
+        if part not in ("", ".")
+    ]
+    stem = os.path.splitext(os.path.join(directory, *parts))[0]
+    return stem + EXTENSIONS[output_format]
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from .image_input import IMAGE_EXTENSIONS
+from .lazy import cv2, numpy
+from .recognition import Recognition
+from .result import Result
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v", ".gif")
+
+FrameSource = Union[str, os.PathLike, int]
+
+
+def iter_frames(source: FrameSource, step: int = 1) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """
+    Decode pages of a multi-page image or frames of a video one at a time.
+
+    Images (IMAGE_EXTENSIONS, e.g. a multi-page TIFF from a document scanner) are read page by page
+    with cv2.imreadmulti(), anything else - videos, animations, a camera index - with
+    cv2.VideoCapture. Only the frame being yielded is held in memory.
+
+    :param source: path to the file or the index of a camera.
+    :param step: decode every step-th page or frame only; skipped video frames are grabbed, not decoded.
+    :return: Iterator over the number of the page or frame and the frame as BGR image
+    """
+    if isinstance(source, int):
+        yield from _video_frames(cv2.VideoCapture(source), source, step)
+        return
+    path = os.fspath(source)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        raise ValueError(f"Cannot read PDF pages with OpenCV, export them as TIFF or PNG first: {path}")
+    if extension not in IMAGE_EXTENSIONS:
+        yield from _video_frames(cv2.VideoCapture(path), path, step)
+        return
+    pages = cv2.imcount(path) if os.path.isfile(path) else 0
+    if not pages:
+        raise ValueError(f"Cannot read image: {path}")
+    for page in range(0, pages, step):
+        ok, images = cv2.imreadmulti(path, page, 1, flags=cv2.IMREAD_COLOR)
+        if not ok or not images:
+            raise ValueError(f"Cannot read page {page} of {path}")
+        yield page, images[0]
+
+
+def _video_frames(capture: "cv2.VideoCapture", source: FrameSource, step: int) -> Iterator[Tuple[int, numpy.ndarray]]:
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video: {source}")
+    try:
+        index = 0
+        while True:
+            if index % step:
+                if not capture.grab():
+                    return
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    return
+                yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+class FrameChanges:
+    """Decide which frames changed since the last accepted one - the last recognised frame.
+
+    A frame is shrunk to a grayscale thumbnail of size pixels on the longer side; area averaging
+    wipes out sensor noise and compression artefacts, a new block still shows as a thin outline.
+    The frame changed when more than min_change of the thumbnail pixels differ by more than level
+    from the thumbnail of the last accepted frame. Comparing with the last accepted frame, not the
+    previous one, catches slow changes - a block drawn over many frames - too.
+
+    Attributes
+
+    min_change : float
+        Fraction of thumbnail pixels which have to change, 0.001 is a few short strokes in a 1080p frame.
+    level : int
+        Difference of a thumbnail pixel, in gray levels, which counts as a change.
+    size : int
+        Longest side of the thumbnails in pixels, they are as large as a whole shrink factor allows.
+    """
+
+    __slots__ = ("min_change", "level", "size", "_last")
+
+    def __init__(self, min_change: float = 0.001, level: int = 32, size: int = 256):
+        self.min_change = min_change
+        self.level = level
+        self.size = size
+        self._last: Optional[numpy.ndarray] = None
+
+    def thumbnail(self, frame: numpy.ndarray) -> numpy.ndarray:
+        """Grayscale thumbnail of the frame, shrunk by a whole factor - OpenCV averages whole blocks of pixels fast."""
+        height, width = frame.shape[:2]
+        factor = -(-max(height, width) // self.size)
+        if factor > 1:
+            height, width = height // factor, width // factor
+            frame = cv2.resize(
+                frame[: height * factor, : width * factor], (width, height), interpolation=cv2.INTER_AREA
+            )
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def changed(self, frame: numpy.ndarray) -> bool:
+        """Whether the frame changed since the last accepted one; a changed frame is the next one to compare with."""
+        thumbnail = self.thumbnail(frame)
+        last = self._last
+        if last is not None and last.shape == thumbnail.shape:
+            changed_pixels = numpy.count_nonzero(cv2.absdiff(thumbnail, last) > self.level)
+            if changed_pixels <= self.min_change * thumbnail.size:
+                return False
+        self._last = thumbnail
+        return True
+
+
+def changed_frames(
+    frames: Iterable[Tuple[int, numpy.ndarray]], changes: Optional[FrameChanges] = None
+) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """The frames of iter_frames() which changed since the last one yielded, the first one always."""
+    changes = changes or FrameChanges()
+    for index, frame in frames:
+        if changes.changed(frame):
+            yield index, frame
+
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()
+
+
+def read_ahead(items: Iterable, size: int = 4) -> Iterator:
+    """
+    Take items from an iterable in a background thread, at most size of them ahead of the consumer.
+
+    Decoding the next frames (OpenCV releases the GIL) overlaps with recognising the current one,
+    while a fast source cannot fill the memory. An exception of the iterable is raised in the
+    consumer; closing the iterator stops the thread.
+    """
+    buffer: "queue.Queue" = queue.Queue(max(1, size))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as error:  # handed over to the consumer
+            put(_Failure(error))
+            return
+        put(_END)
+
+    thread = threading.Thread(target=produce, name="pic2block-read-ahead", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def recognise_frames(
+    source: FrameSource,
+    recognition: Optional[Recognition] = None,
+    changes: Optional[FrameChanges] = None,
+    step: int = 1,
+    ahead: int = 4,
+) -> Iterator[Tuple[int, Result]]:
+    """
+    Recognise the pages or frames of a source which changed since the last recognised one.
+
+    Frames are decoded and compared (see FrameChanges) in a background thread, at most ahead
+    changed frames in advance; a recording of a whiteboard session costs a recognition per change
+    on the board instead of one per frame. See batch.run_sequences() for many files in a process pool.
+
+    :param source: path to a multi-page image or a video, or a camera index, see iter_frames().
+    :param recognition: Recognition to use, one with the defaults if None.
+    :param changes: FrameChanges deciding which frames are recognised, the defaults if None.
+    :param step: look at every step-th frame only.
+    :param ahead: changed frames decoded in advance.
+    :return: Iterator over the number of the frame and its Result
+    """
+    recognition = recognition or Recognition()
+    for index, frame in read_ahead(changed_frames(iter_frames(source, step), changes), ahead):
+        yield index, recognition.recognise(frame)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import os
+from typing import Union
+
+from .lazy import cv2, numpy
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+ImageSource = Union[str, os.PathLike, bytes, bytearray, memoryview, "numpy.ndarray"]
+
+
+def load_image(source: ImageSource) -> numpy.ndarray:
+    """
+    Turn an image source into a BGR image without writing temporary files.
+
+    :param source: one of
+        - path to the picture file (str or os.PathLike)
+        - encoded picture (PNG, JPG, ...) as bytes, bytearray, memoryview or 1-D uint8 array,
+          decoded in memory with cv2.imdecode
+        - decoded image: BGR (H, W, 3), BGRA (H, W, 4) or grayscale (H, W) array, used without copying
+          when it already is BGR
+    :return: BGR image as a (H, W, 3) uint8 array
+    """
+    if isinstance(source, (str, os.PathLike)):
+        image = cv2.imread(os.fspath(source))
+        if image is None:
+            raise ValueError(f"Cannot read image: {os.fspath(source)}")
+        return image
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = numpy.frombuffer(source, dtype=numpy.uint8)
+    if not isinstance(source, numpy.ndarray):
+        raise TypeError(f"Unsupported image source: {type(source).__name__}")
+
+    if source.ndim == 1:
+        image = cv2.imdecode(source, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Cannot decode image from the given bytes")
+        return image
+    if source.ndim == 2:
+        return cv2.cvtColor(source, cv2.COLOR_GRAY2BGR)
+    if source.ndim == 3 and source.shape[2] == 4:
+        return cv2.cvtColor(source, cv2.COLOR_BGRA2BGR)
+    if source.ndim == 3 and source.shape[2] == 3:
+        return source
+    raise ValueError(f"Unsupported image shape: {source.shape}")
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+from .fingerprint import TILE, Fingerprint
+from .image_input import ImageSource, load_image
+from .lazy import cv2, numpy
+from .metrics import NULL_METRICS, Metrics
+from .recognition import Recognition
+from .result import Result
+from .shape import Shape
+from .spatial import GridIndex
+
+# x0, y0, x1, y1 in pixels
+Box = Tuple[int, int, int, int]
+
+
+def dirty_regions(dirty: numpy.ndarray, size: Tuple[int, int], margin: int, scale: float = 1.0) -> List[Box]:
+    """
+    Bounding boxes of groups of dirty tiles, grown by margin pixels and merged while they overlap.
+
+    :param dirty: (rows, columns) mask from Fingerprint.dirty_tiles().
+    :param size: width, height of the image, boxes are clipped to it.
+    :param scale: scale of the fingerprinted threshold image to the image, boxes are mapped back with it.
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(dirty.astype(numpy.uint8), connectivity=8)
+    width, height = size
+    boxes = [
+        (
+            max(0, int(left * TILE / scale) - margin),
+            max(0, int(top * TILE / scale) - margin),
+            min(width, math.ceil((left + w) * TILE / scale) + margin),
+            min(height, math.ceil((top + h) * TILE / scale) + margin),
+        )
+        for left, top, w, h, _ in stats[1:count].tolist()
+    ]
+    return _merge_boxes(boxes)
+
+
+def _merge_boxes(boxes: List[Box]) -> List[Box]:
+    """Replace overlapping boxes by their union until none overlap."""
+    merged = True
+    while merged:
+        merged = False
+        result: List[Box] = []
+        for box in boxes:
+            for index, other in enumerate(result):
+                if _overlap(box, other):
+                    result[index] = (
+                        min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])
+                    )
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+
+def _overlap(box: Box, other: Box) -> bool:
+    return box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+
+
+def _inside(box: Box, region: Box, size: Tuple[int, int]) -> bool:
+    """True if the box lies in the region, touching its border only where that is the image border."""
+    width, height = size
+    return (
+        (region[0] < box[0] or region[0] == 0)
+        and (region[1] < box[1] or region[1] == 0)
+        and (box[2] < region[2] or region[2] == width)
+        and (box[3] < region[3] or region[3] == height)
+    )
+
+
+def _shape_box(shape: Shape) -> Box:
+    x, y, w, h = shape.bbox
+    return x, y, x + w, y + h
+
+
+class IncrementalRecognition:
+    """Recognise a new version of an image by recognising again only what changed since a previous result.
+
+    The new image is preprocessed once - downscaled and thresholded as by the recognition - and the
+    threshold image is fingerprinted (see Fingerprint), tiles whose checksums differ from
+    result.fingerprint of the previous version are grouped into regions. Shapes of the
+    previous result outside the regions are kept as they are. Every region is grown by the
+    bounding boxes of previous shapes it touches, and the shapes recognised inside it replace
+    them. A re-recognised shape close to a replaced one of the previous result takes over its id,
+    so ids of unchanged blocks stay the same across edits; new shapes get ids never used before.
+    Connectors are found again only where lines reach into the regions, the other ones of the
+    previous result are kept (see ConnectorDetector.detect_changes()).
+
+    When there is no usable previous fingerprint or the regions cover more than max_dirty of the
+    image, the whole image is recognised, ids are still matched with the previous result.
+
+    Attributes
+
+    recognition : Recognition
+        Recognises the regions, with its preprocessing, text reader and connector detector.
+    margin : int
+        Pixels added around dirty tiles, so whole strokes are seen around a change.
+    max_dirty : float
+        Fraction of the image area above which a full pass is cheaper.
+    match_distance : float
+        Maximal distance of centres for a re-recognised shape to keep the id of a previous one.
+    """
+
+    def __init__(
+        self,
+        recognition: Optional[Recognition] = None,
+        margin: int = TILE,
+        max_dirty: float = 0.5,
+        match_distance: float = 16,
+    ):
+        self.recognition = recognition or Recognition()
+        self.margin = margin
+        self.max_dirty = max_dirty
+        self.match_distance = match_distance
+
+    def recognise(self, image: ImageSource, previous: Optional[Result] = None) -> Result:
+        """
+        Recognise the image, reusing the previous result of an earlier version of it.
+
+        :param image: path, encoded bytes or decoded image, see load_image()
+        :param previous: Result of an earlier version with its fingerprint, e.g. from Result.from_dict().
+        :return: Result with a fingerprint for the next version
+        """
+        recognition = self.recognition
+        metrics = Metrics() if recognition.metrics is not None else NULL_METRICS
+        begin = metrics.clock()
+        image = load_image(image)
+        metrics.add_time("load", begin)
+
+        start = metrics.clock()
+        binary, scale = recognition._preprocess(image)
+        metrics.add_time("preprocess", start)
+        start = metrics.clock()
+        fingerprint = Fingerprint.of(binary, recognition.parameters())
+        height, width = image.shape[:2]
+        dirty = None
+        if previous is not None and previous.fingerprint is not None and tuple(previous.size) == (width, height):
+            dirty = fingerprint.dirty_tiles(previous.fingerprint)
+        regions = dirty_regions(dirty, (width, height), self.margin, scale) if dirty is not None else None
+        metrics.add_time("diff", start)
+
+        if regions is not None:
+            regions, kept = self._grow_regions(regions, previous.shapes, self.margin, (width, height))
+            if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions) > self.max_dirty * width * height:
+                regions = None
+        fresh = []
+        if regions is None:  # a full pass, the whole image is the one region
+            kept = []
+            fresh.extend(recognition._iter_preprocessed(image, binary, scale, metrics=metrics))
+            metrics.count("dirty_regions")
+        else:
+            if regions:  # searched in the whole threshold image, so contours are pruned as in a full pass
+                fresh.extend(recognition._iter_preprocessed(image, binary, scale, metrics=metrics, regions=regions))
+            metrics.count("dirty_regions", len(regions))
+        shapes, next_id = self._assign_ids(kept, fresh, previous)
+        if recognition.text_reader is not None:
+            recognition.text_reader.read(image, fresh, metrics)
+        result = Result(shapes, (width, height), fingerprint=fingerprint, next_id=next_id)
+        if recognition.connector_detector is not None:
+            result.connectors = recognition.connector_detector.detect_changes(
+                binary,
+                scale,
+                shapes,
+                previous.connectors if regions is not None else None,
+                [shape.id for shape in kept],
+                regions,
+                metrics,
+            )
+        if recognition.metrics is not None:
+            metrics.add_time("total", begin)
+            result.metrics = metrics
+            recognition.metrics.add(metrics)
+        return result
+
+    @staticmethod
+    def _grow_regions(
+        regions: List[Box], shapes: Sequence[Shape], margin: int, size: Tuple[int, int]
+    ) -> Tuple[List[Box], List[Shape]]:
+        """
+        Grow regions to take in whole previous shapes they touch - their boxes, the inside of the stroke,
+        grown by margin - and merge the ones which overlap then.
+
+        Growing once is enough. A shape only cut by a grown region did not change, it is kept, and
+        recognising the region drops it, as it touches the region border.
+
+        :return: regions, previous shapes which are not inside any of them
+        """
+        width, height = size
+        boxes = [_shape_box(shape) for shape in shapes]
+        grown = []
+        for region in regions:
+            touched = [box for box in boxes if _overlap(box, region)]
+            grown.append(
+                (
+                    max(0, min([region[0]] + [box[0] - margin for box in touched])),
+                    max(0, min([region[1]] + [box[1] - margin for box in touched])),
+                    min(width, max([region[2]] + [box[2] + margin for box in touched])),
+                    min(height, max([region[3]] + [box[3] + margin for box in touched])),
+                )
+            )
+        regions = _merge_boxes(grown)
+        kept = [
+            shape for shape, box in zip(shapes, boxes) if not any(_inside(box, region, size) for region in regions)
+        ]
+        return regions, kept
+
+    def _assign_ids(
+        self, kept: List[Shape], fresh: List[Shape], previous: Optional[Result]
+    ) -> Tuple[List[Shape], int]:
+        """
+        Give fresh shapes the id of the closest replaced previous shape, or a new one counted on from
+        previous.next_id, so ids of shapes deleted in any earlier version are not reused.
+
+        :return: all shapes by id, the id of the next new shape
+        """
+        shapes = previous.shapes if previous is not None else []
+        kept_ids = {shape.id for shape in kept}
+        replaced = GridIndex(self.match_distance)
+        for shape in shapes:
+            if shape.id not in kept_ids:
+                replaced.insert(shape.x, shape.y, shape)
+        next_id = max((shape.id for shape in shapes if shape.id is not None), default=-1) + 1
+        if previous is not None and previous.next_id is not None:
+            next_id = max(next_id, previous.next_id)
+        taken = set()
+        for shape in fresh:
+            candidates = [
+                old for old in replaced.query(shape.x, shape.y, self.match_distance) if old.id not in taken
+            ]
+            if candidates:
+                match = min(
+                    candidates,
+                    key=lambda old: (old.kind != shape.kind, (old.x - shape.x) ** 2 + (old.y - shape.y) ** 2),
+                )
+                shape.id = match.id
+                taken.add(match.id)
+            else:
+                shape.id = next_id
+                next_id += 1
+        return sorted(kept + fresh, key=lambda shape: shape.id), next_id
@@ -0,0 +1,321 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .config_log import logger
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    enqueued REAL NOT NULL,
+    finished REAL,
+    seconds REAL,
+    error TEXT,
+    record TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished);
+"""
+
+
+class Job(NamedTuple):
+    """An image claimed by a worker."""
+
+    id: int
+    path: str
+    attempts: int
+
+
+def worker_name() -> str:
+    """Name of this process in the queue: host and process id, unique across the nodes sharing it."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """Persistent queue of images to recognise, in one SQLite file - no broker or server.
+
+    Every image is a job: enqueue() adds it as pending once, however often the same path is enqueued,
+    so a backfill can be restarted with the same inputs and completed images are skipped. A worker
+    claim()s jobs, which makes them running under a lease of lease_seconds, renew()s the leases
+    while it works on them (see LeaseKeeper) and complete()s or fail()s them. A job whose lease
+    expired - its worker crashed or the node went away - is claimed again by any worker; after
+    max_attempts claims it fails for good, so one image which kills its worker cannot stop the
+    backfill. A fail()ed job is claimed again after retry_delay seconds, until it has no attempts
+    left. complete() and fail() of a worker which lost its lease change nothing.
+
+    Many processes on many nodes can share the file over a filesystem with working POSIX locks.
+    Claims are serialised by BEGIN IMMEDIATE transactions, others wait up to timeout seconds for
+    the lock. The rollback journal is used, not WAL, as WAL needs memory shared by all processes on one host.
+
+    Attributes
+
+    path : str
+        The SQLite file, created when missing.
+    lease_seconds : float
+        Time from a claim or renewal after which others may take the job - how long images of a
+        crashed worker wait.
+    max_attempts : int
+        Claims of a job before it is failed.
+    retry_delay : float
+        Time before a failed job with attempts left can be claimed again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+        retry_delay: float = 60,
+        timeout: float = 60,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=DELETE")
+        with self._transaction() as connection:
+            for statement in filter(str.strip, _SCHEMA.split(";")):
+                connection.execute(statement)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction which takes the lock at once, so two claims never see the same pending jobs."""
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._connection
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def enqueue(self, paths: Iterable[str], chunk_size: int = 10000) -> int:
+        """
+        Add images as pending jobs, skipping paths already in the queue in any state.
+
+        :return: number of new jobs
+        """
+        added = 0
+        chunk: List[str] = []
+        for path in paths:
+            chunk.append(path)
+            if len(chunk) == chunk_size:
+                added += self._insert(chunk)
+                chunk = []
+        return added + self._insert(chunk) if chunk else added
+
+    def _insert(self, paths: List[str]) -> int:
+        now = time.time()
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO jobs (path, enqueued) VALUES (?, ?)", ((path, now) for path in paths)
+            )
+            return connection.total_changes - before
+
+    def claim(self, worker: str, count: int = 1) -> List[Job]:
+        """
+        Take up to count jobs for the worker: pending ones first - failed ones only after their retry
+        delay - then ones with an expired lease. Expired jobs without attempts left are failed on the way.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = ?, error = 'lease expired ' || attempts || ' times', finished = ?"
+                " WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, RUNNING, now, self.max_attempts),
+            )
+            rows = connection.execute(
+                "SELECT id, path, attempts FROM jobs WHERE state = ? AND (lease_until IS NULL OR lease_until <= ?)"
+                " ORDER BY id LIMIT ?",
+                (PENDING, now, count),
+            ).fetchall()
+            if len(rows) < count:
+                rows += connection.execute(
+                    "SELECT id, path, attempts FROM jobs WHERE state = ? AND lease_until < ? ORDER BY id LIMIT ?",
+                    (RUNNING, now, count - len(rows)),
+                ).fetchall()
+            connection.executemany(
+                "UPDATE jobs SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                ((RUNNING, worker, now + self.lease_seconds, job_id) for job_id, _, _ in rows),
+            )
+        return [Job(job_id, path, attempts + 1) for job_id, path, attempts in rows]
+
+    def renew(self, jobs: Iterable[Job], worker: str) -> int:
+        """Extend the leases of jobs the worker still holds by lease_seconds from now. Return their number."""
+        lease_until = time.time() + self.lease_seconds
+        with self._transaction() as connection:
+            cursor = connection.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND state = ? AND worker = ?",
+                ((lease_until, job.id, RUNNING, worker) for job in jobs),
+            )
+            return cursor.rowcount
+
+    def complete(self, job: Job, worker: str, record: Optional[Dict] = None, seconds: Optional[float] = None) -> bool:
+        """
+        Mark a job of the worker done and keep its result record.
+
+        :return: False if the worker no longer holds the job - its lease expired and it was claimed again
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = ?, finished = ?, seconds = ?, error = NULL, record = ?"
+                " WHERE id = ? AND state = ? AND worker = ?",
+                (
+                    DONE, time.time(), seconds, json.dumps(record) if record is not None else None,
+                    job.id, RUNNING, worker,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job: Job, worker: str, error: str, seconds: Optional[float] = None) -> bool:
+        """
+        Give a job of the worker up: pending again after retry_delay while it has attempts left, failed otherwise.
+
+        :return: False if the worker no longer holds the job
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, lease_until = ?,"
+                " finished = ?, seconds = ?, error = ? WHERE id = ? AND state = ? AND worker = ?",
+                (
+                    self.max_attempts, PENDING, FAILED, now + self.retry_delay, now, seconds, error,
+                    job.id, RUNNING, worker,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def retry_failed(self) -> int:
+        """Make failed jobs pending again with all attempts, e.g. after a fix. Return their number."""
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, lease_until = NULL WHERE state = ?", (PENDING, FAILED)
+            ).rowcount
+
+    def records(self, page_size: int = 1000) -> Iterator[Dict]:
+        """
+        Result records of done jobs, in the order they were enqueued.
+
+        Rows are read page_size at a time, each page in a short read, so a long export does not hold
+        the lock which workers need to commit.
+        """
+        last = 0
+        while True:
+            rows = self._connection.execute(
+                "SELECT id, record FROM jobs WHERE state = ? AND id > ? ORDER BY id LIMIT ?", (DONE, last, page_size)
+            ).fetchall()
+            if not rows:
+                return
+            for _, record in rows:
+                if record is not None:
+                    yield json.loads(record)
+            last = rows[-1][0]
+
+    def stats(self, window: float = 300) -> Dict:
+        """
+        Progress of the queue: jobs per state, throughput over the last window seconds - overall and
+        per worker - and the most common errors of failed jobs.
+        """
+        connection = self._connection
+        states = dict.fromkeys((PENDING, RUNNING, DONE, FAILED), 0)
+        states.update(connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        since = time.time() - window
+        workers = dict(
+            connection.execute(
+                "SELECT worker, COUNT(*) FROM jobs WHERE state = ? AND finished >= ? GROUP BY worker", (DONE, since)
+            ).fetchall()
+        )
+        seconds = connection.execute("SELECT AVG(seconds) FROM jobs WHERE state = ?", (DONE,)).fetchone()[0]
+        errors = connection.execute(
+            "SELECT error, COUNT(*) AS count FROM jobs WHERE state = ? GROUP BY error ORDER BY count DESC LIMIT 10",
+            (FAILED,),
+        ).fetchall()
+        return {
+            **states,
+            "images_per_second": sum(workers.values()) / window,
+            "workers": {worker: done / window for worker, done in workers.items()},
+            "seconds_per_image": seconds,
+            "errors": dict(errors),
+        }
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class LeaseKeeper:
+    """Renews the leases of a worker's jobs from a background thread while it works on them.
+
+    Without it an image which takes longer than lease_seconds is claimed again by another worker
+    while the first one still recognises it. Leases are renewed every lease_seconds / 3 over a
+    connection of the thread's own. When the worker process dies the renewals stop with it and its
+    jobs are claimed again once their leases expire; a worker which hangs keeps its jobs.
+
+    Attributes
+
+    worker : str
+        Name of the worker holding the jobs, see worker_name().
+    """
+
+    def __init__(self, path: str, worker: str, lease_seconds: float, timeout: float = 60):
+        self.worker = worker
+        self._held: Dict[int, Job] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._renew, args=(path, lease_seconds, timeout), name="lease-keeper", daemon=True
+        )
+        self._thread.start()
+
+    def hold(self, jobs: Iterable[Job]) -> None:
+        """Keep renewing the leases of the jobs."""
+        with self._lock:
+            self._held.update((job.id, job) for job in jobs)
+
+    def release(self, job: Job) -> None:
+        """Stop renewing the lease of a completed or failed job."""
+        with self._lock:
+            self._held.pop(job.id, None)
+
+    def _renew(self, path: str, lease_seconds: float, timeout: float) -> None:
+        with JobQueue(path, lease_seconds=lease_seconds, timeout=timeout) as queue:  # connections stay in their thread
+            while not self._stop.wait(lease_seconds / 3):
+                with self._lock:
+                    jobs = list(self._held.values())
+                if not jobs:
+                    continue
+                try:
+                    queue.renew(jobs, self.worker)
+                except sqlite3.OperationalError as error:  # locked for longer than timeout, try again next time
+                    logger.warning("Cannot renew leases of %s: %s", self.worker, error)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self) -> "LeaseKeeper":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
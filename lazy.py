@@ -0,0 +1,35 @@
+import importlib
+import importlib.util
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule(ModuleType):
+    """Stand-in for a module which is imported at the first access of one of its attributes.
+
+    Importing pic2block, e.g. for main.py --help, the types or a process pool worker which has not
+    got an image yet, does not pay for cv2 and numpy. Once the module is imported its attributes
+    are copied onto this object, so later accesses cost as much as on the module itself.
+
+    Attributes
+
+    __name__ : str
+        Full name of the module, e.g. "xml.sax.saxutils".
+    """
+
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r}>"
+
+
+def optional_module(name: str) -> Optional[LazyModule]:
+    """LazyModule of an optional dependency, None if it is not installed. Only looks the module up."""
+    return LazyModule(name) if importlib.util.find_spec(name) is not None else None
+
+
+cv2 = LazyModule("cv2")
+numpy = LazyModule("numpy")
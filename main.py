@@ -1,11 +1,153 @@
 import argparse
+import json
 import logging
 import os
-from config_log import logger
-from recognition import Recognition
+import sys
+from typing import List, Optional
 
+from .batch import expand_inputs, run_batch, run_queue, run_sequences, write_columnar, write_json_lines
+from .cache import ResultCache
+from .columnar import FORMATS as COLUMNAR_FORMATS, NPY, PARQUET, parquet_available
+from .config_log import configure_logging, logger
+from .connectors import ConnectorDetector
+from .export import FORMATS as EXPORT_FORMATS, VSDX
+from .frames import VIDEO_EXTENSIONS
+from .image_input import IMAGE_EXTENSIONS
+from .jobqueue import JobQueue
+from .lazy import LazyModule
+from .metrics import MetricsRegistry
+from .preprocess import ADAPTIVE, FIXED, OTSU, PreprocessConfig
+from .read_text import TextReader, tesseract_available
+from .recognition import Recognition
+from .service import RecognitionService
 
-parser = argparse.ArgumentParser()
+asyncio = LazyModule("asyncio")
+
+
+parser = argparse.ArgumentParser(
+    prog="pic2block",
+    description="Recognise block diagram shapes. Without INPUTS the sample picture is recognised."
+)
+parser.add_argument(
+    'inputs', nargs='*', metavar='INPUTS',
+    help="Image files, glob patterns or directories to recognise in batch mode. "
+         "Results are written as JSON Lines, one record per image.",
+)
+parser.add_argument(
+    '-j', '--jobs', type=int, default=os.cpu_count(),
+    help="Number of worker processes in batch mode (default: number of CPUs).",
+)
+parser.add_argument(
+    '--ordered', action='store_true',
+    help="Write batch results in input order instead of as soon as every image is done.",
+)
+parser.add_argument(
+    '--cache-dir',
+    help="Directory of the on-disk result cache, so repeated images are not recognised again.",
+)
+parser.add_argument(
+    '-o', '--output', default='-',
+    help="Batch results file, '-' for standard output (default).",
+)
+parser.add_argument(
+    '--columnar', metavar='DIR',
+    help="Append batch results to columnar shards in DIR instead of writing JSON Lines: one row per shape "
+         "with image id, kind, centre, bbox, area and vertex offsets, memory-mappable .npy files by default.",
+)
+parser.add_argument(
+    '--columnar-format', choices=COLUMNAR_FORMATS, default=NPY,
+    help="Format of the --columnar shards: npy or parquet, which needs pyarrow (default: npy).",
+)
+parser.add_argument(
+    '--metrics-out',
+    help="Write stage timings and counters summed over the batch to this file, "
+         "as JSON for a .json file and in the Prometheus text format otherwise. "
+         "Every result line gets its own metrics too. With --queue the sum is over the done images "
+         "whose workers recorded metrics, --worker records them.",
+)
+parser.add_argument(
+    '--ocr', nargs='?', const='eng', metavar='LANG',
+    help="Read text inside the blocks with Tesseract in batch and service mode, in LANG (default: eng), "
+         "e.g. --ocr pol+eng. Needs pytesseract and the tesseract program.",
+)
+parser.add_argument(
+    '--connectors', action='store_true',
+    help="Also find lines and arrows between the blocks in batch and service mode, "
+         "every result gets connectors - a directed graph of the shape ids.",
+)
+parser.add_argument(
+    '--export-dir',
+    help="Write a diagram of every image into this directory in batch mode, "
+         "mirroring the input paths, e.g. scans/a.png -> DIR/scans/a.vsdx. Use with --connectors for the lines.",
+)
+parser.add_argument(
+    '--export-format', choices=EXPORT_FORMATS, default=VSDX,
+    help="Format of the exported diagrams: Visio vsdx (no Visio needed), drawio or a json graph (default: vsdx).",
+)
+parser.add_argument(
+    '--frames', action='store_true',
+    help="Treat INPUTS as multi-page images (e.g. TIFF from a scanner) and videos in batch mode: "
+         "recognise only the pages and frames which changed since the last recognised one, "
+         "every result line gets path and frame.",
+)
+parser.add_argument(
+    '--min-change', type=float, default=0.001,
+    help="Fraction of a downsampled frame which has to change for --frames to recognise it again (default: 0.001).",
+)
+parser.add_argument(
+    '--frame-step', type=int, default=1,
+    help="Look at every N-th page or frame only with --frames, e.g. 15 for 2 frames a second of a 30 fps video.",
+)
+parser.add_argument(
+    '--queue', metavar='DB',
+    help="SQLite job queue for long backfills, nodes can share it over a filesystem with working locks. "
+         "INPUTS are enqueued (paths already in the queue are skipped), --worker recognises queued images, "
+         "--results writes the records of done ones to --output; otherwise the progress is printed as JSON.",
+)
+parser.add_argument(
+    '--worker', action='store_true',
+    help="With --queue: recognise queued images in -j processes until the queue is empty. "
+         "Completed images are never recognised again, so a crashed run can just be started again.",
+)
+parser.add_argument(
+    '--wait', type=float, metavar='SECONDS',
+    help="With --worker: poll for new jobs every SECONDS instead of stopping when the queue is empty.",
+)
+parser.add_argument(
+    '--lease', type=float, default=600,
+    help="With --queue: seconds after which images of a worker which stopped renewing their leases, "
+         "e.g. crashed, are taken by others; running workers renew them (default: 600).",
+)
+parser.add_argument(
+    '--retry-failed', action='store_true',
+    help="With --queue: queue the failed images again.",
+)
+parser.add_argument(
+    '--results', action='store_true',
+    help="With --queue: write the records of done images as JSON Lines to --output, or append them to --columnar.",
+)
+parser.add_argument(
+    '--serve', metavar='[HOST:]PORT',
+    help="Run the HTTP recognition service instead, e.g. --serve 8080 or --serve 0.0.0.0:8080. "
+         "POST an image to /recognise; /health and /metrics report the state. -j sets the worker threads.",
+)
+parser.add_argument(
+    '--queue-size', type=int, default=16,
+    help="Recognitions the service accepts on top of the running ones, "
+         "more requests are answered 429 (default: 16).",
+)
+parser.add_argument(
+    '--max-dimension', type=int,
+    help="Downscale images whose longer side is bigger before recognition, e.g. 2000 for phone photos.",
+)
+parser.add_argument(
+    '--threshold', choices=(FIXED, OTSU, ADAPTIVE), default=FIXED,
+    help="Binarisation method, adaptive copes with uneven light on photos (default: fixed).",
+)
+parser.add_argument(
+    '--tile-size', type=int,
+    help="Search contours in overlapping tiles of this size, for very large scans.",
+)
 parser.add_argument(
     '-d', '--debug',
     help="Debugging statements and everything else too.",
@@ -28,22 +170,134 @@ parser.add_argument(
     action="store_const", dest="loglevel", const=logging.CRITICAL,
 )
 
-args = parser.parse_args()
-logging.basicConfig(level=args.loglevel)
-c_handler = logging.StreamHandler()
-c_format = logging.Formatter(
-    "%(asctime)s - line: %(lineno)d - %(levelname)s - %(message)s"
-)
 
-c_handler.setFormatter(c_format)
-# logger.addHandler(c_handler)  # TODO - check the proper setting logging with argparse
+def preprocess_config(args: argparse.Namespace) -> PreprocessConfig:
+    """Build the preprocessing settings from the command line."""
+    return PreprocessConfig(
+        max_dimension=args.max_dimension,
+        threshold=args.threshold,
+        tile_size=args.tile_size,
+    )
+
+
+def batch(args: argparse.Namespace) -> int:
+    """Recognise all images from args.inputs in a process pool. Return exit status 1 if any image failed."""
+    if args.ocr and not tesseract_available():
+        parser.error("--ocr needs pytesseract and the tesseract program in PATH")
+    if args.columnar and args.columnar_format == PARQUET and not parquet_available():
+        parser.error("--columnar-format parquet needs pyarrow")
+    if args.frames:
+        if args.export_dir:
+            parser.error("--export-dir cannot be used with --frames")
+        records = run_sequences(
+            expand_inputs(args.inputs, IMAGE_EXTENSIONS + VIDEO_EXTENSIONS), workers=args.jobs, ordered=args.ordered,
+            min_change=args.min_change, step=args.frame_step, loglevel=args.loglevel, cache_dir=args.cache_dir,
+            preprocess=preprocess_config(args), metrics=bool(args.metrics_out), ocr_lang=args.ocr,
+            connectors=args.connectors,
+        )
+    else:
+        records = run_batch(
+            expand_inputs(args.inputs), workers=args.jobs, ordered=args.ordered, loglevel=args.loglevel,
+            cache_dir=args.cache_dir, preprocess=preprocess_config(args), metrics=bool(args.metrics_out),
+            ocr_lang=args.ocr, connectors=args.connectors, export_dir=args.export_dir,
+            export_format=args.export_format,
+        )
+    metrics = MetricsRegistry() if args.metrics_out else None
+    if args.columnar:
+        summary = write_columnar(records, args.columnar, args.columnar_format, metrics=metrics)
+    elif args.output == '-':
+        summary = write_json_lines(records, metrics=metrics)
+    else:
+        with open(args.output, 'w') as output:
+            summary = write_json_lines(records, output, metrics)
+    if metrics is not None:
+        metrics.write(args.metrics_out)
+    logger.info(
+        "Recognised %s/%s images in %.2fs, %s failed.",
+        summary['images'] - summary['failed'], summary['images'], summary['seconds'], summary['failed'],
+    )
+    return 1 if summary['failed'] else 0
+
+
+def queue(args: argparse.Namespace) -> int:
+    """Enqueue args.inputs, run workers, write results or print the progress of the args.queue job queue."""
+    if args.ocr and not tesseract_available():
+        parser.error("--ocr needs pytesseract and the tesseract program in PATH")
+    if args.columnar and args.columnar_format == PARQUET and not parquet_available():
+        parser.error("--columnar-format parquet needs pyarrow")
+    with JobQueue(args.queue, lease_seconds=args.lease) as jobs:
+        if args.retry_failed:
+            logger.info("Queued %s failed images again.", jobs.retry_failed())
+        if args.inputs:
+            paths = expand_inputs(args.inputs)
+            logger.info("Queued %s new of %s images.", jobs.enqueue(paths), len(paths))
+    if args.worker:
+        summaries = run_queue(
+            args.queue, workers=args.jobs, lease_seconds=args.lease, wait=args.wait, loglevel=args.loglevel,
+            cache_dir=args.cache_dir, preprocess=preprocess_config(args), metrics=bool(args.metrics_out),
+            ocr_lang=args.ocr, connectors=args.connectors, export_dir=args.export_dir,
+            export_format=args.export_format,
+        )
+        for summary in summaries:
+            logger.info("Worker %s stopped: %s done, %s failed.", summary['worker'], summary['done'], summary['failed'])
+    metrics = MetricsRegistry() if args.metrics_out else None
+    with JobQueue(args.queue, lease_seconds=args.lease) as jobs:
+        if args.results and args.columnar:
+            write_columnar(jobs.records(), args.columnar, args.columnar_format, metrics=metrics)
+        elif args.results:
+            if args.output == '-':
+                write_json_lines(jobs.records(), metrics=metrics)
+            else:
+                with open(args.output, 'w') as output:
+                    write_json_lines(jobs.records(), output, metrics)
+        else:
+            if metrics is not None:
+                for record in jobs.records():
+                    if 'metrics' in record:
+                        metrics.add(record['metrics'])
+            print(json.dumps(jobs.stats(), indent=2))
+    if metrics is not None:
+        metrics.write(args.metrics_out)
+    return 0
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the HTTP recognition service until interrupted."""
+    if args.ocr and not tesseract_available():
+        parser.error("--ocr needs pytesseract and the tesseract program in PATH")
+    host, _, port = args.serve.rpartition(':')
+    recognition = Recognition(
+        cache=ResultCache(directory=args.cache_dir) if args.cache_dir else None,
+        preprocess=preprocess_config(args),
+        metrics=MetricsRegistry(),
+        text_reader=TextReader(lang=args.ocr) if args.ocr else None,
+        connector_detector=ConnectorDetector() if args.connectors else None,
+    )
+    service = RecognitionService(recognition, workers=args.jobs, queue_size=args.queue_size)
+    try:
+        asyncio.run(service.serve(host or '127.0.0.1', int(port)))
+    except KeyboardInterrupt:
+        pass
+
 
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the pic2block command and python -m pic2block. Return the exit status."""
+    args = parser.parse_args(argv)
+    configure_logging(args.loglevel)
+    if args.serve:
+        serve(args)
+        return 0
+    if args.queue:
+        return queue(args)
+    if args.inputs:
+        return batch(args)
 
-def main():
-    recognition = Recognition()
+    recognition = Recognition(preprocess=preprocess_config(args))
     recognition.read_image()
     recognition.find_contours()
+    return 0
 
 
-main()
+if __name__ == '__main__':
+    sys.exit(main())
 
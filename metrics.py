@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from typing import Dict, Optional, Union
+
+COUNTERS = {
+    "contours": "Contours found by cv2.findContours.",
+    "tile_border": "Contours skipped because a tile border cuts them.",
+    "pruned": "Contours skipped by the area, aspect and solidity filters.",
+    "nested": "Contours skipped inside already accepted candidates.",
+    "candidates": "Contours approximated by 4 or more than 10 points.",
+    "duplicates": "Classified shapes skipped as duplicates of recognised ones.",
+    "shapes": "Recognised shapes.",
+    "cache_hits": "Results returned from the result cache.",
+    "ocr_sheets": "Sheets of block crops read by Tesseract.",
+    "connectors": "Connectors found between the shapes.",
+    "dirty_regions": "Regions recognised again by incremental recognition.",
+}
+
+
+class Metrics:
+    """Timings and counters of one recognition.
+
+    Attributes
+
+    seconds : Dict[str, float]
+        Wall time per stage: load, preprocess, find_contours, prune, approx, draw, classify, dedup,
+        ocr (reading text), connectors (finding lines between shapes),
+        diff (finding changed regions for incremental recognition) and total.
+    counts : Dict[str, int]
+        Counters from COUNTERS.
+    kinds : Dict[str, int]
+        Classified candidates per shape kind, before duplicates are removed.
+    """
+
+    __slots__ = ("seconds", "counts", "kinds")
+    enabled = True
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.kinds: Dict[str, int] = {}
+
+    @staticmethod
+    def clock() -> float:
+        return time.perf_counter()
+
+    def add_time(self, stage: str, start: float) -> None:
+        """Add the time from start (a clock() value) to the stage."""
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def count_kind(self, kind: str, value: int = 1) -> None:
+        self.kinds[kind] = self.kinds.get(kind, 0) + value
+
+    def to_dict(self) -> Dict:
+        """Plain, JSON serialisable form of the metrics."""
+        return {"seconds": dict(self.seconds), "counts": dict(self.counts), "kinds": dict(self.kinds)}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Metrics":
+        metrics = cls()
+        metrics.seconds.update(data.get("seconds", {}))
+        metrics.counts.update(data.get("counts", {}))
+        metrics.kinds.update(data.get("kinds", {}))
+        return metrics
+
+    def __repr__(self) -> str:
+        return f"Metrics(seconds={self.seconds}, counts={self.counts}, kinds={self.kinds})"
+
+
+class NullMetrics:
+    """Metrics which record nothing - used when instrumentation is off, every call is a no-op."""
+
+    __slots__ = ()
+    enabled = False
+
+    @staticmethod
+    def clock() -> float:
+        return 0.0
+
+    def add_time(self, stage: str, start: float) -> None:
+        pass
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+    def count_kind(self, kind: str, value: int = 1) -> None:
+        pass
+
+    def to_dict(self) -> Dict:
+        return {}
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsRegistry:
+    """Cumulative metrics of many recognitions. Safe to use from many threads.
+
+    Attributes
+
+    images : int
+        Number of added Metrics, one per recognised image.
+    metrics : Metrics
+        Sums of all added timings and counters.
+    """
+
+    def __init__(self, prefix: str = "pic2block"):
+        self.prefix = prefix
+        self.images = 0
+        self.metrics = Metrics()
+        self._lock = threading.Lock()
+
+    def add(self, metrics: Union[Metrics, Dict]) -> None:
+        """Add metrics of one image, a Metrics object or its to_dict() form (e.g. from a worker process)."""
+        if isinstance(metrics, dict):
+            metrics = Metrics.from_dict(metrics)
+        with self._lock:
+            self.images += 1
+            for stage, seconds in metrics.seconds.items():
+                self.metrics.seconds[stage] = self.metrics.seconds.get(stage, 0.0) + seconds
+            for name, value in metrics.counts.items():
+                self.metrics.count(name, value)
+            for kind, value in metrics.kinds.items():
+                self.metrics.count_kind(kind, value)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {"images": self.images, **self.metrics.to_dict()}
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format, all of them are counters."""
+        data = self.to_dict()
+        lines = [
+            f"# HELP {self.prefix}_images_total Recognised images.",
+            f"# TYPE {self.prefix}_images_total counter",
+            f"{self.prefix}_images_total {data['images']}",
+            f"# HELP {self.prefix}_stage_seconds_total Wall time spent in each recognition stage.",
+            f"# TYPE {self.prefix}_stage_seconds_total counter",
+        ]
+        lines += [
+            f'{self.prefix}_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+            for stage, seconds in sorted(data["seconds"].items())
+        ]
+        for name, description in COUNTERS.items():
+            lines += [
+                f"# HELP {self.prefix}_{name}_total {description}",
+                f"# TYPE {self.prefix}_{name}_total counter",
+                f"{self.prefix}_{name}_total {data['counts'].get(name, 0)}",
+            ]
+        lines += [
+            f"# HELP {self.prefix}_candidates_by_kind_total Classified candidates per shape kind.",
+            f"# TYPE {self.prefix}_candidates_by_kind_total counter",
+        ]
+        lines += [
+            f'{self.prefix}_candidates_by_kind_total{{kind="{_escape(kind)}"}} {value}'
+            for kind, value in sorted(data["kinds"].items())
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, output_format: Optional[str] = None) -> None:
+        """Write the metrics to path as "json" or "prometheus" text, by default JSON for a .json file."""
+        output_format = output_format or ("json" if path.endswith(".json") else "prometheus")
+        with open(path, "w") as output:
+            if output_format == "json":
+                json.dump(self.to_dict(), output, indent=2)
+            else:
+                output.write(self.to_prometheus())
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
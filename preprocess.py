@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, Optional, Tuple
+
+from .lazy import cv2, numpy
+
+FIXED = "fixed"
+OTSU = "otsu"
+ADAPTIVE = "adaptive"
+
+
+class PreprocessConfig:
+    """Settings of the preprocessing stage before contours are searched.
+
+    Attributes
+
+    max_dimension : int
+        Downscale images whose longer side is bigger, None keeps the full resolution.
+        Coordinates of recognised shapes are mapped back to the original image.
+    threshold : str
+        FIXED (threshold_value), OTSU (global, picked from the histogram) or ADAPTIVE
+        (local mean over adaptive_block_size pixels, for uneven light on photos).
+    tile_size : int
+        Search contours in tiles of this size (after downscaling) with tile_overlap pixels of
+        overlap, None searches the whole image at once. A shape must fit in the overlap to be
+        recognised whole across tile borders.
+    min_area : float
+        Skip contours enclosing less pixels (of the original image) - text glyphs, noise specks.
+    max_area : float
+        Skip contours enclosing more than this part of the image, None keeps them all. The frame of
+        the page is always skipped; set it for scans with other big boxes which are not blocks,
+        e.g. 0.5 - then an image of a single block filling it gives no shapes. Unlike candidates,
+        skipped contours do not hide their children.
+    max_aspect : float
+        Skip contours with a bounding box longer than max_aspect times its width - lines, arrows.
+    min_solidity : float
+        Skip contours with area / convex hull area under it. Blocks are convex, text is not.
+    draw : bool
+        Draw found contours onto the input image for debugging. The input image is not modified
+        otherwise.
+    """
+
+    __slots__ = (
+        "max_dimension",
+        "threshold",
+        "threshold_value",
+        "adaptive_block_size",
+        "adaptive_c",
+        "tile_size",
+        "tile_overlap",
+        "min_area",
+        "max_area",
+        "max_aspect",
+        "min_solidity",
+        "draw",
+    )
+
+    def __init__(
+        self,
+        max_dimension: Optional[int] = None,
+        threshold: str = FIXED,
+        threshold_value: int = 127,
+        adaptive_block_size: int = 51,
+        adaptive_c: int = 10,
+        tile_size: Optional[int] = None,
+        tile_overlap: int = 256,
+        min_area: float = 200,
+        max_area: Optional[float] = None,
+        max_aspect: float = 15,
+        min_solidity: float = 0.8,
+        draw: bool = False,
+    ):
+        if threshold not in (FIXED, OTSU, ADAPTIVE):
+            raise ValueError(f"Unknown threshold method: {threshold}")
+        self.max_dimension = max_dimension
+        self.threshold = threshold
+        self.threshold_value = threshold_value
+        self.adaptive_block_size = adaptive_block_size
+        self.adaptive_c = adaptive_c
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.min_area = min_area
+        self.max_area = max_area
+        self.max_aspect = max_aspect
+        self.min_solidity = min_solidity
+        self.draw = draw
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def downscale(image: numpy.ndarray, max_dimension: Optional[int]) -> Tuple[numpy.ndarray, float]:
+    """
+    Shrink the image so its longer side is at most max_dimension.
+
+    :return: image (the same object if nothing was done), scale - multiply original coordinates by it.
+    """
+    height, width = image.shape[:2]
+    if not max_dimension or max(height, width) <= max_dimension:
+        return image, 1.0
+    scale = max_dimension / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
+def threshold(gray: numpy.ndarray, config: PreprocessConfig) -> numpy.ndarray:
+    """Binarise the grayscale image with the configured method, white stays 255."""
+    if config.threshold == OTSU:
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    elif config.threshold == ADAPTIVE:
+        binary = cv2.adaptiveThreshold(
+            gray,
+            255,
+            cv2.ADAPTIVE_THRESH_MEAN_C,
+            cv2.THRESH_BINARY,
+            config.adaptive_block_size | 1,  # has to be odd
+            config.adaptive_c,
+        )
+    else:
+        _, binary = cv2.threshold(gray, config.threshold_value, 255, cv2.THRESH_BINARY)
+    return binary
+
+
+def iter_tiles(
+    height: int, width: int, tile_size: Optional[int], overlap: int
+) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Split the image area into overlapping tiles.
+
+    :return: Iterator over x0, y0, x1, y1 of tiles, one tile with the whole area if tile_size is None
+        or the image fits in it.
+    """
+    if not tile_size or (height <= tile_size and width <= tile_size):
+        yield 0, 0, width, height
+        return
+    step = max(1, tile_size - overlap)
+    for y0 in range(0, max(1, height - overlap), step):
+        for x0 in range(0, max(1, width - overlap), step):
+            yield x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height)
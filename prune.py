@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+from .lazy import cv2, numpy
+
+
+def contour_features(contours: Sequence[numpy.ndarray]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Bounding boxes and areas of all contours at once.
+
+    The points of all contours are concatenated, so boxes and the shoelace areas are computed by a
+    few NumPy reductions instead of cv2.boundingRect() and cv2.contourArea() per contour.
+
+    :param contours: contours from cv2.findContours().
+    :return: (N, 4) int array of x, y, w, h and (N,) float array of areas.
+    """
+    lengths = numpy.fromiter((len(contour) for contour in contours), dtype=numpy.intp, count=len(contours))
+    points = numpy.concatenate(contours).reshape(-1, 2)
+    starts = numpy.zeros(len(contours), dtype=numpy.intp)
+    numpy.cumsum(lengths[:-1], out=starts[1:])
+
+    low = numpy.minimum.reduceat(points, starts, axis=0)
+    high = numpy.maximum.reduceat(points, starts, axis=0)
+    bboxes = numpy.hstack([low, high - low + 1])
+
+    following = numpy.arange(1, len(points) + 1)
+    following[starts + lengths - 1] = starts  # the last point of a contour closes it
+    x, y = points[:, 0].astype(numpy.float64), points[:, 1].astype(numpy.float64)
+    areas = numpy.abs(numpy.add.reduceat(x * y[following] - x[following] * y, starts)) / 2
+    return bboxes, areas
+
+
+def parents_first(parents: numpy.ndarray) -> numpy.ndarray:
+    """
+    Order of contours in which every parent comes before its children.
+
+    cv2.findContours() numbers contours in raster order of their first pixel, which already puts
+    parents first - then the indices are returned as they are.
+
+    :param parents: (N,) parent index of every contour, -1 for top level ones (hierarchy[0][:, 3]).
+    """
+    indices = numpy.arange(len(parents))
+    if (parents < indices).all():
+        return indices
+    depth = numpy.zeros(len(parents), dtype=numpy.intp)
+    ancestors = parents.copy()
+    while (ancestors >= 0).any():
+        depth += ancestors >= 0
+        ancestors = numpy.where(ancestors >= 0, parents[ancestors], -1)
+    return numpy.argsort(depth, kind="stable")
+
+
+def prune_contours(
+    contours: Sequence[numpy.ndarray],
+    tile: Tuple[int, int, int, int],
+    size: Tuple[int, int],
+    min_area: float,
+    max_area: Optional[float],
+    max_aspect: float,
+    min_solidity: float,
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Cheap filters for contours which cannot be blocks of a diagram, before any per-contour approximation.
+
+    Dropped are: the frame of the tile (the whole image without tiles), contours cut by an inner
+    tile border (they are found whole in the overlapping tile), contours smaller than min_area
+    (text glyphs, noise specks) or bigger than max_area unless it is None, with a bounding box
+    longer than max_aspect times its width (lines, arrows) and concave ones with area / convex hull
+    area under min_solidity. Solidity needs a convex hull per contour, so it is computed only for
+    contours which pass the other filters.
+
+    :param contours: contours from cv2.findContours(), with the tile offset applied.
+    :param tile: x0, y0, x1, y1 of the searched area.
+    :param size: width, height of the whole image.
+    :return: (N,) mask of contours to keep, (N,) mask of contours cut by a tile border.
+    """
+    x0, y0, x1, y1 = tile
+    width, height = size
+    bboxes, areas = contour_features(contours)
+    left, top, w, h = bboxes.T
+    right, bottom = left + w, top + h
+
+    frame = (left == x0) & (top == y0) & (right == x1) & (bottom == y1)
+    border = ((left == x0) & (x0 > 0)) | ((top == y0) & (y0 > 0)) | (
+        (right == x1) & (x1 < width)) | ((bottom == y1) & (y1 < height))
+    aspect = numpy.maximum(w, h) / numpy.minimum(w, h)
+    keep = ~frame & ~border & (areas >= min_area) & (aspect <= max_aspect)
+    if max_area is not None:
+        keep &= areas <= max_area
+
+    if min_solidity > 0:
+        indices = numpy.flatnonzero(keep)
+        hull_areas = [cv2.contourArea(cv2.convexHull(contours[index])) for index in indices.tolist()]
+        keep[indices] = areas[indices] >= min_solidity * numpy.array(hull_areas, dtype=numpy.float64)
+    return keep, border & ~frame
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .lazy import cv2, numpy, optional_module
+from .metrics import NULL_METRICS, Metrics, NullMetrics
+from .shape import Shape
+
+pytesseract = optional_module("pytesseract")  # OCR is optional, recognition works without it
+
+# x, y, width, height of a crop on a sheet
+Placement = Tuple[int, int, int, int]
+
+
+def tesseract_available() -> bool:
+    """True if pytesseract is installed and finds the tesseract program."""
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except (pytesseract.TesseractNotFoundError, OSError):
+        return False
+    return True
+
+
+def crop_regions(image: numpy.ndarray, shapes: Sequence[Shape], min_height: int = 48) -> List[numpy.ndarray]:
+    """
+    Cut the inside of every shape out of the decoded image, as grayscale with a white background.
+
+    Pixels outside the shape and its outline stroke are whitened, so the border of a block is not
+    read as characters. Crops lower than min_height are enlarged, Tesseract reads small text badly.
+
+    :param image: BGR image the shapes were recognised in.
+    :param shapes: Shape records with vertices or an ellipse and bbox in the image coordinates.
+    :return: uint8 crops in the order of shapes.
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    crops = []
+    for shape in shapes:
+        x, y, w, h = shape.bbox
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, width), min(y + h, height)
+        if x1 <= x0 or y1 <= y0:
+            crops.append(numpy.full((1, 1), 255, numpy.uint8))
+            continue
+        inside = numpy.zeros((y1 - y0, x1 - x0), numpy.uint8)
+        if shape.ellipse is not None:
+            (cx, cy), axes, angle = shape.rotated_rect
+            cv2.ellipse(inside, ((cx - x0, cy - y0), axes, angle), 255, -1)
+        else:
+            cv2.fillPoly(inside, [shape.vertices.reshape(-1, 1, 2) - (x0, y0)], 255)
+        stroke = max(3, round(0.06 * min(w, h)))
+        inside = cv2.erode(
+            inside, numpy.ones((2 * stroke + 1, 2 * stroke + 1), numpy.uint8), borderType=cv2.BORDER_CONSTANT, borderValue=0
+        )
+        crop = numpy.where(inside > 0, gray[y0:y1, x0:x1], numpy.uint8(255))
+        if crop.shape[0] < min_height:
+            factor = min_height / crop.shape[0]
+            crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+        crops.append(crop)
+    return crops
+
+
+def pack_sheets(
+    crops: Sequence[numpy.ndarray], max_width: int = 2000, max_height: int = 4000, gap: int = 40
+) -> List[Tuple[numpy.ndarray, List[Tuple[int, Placement]]]]:
+    """
+    Pack crops into as few white sheets as possible, row by row.
+
+    The gap keeps words of neighbouring crops apart, so Tesseract does not join them. A crop wider
+    than max_width gets a row (or a sheet) of its own.
+
+    :return: list of sheets with (index of the crop, placement on the sheet) pairs.
+    """
+    layouts: List[List[Tuple[int, Placement]]] = [[]]
+    x = y = row_height = 0
+    for index, crop in enumerate(crops):
+        h, w = crop.shape[:2]
+        if x and x + w + 2 * gap > max_width:
+            x, y, row_height = 0, y + row_height + gap, 0
+        if layouts[-1] and y + h + 2 * gap > max_height:
+            layouts.append([])
+            x = y = row_height = 0
+        layouts[-1].append((index, (gap + x, gap + y, w, h)))
+        x += gap + w
+        row_height = max(row_height, h)
+
+    sheets = []
+    for layout in layouts:
+        if not layout:
+            continue
+        sheet_width = max(left + w for _, (left, _, w, _) in layout) + gap
+        sheet_height = max(top + h for _, (_, top, _, h) in layout) + gap
+        sheet = numpy.full((sheet_height, sheet_width), 255, numpy.uint8)
+        for index, (left, top, w, h) in layout:
+            sheet[top:top + h, left:left + w] = crops[index]
+        sheets.append((sheet, layout))
+    return sheets
+
+
+def assign_words(data: Dict[str, List], layout: List[Tuple[int, Placement]], min_confidence: float = 30) -> Dict[int, str]:
+    """
+    Map words of pytesseract.image_to_data(..., output_type=Output.DICT) back to the crops of a sheet.
+
+    A word belongs to the crop its centre lies in. Words of a crop are joined into lines by their
+    vertical position, lines are separated by a new line.
+
+    :return: text per index of the crop, crops without words are missing.
+    """
+    words: Dict[int, List[Tuple[float, float, float, str]]] = {}
+    for text, conf, left, top, width, height in zip(
+        data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]
+    ):
+        text = str(text).strip()
+        if not text or float(conf) < min_confidence:
+            continue
+        cx, cy = left + width / 2, top + height / 2
+        for index, (x, y, w, h) in layout:
+            if x <= cx < x + w and y <= cy < y + h:
+                words.setdefault(index, []).append((cy, height, cx, text))
+                break
+    return {index: _join_lines(region) for index, region in words.items()}
+
+
+def _join_lines(words: List[Tuple[float, float, float, str]]) -> str:
+    """Join (centre y, height, centre x, text) words into lines, top to bottom and left to right."""
+    lines: List[List[Tuple[float, float, float, str]]] = []
+    for word in sorted(words):
+        if lines and abs(word[0] - lines[-1][0][0]) < lines[-1][0][1] / 2:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return "\n".join(" ".join(text for _, _, _, text in sorted(line, key=lambda word: word[2])) for line in lines)
+
+
+class TextReader:
+    """Read text inside recognised shapes with Tesseract, many blocks per Tesseract call.
+
+    Crops of all shapes of an image are packed into sheets (see pack_sheets()) and every sheet is read
+    by one image_to_data() call, on a bounded pool of threads reused for every image. The Tesseract
+    command line program cannot stay loaded between calls, so a diagram with 50 blocks takes one
+    process per sheet instead of one per block.
+
+    Attributes
+
+    lang : str
+        Tesseract language(s), e.g. "eng" or "pol+eng".
+    config : str
+        Extra Tesseract options, page segmentation 11 (sparse text) by default.
+    min_confidence : float
+        Words recognised with lower confidence are dropped.
+    """
+
+    def __init__(
+        self,
+        lang: str = "eng",
+        workers: Optional[int] = None,
+        config: str = "--psm 11",
+        min_confidence: float = 30,
+        max_sheet_width: int = 2000,
+        max_sheet_height: int = 4000,
+    ):
+        if pytesseract is None:
+            raise ImportError("Reading text needs pytesseract and the tesseract program: pip install pytesseract")
+        self.lang = lang
+        self.config = config
+        self.min_confidence = min_confidence
+        self.max_sheet_width = max_sheet_width
+        self.max_sheet_height = max_sheet_height
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or min(4, os.cpu_count() or 1), thread_name_prefix="tesseract"
+        )
+        self._lock = threading.Lock()
+        self.sheets = 0
+        self.regions = 0
+        self.seconds = 0.0
+
+    def parameters(self) -> Dict:
+        """Parameters which change the read text, a part of the result cache key."""
+        return {"lang": self.lang, "config": self.config, "min_confidence": self.min_confidence}
+
+    def read(
+        self,
+        image: numpy.ndarray,
+        shapes: Sequence[Shape],
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+    ) -> None:
+        """
+        Set shape.text of every shape to the text inside it, "" if there is none.
+
+        :param image: decoded BGR image the shapes were recognised in, it is not read again.
+        :param metrics: Metrics to record the "ocr" stage time and the number of sheets in.
+        """
+        if not shapes:
+            return
+        start = time.perf_counter()
+        sheets = pack_sheets(crop_regions(image, shapes), self.max_sheet_width, self.max_sheet_height)
+        texts: Dict[int, str] = {}
+        for sheet_texts in self._executor.map(self._read_sheet, sheets):
+            texts.update(sheet_texts)
+        for index, shape in enumerate(shapes):
+            shape.text = texts.get(index, "")
+
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.sheets += len(sheets)
+            self.regions += len(shapes)
+            self.seconds += seconds
+        metrics.add_time("ocr", start)
+        metrics.count("ocr_sheets", len(sheets))
+
+    def _read_sheet(self, sheet: Tuple[numpy.ndarray, List[Tuple[int, Placement]]]) -> Dict[int, str]:
+        image, layout = sheet
+        data = pytesseract.image_to_data(
+            image, lang=self.lang, config=self.config, output_type=pytesseract.Output.DICT
+        )
+        return assign_words(data, layout, self.min_confidence)
+
+    def stats(self) -> Dict:
+        """Counters of the reader, e.g. for logs."""
+        with self._lock:
+            return {"sheets": self.sheets, "regions": self.regions, "seconds": self.seconds}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "TextReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,10 +1,24 @@
-import cv2
-from typing import Dict, List, AnyStr, Tuple
-import numpy
-from config_log import logger
+from __future__ import annotations
 
-from base import AbstractRecognition
-from definitions import RESIZED_SHAPES_PNG
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .base import AbstractRecognition
+from .cache import ResultCache
+from .classify import VERTEX_TOLERANCE, canonicalise_quadrilaterals, classify_ellipsoids, classify_quadrilaterals
+from .config_log import logger
+from .connectors import ConnectorDetector
+from .definitions import RESIZED_SHAPES_PNG
+from .image_input import ImageSource, load_image
+from .lazy import cv2, numpy
+from .metrics import NULL_METRICS, Metrics, MetricsRegistry, NullMetrics
+from .preprocess import PreprocessConfig, downscale, iter_tiles, threshold as preprocess_threshold
+from .prune import parents_first, prune_contours
+from .read_text import TextReader
+from .shape import DIAMOND, ELLIPSOID, INPUT, QUADRILATERAL, RECTANGLE, START_STOP, UNCLASSIFIED_KINDS, Shape
+from .spatial import GridIndex
+
+KIND_PRIORITY = {RECTANGLE: 0, DIAMOND: 1, INPUT: 2, START_STOP: 3}
 
 
 class Recognition(AbstractRecognition):
@@ -21,6 +35,8 @@ class Recognition(AbstractRecognition):
 
     read_image():
     find_contours():
+    iter_shapes():
+    recognise():
 
     Private methods
 
@@ -31,7 +47,15 @@ class Recognition(AbstractRecognition):
     _recognise_quadrilateral():
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        duplicate_tolerance: float = 5,
+        cache: Optional[ResultCache] = None,
+        preprocess: Optional[PreprocessConfig] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        text_reader: Optional[TextReader] = None,
+        connector_detector: Optional[ConnectorDetector] = None,
+    ):
         """Construct the beginning attributes for recognising shapes.
 
         Parameters
@@ -42,25 +66,38 @@ class Recognition(AbstractRecognition):
             x-coordinate from center of the shape.
         y : int
             y-coordinate from center of the shape.
+        shapes : Dict[Tuple[int, int], Shape]
+            Shape records by their centre coordinates.
+        duplicate_tolerance : float
+            distance in pixels under which two centres belong to the same shape.
+        cache : ResultCache
+            optional cache of recognise() results.
+        preprocess : PreprocessConfig
+            downscaling, thresholding, tiling and debug drawing settings.
+        metrics : MetricsRegistry
+            collect timings and counters of every recognise() call, off by default.
+        text_reader : TextReader
+            read text inside the shapes in recognise(), off by default.
+        connector_detector : ConnectorDetector
+            find lines between the shapes in recognise(), off by default.
 
         """
-        self.img: cv2 = None
-        self.x: int = 0
-        self.y: int = 0
-        self.shapes_dictionary: Dict = {}
-        self.rectangles: List = []
-        self.diamonds: List = []
-        self.inputs: List = []
+        super().__init__(
+            duplicate_tolerance=duplicate_tolerance,
+            cache=cache,
+            preprocess=preprocess,
+            metrics=metrics,
+            text_reader=text_reader,
+            connector_detector=connector_detector,
+        )
 
-    def read_image(self, path_to_picture_file: AnyStr = RESIZED_SHAPES_PNG) -> cv2:
-        """Read an image from file.
-        Ask a user if none path was given.
+    def read_image(self, source: ImageSource = RESIZED_SHAPES_PNG) -> cv2:
+        """Read an image from file, encoded bytes or an array, see load_image().
+        Raise ValueError if none source was given or it cannot be read.
         """
-        if not path_to_picture_file:
-            path_to_picture_file = str(
-                input("No path to picture was given. Please insert the proper path.")
-            )
-        self.img = cv2.imread(path_to_picture_file)
+        if source is None or (isinstance(source, str) and not source):
+            raise ValueError("No path to picture was given.")
+        self.img = load_image(source)
         return self.img
 
     def find_contours(
@@ -68,45 +105,270 @@ class Recognition(AbstractRecognition):
     ) -> Tuple:
         """Find contours of shape by given threshold."""
         _, threshold = self._convert_to_gray()
-        contours, _ = cv2.findContours(
-            threshold, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
+
+        for contour, approx, x, y in self._iter_candidates(threshold):  # pruned, parents first
+            logger.debug("\n\n# approx variable: %s\n\n", approx)
+            logger.debug("\n\n# len of approx variable: %s\n\n", len(approx))
+
+            if self.preprocess.draw:
+                cv2.drawContours(self.img, [contour], 0, (255, 0, 0), 5)
+
+            self.x = x
+            self.y = y
+
+            self._store_shape(approx)
+
+        self.classify_shapes()
+        logger.info(
+            "\nself.rectangles %s\nself.diamonds: %s\nself.inputs: %s", self.rectangles, self.diamonds, self.inputs
         )
 
-        i = 0
-        for contour in contours:  # list for storing names of shapes
+    def iter_shapes(
+        self,
+        image: ImageSource,
+        chunk_size: int = 64,
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+        regions: Optional[Sequence[Tuple[int, int, int, int]]] = None,
+    ) -> Iterator[Shape]:
+        """
+        Recognise shapes in the image and yield each one as soon as it is classified.
+
+        Contours are classified in chunks of chunk_size, so the first shapes come out before the whole
+        image is processed. A shape closer than self.duplicate_tolerance to an already yielded one is
+        skipped. Within a chunk rectangles, diamonds, inputs and Start/Stop blocks are yielded in
+        that order of priority, as in find_contours(); across chunks the earlier one wins.
+        Nothing is stored on the instance, so it can be reused for other images, also concurrently
+        from many threads - OpenCV releases the GIL while it works.
+
+        The image is preprocessed according to self.preprocess: downscaled (shapes are mapped back
+        to the original coordinates), thresholded and split into tiles. It is only drawn on when
+        self.preprocess.draw is set.
+
+        :param image: path, encoded bytes or decoded image, see load_image()
+        :param chunk_size: number of shapes classified together
+        :param metrics: Metrics to record stage timings and counters in, nothing is recorded by default
+        :param regions: x0, y0, x1, y1 boxes of the image to search, the whole image if None. Contours
+            are pruned as in the whole image; the ones cut by a region border inside the image are dropped.
+        :return: Iterator over recognised Shape records, shape.id counts from 0
+        """
+        image = load_image(image)
+        start = metrics.clock()
+        threshold, scale = self._preprocess(image)
+        metrics.add_time("preprocess", start)
+        yield from self._iter_preprocessed(image, threshold, scale, chunk_size, metrics, regions)
 
-            if (
-                i == 0
-            ):  # miss 0 because findcontour() function detects whole image as shape
-                i = 1
-                continue
+    def _iter_preprocessed(
+        self,
+        image: numpy.ndarray,
+        threshold: numpy.ndarray,
+        scale: float,
+        chunk_size: int = 64,
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+        regions: Optional[Sequence[Tuple[int, int, int, int]]] = None,
+    ) -> Iterator[Shape]:
+        """
+        iter_shapes() of an image which is preprocessed already, e.g. for its fingerprint.
 
-            approx = cv2.approxPolyDP(
-                contour,
-                0.01 * cv2.arcLength(contour, True),
-                True,  # approximate the shape
-            )
+        :param image: decoded image, drawn on when self.preprocess.draw is set
+        :param threshold: threshold image from _preprocess()
+        :param scale: scale of threshold to the image
+        """
+        recognised = GridIndex(self.duplicate_tolerance)
+        chunk = []
+        for contour, approx, x, y in self._iter_candidates(threshold, scale, metrics, regions):
+            chunk.append(self._make_shape(approx, x, y))
+            if self.preprocess.draw:
+                start = metrics.clock()
+                cv2.drawContours(image, [numpy.round(contour / scale).astype(numpy.int32)], 0, (255, 0, 0), 5)
+                metrics.add_time("draw", start)
+            if len(chunk) == chunk_size:
+                yield from self._recognise_chunk(chunk, recognised, scale, metrics)
+                chunk = []
+        yield from self._recognise_chunk(chunk, recognised, scale, metrics)
+
+    def _preprocess(self, image: numpy.ndarray) -> Tuple[numpy.ndarray, float]:
+        """
+        Convert the BGR image to gray, downscale and binarise it according to self.preprocess.
 
-            logger.debug(f"\n\n# approx variable: {approx}\n\n")
-            logger.debug(
-                f"\n\n# len of approx variable: {len(approx)}\n\n"
-            )  # Logger debug in the future
+        :return: threshold image, scale of it to the original image
+        """
+        gray, scale = downscale(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), self.preprocess.max_dimension)
+        return preprocess_threshold(gray, self.preprocess), scale
 
-            cv2.drawContours(self.img, [contour], 0, (255, 0, 0), 5)
+    def _iter_candidates(
+        self,
+        threshold: numpy.ndarray,
+        scale: float = 1.0,
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+        regions: Optional[Sequence[Tuple[int, int, int, int]]] = None,
+    ) -> Iterator[Tuple[numpy.ndarray, numpy.ndarray, int, int]]:
+        """
+        Find contours which can be shapes, tile by tile when self.preprocess.tile_size is set.
+
+        Contours are pruned by prune_contours() first and visited parents first. Once a contour is
+        a candidate, its children - the inner edge of the stroke, text inside the block - are skipped
+        without any per-contour work.
 
-            M = cv2.moments(contour)
-            logger.debug(f"M center value: {M}")
+        :param threshold: binary image
+        :param scale: scale of threshold to the original image, results are mapped back with it
+        :param regions: x0, y0, x1, y1 boxes of the original image to search, tiled like the whole
+            image; the whole image if None
+        :return: Iterator over contour, approx in original coordinates and the centre x, y
+        """
+        height, width = threshold.shape[:2]
+        min_area = self.preprocess.min_area * scale ** 2
+        max_area = self.preprocess.max_area * width * height if self.preprocess.max_area is not None else None
+        if regions is None:
+            regions = [(0, 0, width, height)]
+        else:
+            regions = [
+                (int(x0 * scale), int(y0 * scale), min(width, round(x1 * scale)), min(height, round(y1 * scale)))
+                for x0, y0, x1, y1 in regions
+            ]
+        tiles = (
+            (left + x0, top + y0, left + x1, top + y1)
+            for left, top, right, bottom in regions
+            for x0, y0, x1, y1 in iter_tiles(
+                bottom - top, right - left, self.preprocess.tile_size, self.preprocess.tile_overlap
+            )
+        )
+        for x0, y0, x1, y1 in tiles:
+            start = metrics.clock()
+            contours, hierarchy = cv2.findContours(
+                threshold[y0:y1, x0:x1], cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0)
+            )
+            metrics.add_time("find_contours", start)
+            if not contours:
+                continue
 
-            x, y = self._find_center_point_of_shape(shape=M)  # TODO - to improve
+            start = metrics.clock()
+            keep, border = prune_contours(
+                contours,
+                (x0, y0, x1, y1),
+                (width, height),
+                min_area,
+                max_area,
+                self.preprocess.max_aspect,
+                self.preprocess.min_solidity,
+            )
+            parents = hierarchy.reshape(-1, 4)[:, 3]
+            order = parents_first(parents)
+            metrics.add_time("prune", start)
+            if metrics.enabled:
+                metrics.count("contours", len(contours))
+                metrics.count("tile_border", int(border.sum()))
+                metrics.count("pruned", int((~keep & ~border).sum()))
+
+            parents, keep = parents.tolist(), keep.tolist()
+            taken = [False] * len(contours)  # the contour or one of its ancestors is a candidate
+            for index in order.tolist():
+                parent = parents[index]
+                if parent >= 0 and taken[parent]:
+                    taken[index] = True
+                    metrics.count("nested", keep[index])
+                    continue
+                if not keep[index]:
+                    continue
+                start = metrics.clock()
+                candidate = self._candidate(contours[index], scale)
+                metrics.add_time("approx", start)
+                if candidate is not None:
+                    taken[index] = True
+                    yield (contours[index],) + candidate
+
+    @staticmethod
+    def _candidate(contour: numpy.ndarray, scale: float = 1.0) -> Optional[Tuple[numpy.ndarray, int, int]]:
+        """
+        Approximate the contour by a polygon - a shape can have 4 or more than 10 points.
 
-            if all(v is not None for v in (x, y)):
-                self.x = x
-                self.y = y
+        :param scale: scale of the contour to the original image, results are mapped back with it
+        :return: approx in original coordinates and the centre x, y, None if it cannot be a shape
+        """
+        approx = cv2.approxPolyDP(
+            contour, 0.01 * cv2.arcLength(contour, True), True
+        )
+        if len(approx) != 4 and len(approx) <= 10:
+            return None
+        moments = cv2.moments(contour)
+        if moments["m00"] == 0.0:
+            return None
+        x = int(moments["m10"] / moments["m00"] / scale)
+        y = int(moments["m01"] / moments["m00"] / scale)
+        if scale != 1.0:
+            approx = numpy.round(approx / scale).astype(numpy.int32)
+        return approx, x, y
+
+    def _recognise_chunk(
+        self,
+        chunk: List[Shape],
+        recognised: GridIndex,
+        scale: float = 1.0,
+        metrics: Union[Metrics, NullMetrics] = NULL_METRICS,
+    ) -> Iterator[Shape]:
+        """
+        Classify a chunk of shapes and yield the ones not recognised before.
 
-            self.recognise_shape(approx)
-        return logger.critical(
-            f"\nself.rectangles {self.rectangles}\nself.diamonds: {self.diamonds}\nself.inputs: {self.inputs}"
+        Vertices of shapes found in a downscaled image are inaccurate by 1 / scale pixels, so the
+        vertex tolerance grows with it.
+        """
+        start = metrics.clock()
+        self._classify_quadrilaterals(
+            [shape for shape in chunk if shape.outline == QUADRILATERAL], VERTEX_TOLERANCE / scale
+        )
+        self._classify_ellipsoids([shape for shape in chunk if shape.kind == ELLIPSOID])
+        metrics.add_time("classify", start)
+        if not metrics.enabled:
+            yield from self._deduplicate(chunk, recognised)
+            return
+
+        metrics.count("candidates", len(chunk))
+        for shape in chunk:
+            metrics.count_kind(shape.kind)
+        start = metrics.clock()
+        shapes = list(self._deduplicate(chunk, recognised))
+        metrics.add_time("dedup", start)
+        metrics.count("duplicates", sum(shape.kind not in UNCLASSIFIED_KINDS for shape in chunk) - len(shapes))
+        metrics.count("shapes", len(shapes))
+        yield from shapes
+
+    def _deduplicate(self, chunk: List[Shape], recognised: GridIndex) -> Iterator[Shape]:
+        """Yield classified shapes of the chunk in KIND_PRIORITY order, skip ones close to recognised shapes."""
+        for shape in sorted(chunk, key=lambda shape: KIND_PRIORITY.get(shape.kind, len(KIND_PRIORITY))):
+            if shape.kind in UNCLASSIFIED_KINDS:
+                continue
+            if recognised.query(shape.x, shape.y, self.duplicate_tolerance):
+                continue
+            shape.id = len(recognised)
+            recognised.insert(shape.x, shape.y, shape)
+            yield shape
+
+    @staticmethod
+    def _classify_quadrilaterals(quadrilaterals: List[Shape], tolerance: float = VERTEX_TOLERANCE) -> None:
+        """Canonicalise vertices and set the kind of all quadrilateral shapes at once."""
+        if not quadrilaterals:
+            return
+        vertices = canonicalise_quadrilaterals(
+            numpy.stack([shape.vertices for shape in quadrilaterals])
         )
+        labels = classify_quadrilaterals(vertices, tolerance)
+        for shape, shape_vertices, label in zip(quadrilaterals, vertices, labels):
+            shape.vertices = shape_vertices
+            shape.kind = label
+
+    @staticmethod
+    def _classify_ellipsoids(ellipsoids: List[Shape]) -> None:
+        """
+        Recognise Start/Stop blocks among ellipsoid shapes at once. Their points are replaced by the
+        ellipse, the others stay ELLIPSOID.
+        """
+        if not ellipsoids:
+            return
+        accepted, ellipses = classify_ellipsoids([shape.vertices for shape in ellipsoids])
+        for shape, start_stop, ellipse in zip(ellipsoids, accepted.tolist(), numpy.round(ellipses, 2).tolist()):
+            if start_stop:
+                shape.kind = START_STOP
+                shape.ellipse = tuple(ellipse)
+                shape.vertices = shape.vertices[:0]
 
     def recognise_quadrilateral(self) -> None:
         """
@@ -116,68 +378,42 @@ class Recognition(AbstractRecognition):
         - if block
 
         By a similarity of xs, ys - make a decision what is the shape look like.
-        If xs, ys does not have any similarity - then return log.error
-
-        Similarity:
-        for (x1,y1), (x2,y2), (x3,y3), (x4,y4)
-            for input: y1==y4, y2==y3,
-            for exercise: x1==x2, y2==y3, x3==x4, y1==y4
-            for if: x1==x3, y2==y4 # TODO Check if better similarities exist
+        All quadrilaterals are checked at once by classify_quadrilaterals(), see there for similarities.
+        If xs, ys does not have any similarity - then log.warning
 
         x and y can be inaccurate between themselves (around 5 pixels)
 
-        Insert centre coordinates into appropriate lists: rectangles, diamonds, inputs.
-        """
-        logger.info(f"Shapes_dictionary: {self.shapes_dictionary}")
-        for key in self.shapes_dictionary.keys():
-            if "Quadrilateral" in self.shapes_dictionary[key]:
-                coordinates = self.shapes_dictionary[key]["Quadrilateral"]
-                coordinates = self.cut_nested_empty_list(coordinates)
-                logger.info(
-                    f"Checking similarities on coordinates: {coordinates}"
-                )  # the order matters
-                if (
-                    abs(coordinates[0][0] - coordinates[1][0]) < 5
-                    and abs(coordinates[1][1] - coordinates[2][1]) < 5
-                    and abs(coordinates[2][0] - coordinates[3][0]) < 5
-                    and abs(coordinates[0][1] == coordinates[3][1]) < 5
-                ):
-                    logger.info(f"Found rectangle at: {key}")
-                    self.rectangles.append(key)
-                elif (
-                    abs(coordinates[0][0] - coordinates[2][0]) < 5
-                    and abs(coordinates[1][1] - coordinates[3][1]) < 5
-                ):  # matrix 4x2
-                    logger.info(f"Found diamond at: {key}")
-                    self.diamonds.append(key)  # romb
-                elif (
-                    abs(coordinates[0][1] - coordinates[3][1]) < 5
-                    and abs(coordinates[1][1] - coordinates[2][1]) < 5
-                ) or (
-                    coordinates[0][0]
-                    != coordinates[1][0]
-                    != coordinates[2][0]
-                    != coordinates[3][0]  # TODO Refactor
-                ):
-                    logger.info(f"Found input at: {key}")
-                    self.inputs.append(key)
-                else:
-                    # raise AttributeError("Inappropriate quadrilateral input!")
-                    logger.warning("No type of quadrilateral found.")
-
-        self.rectangles = list(set(self.rectangles))
-        self.diamonds = list(set(self.diamonds))
-        self.inputs = list(set(self.inputs))
-        self._clear_up_similar_inputs_from_rectangles_and_diamonds()
-
-    def recognise_shape(self, approx: numpy.ndarray) -> Dict:
-        """
-        Make a decision if a shape is quadrilateral or ellipsoid. Create a proper self.shapes_dictionary.
+        Insert Shape records into appropriate lists: rectangles, diamonds, inputs.
+        The lists are rebuilt from self.shapes on every call.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Shapes: %s", list(self.shapes.values()))
+        quadrilaterals = [
+            shape for shape in self.shapes.values() if shape.outline == QUADRILATERAL
+        ]
+        self.rectangles = []
+        self.diamonds = []
+        self.inputs = []
+        self._classify_quadrilaterals(quadrilaterals)
+        lists = {RECTANGLE: self.rectangles, DIAMOND: self.diamonds, INPUT: self.inputs}
+        for shape in quadrilaterals:
+            if shape.kind in lists:
+                lists[shape.kind].append(shape)
+            else:
+                logger.warning("No type of quadrilateral found at: %s", shape.key)
+
+        self._clear_up_similar_shapes()
+
+    def recognise_shape(self, approx: numpy.ndarray, classify: bool = True) -> Dict:
+        """
+        Make a decision if a shape is quadrilateral or ellipsoid. Store a Shape record in self.shapes.
 
         :param approx: List of approximated centres
+        :param classify: Classify the shapes right away. find_contours() only stores the shapes
+            and calls classify_shapes() once, after every contour is collected.
         :return: Dictionaries with quadrilateral and ellipsoid shapes.
 
-        Structure of the dictionary:
+        Structure of the returned (legacy) self.shapes_dictionary view:
 
         {"centre x coordinate, centre y coordinate":{"Type of shape": array(list of points)}}
 
@@ -186,25 +422,53 @@ class Recognition(AbstractRecognition):
             {'Quadrilateral': array([[[477, 384]], [[349, 499]], [[477, 614]],
                 [[605, 499]]])},
         'c.x:332, c.y:215':
-            {'Start/Stop': array([[[144, 210]], [[153, 245]], [[187, 276]],
-                [[313, 310]], [[451, 289]], [[494, 264]], [[168, 169]]],)}}
+            {'Start/Stop': [[332.0, 215.5], [350.2, 141.6], 1.3]}}
+
+        A Start/Stop block is given by its ellipse - centre, axes and angle - once classified.
         """
-        if len(approx) == 4:  # input, exercise, if has 4 points
-            self.shapes_dictionary[f"c.x:{self.x}, c.y:{self.y}"] = {
-                "Quadrilateral": approx.tolist()
-            }  # Quadrilateral
+        self._store_shape(approx)
+        if classify:
+            self.classify_shapes()
+        return self.shapes_dictionary
 
-        elif len(approx) > 10:  # or ellipsoid for Start/Stop - plenty of points
-            self.shapes_dictionary[f"c.x:{self.x}, c.y:{self.y}"] = {
-                "Start/Stop": approx.tolist()
-            }
+    def _store_shape(self, approx: numpy.ndarray) -> Optional[Shape]:
+        """Store a Shape record of the approximation centred at self.x, self.y in self.shapes."""
+        shape = self._make_shape(approx, self.x, self.y)
+        if shape is not None:
+            self.shapes[shape.centre] = shape
+        return shape
 
-        self.recognise_ellipsoid()
-        self.recognise_quadrilateral()
-        return self.shapes_dictionary
+    @staticmethod
+    def _make_shape(approx: numpy.ndarray, x: int, y: int) -> Optional[Shape]:
+        """Create a Shape record of the approximation, None if it is neither quadrilateral nor ellipsoid."""
+        if len(approx) == 4:  # input, exercise, if has 4 points
+            kind = QUADRILATERAL
+        elif len(approx) > 10:  # or ellipsoid for Start/Stop - plenty of points
+            kind = ELLIPSOID
+        else:
+            return None
+
+        vertices = numpy.asarray(approx, dtype=numpy.int32).reshape(-1, 2)
+        return Shape(
+            x,
+            y,
+            kind,
+            vertices,
+            bbox=cv2.boundingRect(vertices),
+            area=cv2.contourArea(vertices),
+        )
 
+    def recognise_ellipsoid(self) -> None:
+        """
+        Recognise Start/Stop blocks - ellipses and stadiums - among the shapes of many points.
 
-    def recognise_ellipsoid(self) -> Dict:
-        pass
-        # TODO https://github.com/Dadoheh/pic2block/issues/17
-        logger.debug("To be done")
+        All of them are checked at once by classify_ellipsoids(), by their area and perimeter against
+        the ones of an ellipse and a stadium of the same size; cv2.fitEllipse() only runs for the
+        ambiguous ones. A Start/Stop block keeps the centre, axes and angle of its ellipse instead of
+        the approximated points. Noisy contours are left unrecognised.
+        """
+        ellipsoids = [shape for shape in self.shapes.values() if shape.kind == ELLIPSOID]
+        self._classify_ellipsoids(ellipsoids)
+        for shape in ellipsoids:
+            if shape.kind == ELLIPSOID:
+                logger.info("No Start/Stop block found at: %s", shape.key)
@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional, Tuple
+
+from .connectors import Connector
+from .fingerprint import Fingerprint
+from .metrics import Metrics
+from .shape import DIAMOND, INPUT, RECTANGLE, START_STOP, Shape
+
+
+class Result:
+    """Shapes recognised in one image.
+
+    Attributes
+
+    shapes : List[Shape]
+        Recognised shapes, ordered by shape.id. Ids are unique; after a full recognition they are the
+        indices in this list, after incremental.IncrementalRecognition they stay the same for
+        unchanged blocks and can have gaps.
+    size : Tuple[int, int]
+        Width and height of the image.
+    connectors : List[Connector]
+        Lines between the shapes - edges of the diagram graph, None unless they were searched for
+        (see connectors.ConnectorDetector).
+    metrics : Metrics
+        Timings and counters of the recognition, None unless the Recognition collects metrics.
+        Not a part of to_dict().
+    fingerprint : Fingerprint
+        Checksums of the image to find changes in its next version, None unless the result comes
+        from incremental.IncrementalRecognition. A part of to_dict() only when set.
+    next_id : int
+        Id the next new shape gets, above every id the diagram ever had - ids of deleted shapes are
+        not given again. None unless the result comes from incremental.IncrementalRecognition.
+        A part of to_dict() only when set.
+    """
+
+    __slots__ = ("shapes", "size", "connectors", "metrics", "fingerprint", "next_id")
+
+    def __init__(
+        self,
+        shapes: List[Shape],
+        size: Tuple[int, int],
+        metrics: Optional[Metrics] = None,
+        connectors: Optional[List[Connector]] = None,
+        fingerprint: Optional[Fingerprint] = None,
+        next_id: Optional[int] = None,
+    ):
+        self.shapes = shapes
+        self.size = size
+        self.connectors = connectors
+        self.metrics = metrics
+        self.fingerprint = fingerprint
+        self.next_id = next_id
+
+    def _of_kind(self, kind: str) -> List[Shape]:
+        return [shape for shape in self.shapes if shape.kind == kind]
+
+    @property
+    def rectangles(self) -> List[Shape]:
+        return self._of_kind(RECTANGLE)
+
+    @property
+    def diamonds(self) -> List[Shape]:
+        return self._of_kind(DIAMOND)
+
+    @property
+    def inputs(self) -> List[Shape]:
+        return self._of_kind(INPUT)
+
+    @property
+    def start_stop(self) -> List[Shape]:
+        return self._of_kind(START_STOP)
+
+    def to_dict(self) -> Dict:
+        """Plain, JSON serialisable form of the result."""
+        data = {
+            "size": list(self.size),
+            "shapes": [shape.to_dict() for shape in self.shapes],
+            "connectors": [connector.to_dict() for connector in self.connectors]
+            if self.connectors is not None else None,
+        }
+        if self.fingerprint is not None:
+            data["fingerprint"] = self.fingerprint.to_dict()
+        if self.next_id is not None:
+            data["next_id"] = self.next_id
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Result":
+        """Create a Result from its to_dict() form."""
+        connectors = data.get("connectors")
+        fingerprint = data.get("fingerprint")
+        return cls(
+            [Shape.from_dict(shape) for shape in data["shapes"]],
+            tuple(data["size"]),
+            connectors=[Connector.from_dict(connector) for connector in connectors] if connectors is not None else None,
+            fingerprint=Fingerprint.from_dict(fingerprint) if fingerprint is not None else None,
+            next_id=data.get("next_id"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    def __repr__(self) -> str:
+        return f"Result({len(self.shapes)} shapes, size={self.size})"
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .config_log import logger
+from .image_input import load_image
+from .lazy import LazyModule
+from .metrics import MetricsRegistry
+from .recognition import Recognition
+from .result import Result
+
+asyncio = LazyModule("asyncio")
+email_parser = LazyModule("email.parser")
+email_policy = LazyModule("email.policy")
+
+MAX_BODY = 32 * 1024 * 1024  # an 8K PNG scan is well under this
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+class HTTPError(Exception):
+    """An error answered to the client with the status and a JSON body."""
+
+    def __init__(self, status: HTTPStatus, message: Optional[str] = None):
+        super().__init__(message or status.phrase)
+        self.status = status
+        self.message = message or status.phrase
+
+
+async def read_request(reader: asyncio.StreamReader, max_body: int = MAX_BODY) -> Optional[Request]:
+    """
+    Read one HTTP/1.1 request with a Content-Length body. Return None when the client closed the connection.
+
+    :raise HTTPError: for a malformed request, a chunked body or a body bigger than max_body.
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Send the image with a Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > max_body:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Images up to {max_body} bytes are accepted")
+    body = await reader.readexactly(length) if length else b""
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return Request(method.upper(), target.partition("?")[0], headers, body, keep_alive)
+
+
+def upload_bytes(content_type: str, body: bytes) -> bytes:
+    """
+    The encoded image of an upload: the raw request body, or the first file of a multipart/form-data form.
+    """
+    if not content_type.lower().startswith("multipart/form-data"):
+        return body
+    header = f"Content-Type: {content_type}\r\n\r\n".encode("latin-1")
+    message = email_parser.BytesParser(policy=email_policy.HTTP).parsebytes(header + body)
+    if message.is_multipart():
+        for part in message.iter_parts():
+            if part.get_filename() is not None:
+                return part.get_payload(decode=True)
+    raise HTTPError(HTTPStatus.BAD_REQUEST, "No file in the form")
+
+
+class RecognitionService:
+    """HTTP service recognising uploaded images, built on asyncio streams.
+
+    The event loop only reads requests and writes responses. Parsing the upload, decoding and
+    recognition run on a bounded pool of threads (OpenCV releases the GIL), so a slow or big image
+    does not block other connections. At most workers + queue_size recognitions are accepted at once, the next ones are
+    answered 429 Too Many Requests right away, so a client can back off instead of waiting for a
+    timeout.
+
+    Endpoints
+
+    POST /recognise
+        The image as the request body (any Content-Type) or as a file of a multipart/form-data form.
+        Answers the Result.to_dict() JSON with ok and seconds, like a batch record.
+    GET /health
+        JSON with status, workers and the number of running and queued recognitions.
+    GET /metrics
+        Stage timings and counters of the recognitions and the service counters, in the Prometheus
+        text format.
+
+    Attributes
+
+    recognition : Recognition
+        Shared by all worker threads, it collects metrics in a MetricsRegistry.
+    workers : int
+        Number of recognitions running at once.
+    queue_size : int
+        Number of accepted recognitions waiting for a worker.
+    """
+
+    def __init__(
+        self,
+        recognition: Optional[Recognition] = None,
+        workers: int = 4,
+        queue_size: int = 16,
+        max_body: int = MAX_BODY,
+        idle_timeout: float = 60,
+    ):
+        self.recognition = recognition or Recognition(metrics=MetricsRegistry())
+        if self.recognition.metrics is None:
+            self.recognition.metrics = MetricsRegistry()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self.pending = 0
+        self.rejected = 0
+        self.responses: Dict[int, int] = {}
+        self.request_seconds = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recognise")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> Tuple[str, int]:
+        """Start listening. Return the bound host and port, port 0 picks a free one."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        address = self._server.sockets[0].getsockname()[:2]
+        logger.info("Listening on http://%s:%s", *address)
+        return address
+
+    async def close(self) -> None:
+        """Stop listening and wait for the running recognitions."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """Serve until cancelled."""
+        await self.start(host, port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close()
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """Run the service on an event loop in a daemon thread, e.g. for tests. Return the bound address."""
+        self._loop = asyncio.new_event_loop()
+        started = self._loop.run_until_complete(self.start(host, port))
+        self._thread = threading.Thread(target=self._loop.run_forever, name="service", daemon=True)
+        self._thread.start()
+        return started
+
+    def stop_thread(self) -> None:
+        """Stop the service started by start_in_thread()."""
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    @property
+    def running(self) -> int:
+        return min(self.pending, self.workers)
+
+    @property
+    def queued(self) -> int:
+        return max(self.pending - self.workers, 0)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer requests of one connection until the client or an error closes it."""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader, self.max_body), self.idle_timeout)
+                except HTTPError as error:
+                    # the body may be left unread, so the connection cannot be reused
+                    await self._respond(writer, error.status, _error_body(error), close=True)
+                    break
+                if request is None:
+                    break
+                start = time.perf_counter()
+                status, body, headers = await self._dispatch(request)
+                await self._respond(writer, status, body, headers, close=not request.keep_alive)
+                self.request_seconds += time.perf_counter() - start
+                if not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Request) -> Tuple[HTTPStatus, bytes, Dict[str, str]]:
+        routes = {
+            "/recognise": ("POST", self._recognise),
+            "/health": ("GET", self._health),
+            "/metrics": ("GET", self._metrics),
+        }
+        try:
+            if request.path not in routes:
+                raise HTTPError(HTTPStatus.NOT_FOUND)
+            method, handler = routes[request.path]
+            if request.method != method:
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {method} {request.path}")
+            return await handler(request)
+        except HTTPError as error:
+            headers = {"Retry-After": "1"} if error.status == HTTPStatus.TOO_MANY_REQUESTS else {}
+            return error.status, _error_body(error), headers
+
+    async def _recognise(self, request: Request) -> Tuple[HTTPStatus, bytes, Dict[str, str]]:
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS, "Recognition queue is full, retry later")
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._recognise_upload, request.headers.get("content-type", ""), request.body
+            )
+        except HTTPError:
+            raise
+        except Exception as error:
+            logger.exception("Recognition failed")
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(error).__name__}: {error}")
+        finally:
+            self.pending -= 1
+        record = {"ok": True, "seconds": time.perf_counter() - start, **result.to_dict()}
+        if result.metrics is not None:
+            record["metrics"] = result.metrics.to_dict()
+        return HTTPStatus.OK, json.dumps(record).encode(), {}
+
+    def _recognise_upload(self, content_type: str, body: bytes) -> Result:
+        """
+        Parse the upload, decode and recognise the image, on a worker thread.
+
+        :raise HTTPError: 400 if there is no image or it cannot be decoded; other errors are not the client's.
+        """
+        image = upload_bytes(content_type, body)
+        if not image:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Send an encoded image as the request body")
+        try:
+            image = load_image(image)
+        except ValueError as error:  # not an image
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+        return self.recognition.recognise(image)
+
+    async def _health(self, request: Request) -> Tuple[HTTPStatus, bytes, Dict[str, str]]:
+        health = {"status": "ok", "workers": self.workers, "running": self.running, "queued": self.queued}
+        return HTTPStatus.OK, json.dumps(health).encode(), {}
+
+    async def _metrics(self, request: Request) -> Tuple[HTTPStatus, bytes, Dict[str, str]]:
+        registry = self.recognition.metrics
+        prefix = registry.prefix
+        lines = [
+            f"# HELP {prefix}_http_responses_total HTTP responses by status code.",
+            f"# TYPE {prefix}_http_responses_total counter",
+        ]
+        lines += [
+            f'{prefix}_http_responses_total{{code="{status}"}} {count}'
+            for status, count in sorted(self.responses.items())
+        ]
+        lines += [
+            f"# HELP {prefix}_http_seconds_total Wall time spent answering HTTP requests.",
+            f"# TYPE {prefix}_http_seconds_total counter",
+            f"{prefix}_http_seconds_total {self.request_seconds:.6f}",
+            f"# HELP {prefix}_rejected_total Recognitions answered 429 because the queue was full.",
+            f"# TYPE {prefix}_rejected_total counter",
+            f"{prefix}_rejected_total {self.rejected}",
+            f"# HELP {prefix}_running Recognitions running now.",
+            f"# TYPE {prefix}_running gauge",
+            f"{prefix}_running {self.running}",
+            f"# HELP {prefix}_queued Recognitions waiting for a worker.",
+            f"# TYPE {prefix}_queued gauge",
+            f"{prefix}_queued {self.queued}",
+        ]
+        body = registry.to_prometheus() + "\n".join(lines) + "\n"
+        return HTTPStatus.OK, body.encode(), {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        close: bool = False,
+    ) -> None:
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        headers["Content-Length"] = str(len(body))
+        headers["Connection"] = "close" if close else "keep-alive"
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+        self.responses[status.value] = self.responses.get(status.value, 0) + 1
+
+
+def _error_body(error: HTTPError) -> bytes:
+    return json.dumps({"ok": False, "error": error.message}).encode()
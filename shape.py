@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+from .lazy import numpy
+
+QUADRILATERAL = "Quadrilateral"
+ELLIPSOID = "Ellipsoid"
+START_STOP = "Start/Stop"
+RECTANGLE = "Rectangle"
+DIAMOND = "Diamond"
+INPUT = "Input"
+
+QUADRILATERAL_KINDS = (QUADRILATERAL, RECTANGLE, DIAMOND, INPUT)
+START_STOP_KINDS = (ELLIPSOID, START_STOP)
+UNCLASSIFIED_KINDS = (QUADRILATERAL, ELLIPSOID)
+
+
+class Shape:
+    """Compact record of a single recognised shape.
+
+    Attributes
+
+    x, y : int
+        Centre of the shape.
+    kind : str
+        QUADRILATERAL until classified, then RECTANGLE, DIAMOND or INPUT; ELLIPSOID for outlines of
+        many points until classified, then START_STOP.
+    vertices : numpy.ndarray
+        (N, 2) int32 array with approximated points of the shape, empty for START_STOP (see ellipse).
+    bbox : Tuple[int, int, int, int]
+        Bounding box as x, y, width, height.
+    area : float
+        Area enclosed by the approximated points.
+    id : int
+        Number of the shape within its Result, None until the shape is recognised.
+    text : str
+        Text inside the shape, None unless it was read (see read_text.TextReader).
+    ellipse : Tuple[float, float, float, float, float]
+        Outline of a START_STOP shape as cx, cy, width, height and angle in degrees, None for others.
+    """
+
+    __slots__ = ("x", "y", "kind", "vertices", "bbox", "area", "id", "text", "ellipse")
+
+    def __init__(
+        self,
+        x: int,
+        y: int,
+        kind: str,
+        vertices: numpy.ndarray,
+        bbox: Optional[Tuple[int, int, int, int]] = None,
+        area: float = 0.0,
+        id: Optional[int] = None,
+        text: Optional[str] = None,
+        ellipse: Optional[Tuple[float, float, float, float, float]] = None,
+    ):
+        self.x = x
+        self.y = y
+        self.kind = kind
+        self.vertices = vertices
+        self.bbox = bbox
+        self.area = area
+        self.id = id
+        self.text = text
+        self.ellipse = ellipse
+
+    @property
+    def centre(self) -> Tuple[int, int]:
+        return self.x, self.y
+
+    @property
+    def outline(self) -> str:
+        """Outline the shape was detected with - QUADRILATERAL or START_STOP."""
+        if self.kind in QUADRILATERAL_KINDS:
+            return QUADRILATERAL
+        return START_STOP if self.kind in START_STOP_KINDS else self.kind
+
+    @property
+    def rotated_rect(self) -> Optional[Tuple[Tuple[float, float], Tuple[float, float], float]]:
+        """The ellipse in the form cv2.ellipse() draws, None if the shape has none."""
+        if self.ellipse is None:
+            return None
+        cx, cy, width, height, angle = self.ellipse
+        return (cx, cy), (width, height), angle
+
+    @property
+    def key(self) -> str:
+        """Legacy string form of the centre, e.g. 'c.x:477, c.y:499'. Only meant for output."""
+        return f"c.x:{self.x}, c.y:{self.y}"
+
+    def to_dict(self) -> Dict:
+        """Plain, JSON serialisable form of the shape."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "centre": [self.x, self.y],
+            "bbox": list(self.bbox) if self.bbox is not None else None,
+            "area": self.area,
+            "vertices": self.vertices.tolist(),
+            "text": self.text,
+            "ellipse": list(self.ellipse) if self.ellipse is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Shape":
+        """Create a Shape from its to_dict() form."""
+        return cls(
+            data["centre"][0],
+            data["centre"][1],
+            data["kind"],
+            numpy.array(data["vertices"], dtype=numpy.int32).reshape(-1, 2),
+            bbox=tuple(data["bbox"]) if data["bbox"] is not None else None,
+            area=data["area"],
+            id=data["id"],
+            text=data.get("text"),
+            ellipse=tuple(data["ellipse"]) if data.get("ellipse") is not None else None,
+        )
+
+    def __repr__(self) -> str:
+        return f"Shape({self.kind}, {self.key})"
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import queue
+import sys
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .lazy import LazyModule, numpy
+
+multiprocessing = LazyModule("multiprocessing")
+resource_tracker = LazyModule("multiprocessing.resource_tracker")
+shared_memory = LazyModule("multiprocessing.shared_memory")
+
+
+class FrameRef(NamedTuple):
+    """Where a worker finds a frame: a few dozen bytes to pickle instead of the pixels."""
+
+    slot: int
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class FramePool:
+    """Shared memory buffers which decoded frames are handed to worker processes in.
+
+    A frame is copied into a free slot once - or decoded right into it, see acquire() - and the
+    worker reads it as a numpy.ndarray view of the same memory, so nothing is pickled but a FrameRef.
+    Slots are reused: release() gives a slot back once its frame is recognised, acquire() waits for
+    a free one, which also bounds the frames in flight. A slot grows (a new buffer replaces it) when a
+    frame does not fit.
+
+    The pool owns the buffers: close() unlinks them, workers only attach with attach_frame().
+
+    Attributes
+
+    slots : int
+        Number of buffers, frames which can be in flight at once.
+    slot_size : int
+        Initial size of a buffer in bytes, buffers are created at first use.
+    """
+
+    def __init__(self, slots: int, slot_size: int = 0):
+        self.slots = slots
+        self.slot_size = slot_size
+        self._buffers: Dict[int, "shared_memory.SharedMemory"] = {}
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+
+    def acquire(
+        self, shape: Tuple[int, ...], dtype="uint8", timeout: Optional[float] = None
+    ) -> Tuple[FrameRef, numpy.ndarray]:
+        """
+        Take a free slot for a frame of the shape and dtype, waiting for one if all are in flight.
+
+        :param timeout: seconds to wait for a free slot, queue.Empty is raised after them; forever if None.
+        :return: reference for the worker, writable view to put the frame into
+        """
+        dtype = numpy.dtype(dtype)
+        size = max(1, int(numpy.prod(shape)) * dtype.itemsize)
+        slot = self._free.get(timeout=timeout)
+        buffer = self._buffers.get(slot)
+        if buffer is None or buffer.size < size:
+            if buffer is not None:
+                _unlink(buffer)
+            buffer = self._buffers[slot] = shared_memory.SharedMemory(create=True, size=max(size, self.slot_size))
+            _owned.add(buffer.name)
+        ref = FrameRef(slot, buffer.name, tuple(shape), dtype.str)
+        return ref, numpy.ndarray(shape, dtype, buffer=buffer.buf)
+
+    def put(self, frame: numpy.ndarray, timeout: Optional[float] = None) -> FrameRef:
+        """Copy the frame into a free slot, see acquire()."""
+        ref, view = self.acquire(frame.shape, frame.dtype, timeout)
+        view[...] = frame
+        return ref
+
+    def release(self, ref: FrameRef) -> None:
+        """Give the slot of a recognised frame back to the pool."""
+        self._free.put(ref.slot)
+
+    def close(self) -> None:
+        """Unlink all buffers. Views from acquire() must not be used after it."""
+        for buffer in self._buffers.values():
+            _unlink(buffer)
+        self._buffers.clear()
+
+    def __enter__(self) -> "FramePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _unlink(buffer: "shared_memory.SharedMemory") -> None:
+    try:
+        buffer.close()
+    except BufferError:  # a view is still alive, the mapping goes with it
+        pass
+    buffer.unlink()
+    _owned.discard(buffer.name)
+
+
+_owned = set()  # names of the buffers created by pools of this process
+_attached: Dict[int, "shared_memory.SharedMemory"] = {}  # buffer of every slot this worker has seen
+
+
+def attach_frame(ref: FrameRef) -> numpy.ndarray:
+    """
+    View of the frame in a worker process, without copying it. Buffers stay attached for the
+    next frames in the same slot, a grown slot replaces the old buffer.
+    """
+    buffer = _attached.get(ref.slot)
+    if buffer is None or buffer.name != ref.name:
+        if buffer is not None:
+            try:
+                buffer.close()
+            except BufferError:
+                pass
+        buffer = _attached[ref.slot] = _open(ref.name)
+    return numpy.ndarray(ref.shape, numpy.dtype(ref.dtype), buffer=buffer.buf)
+
+
+def _open(name: str) -> "shared_memory.SharedMemory":
+    """
+    Attach to a buffer of the pool without taking ownership of it.
+
+    Before Python 3.13 attaching registers the buffer with the resource tracker as if this process had
+    created it. The pool process and the workers started by multiprocessing report to one tracker,
+    which keeps a single entry per buffer until close() unlinks it. Any other process has a tracker of
+    its own, which would unlink the buffer under the pool when the process exits - so it unregisters
+    at once.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    buffer = shared_memory.SharedMemory(name=name)
+    if multiprocessing.parent_process() is None and name not in _owned:
+        resource_tracker.unregister(buffer._name, "shared_memory")
+    return buffer
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from .lazy import numpy
+
+
+def suppress_near_duplicates(points: numpy.ndarray, tolerance: float = 5) -> numpy.ndarray:
+    """
+    Mark points to keep so that no two kept points are closer than tolerance (on both axes).
+
+    Earlier points win: a point is dropped when any earlier, kept point is close to it, so pass
+    candidates in the order of priority. A point next to a dropped one is kept.
+
+    The points are visited once in order, kept ones go into a GridIndex with cells of tolerance, so
+    a point only looks into the 3x3 cells around it and the pass costs O(n) for any layout.
+
+    :param points: (N, 2) array of x, y coordinates, e.g. centres of shapes.
+    :param tolerance: maximal distance (exclusive) in pixels for two points to be duplicates.
+    :return: (N,) boolean mask of points to keep.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    keep = numpy.ones(len(points), dtype=bool)
+    if len(points) < 2 or tolerance <= 0:
+        return keep
+    kept = GridIndex(tolerance)
+    for index, (x, y) in enumerate(points.tolist()):
+        if kept.query(x, y, tolerance):
+            keep[index] = False
+        else:
+            kept.insert(x, y, index)
+    return keep
+
+
+class GridIndex:
+    """
+    Uniform grid hash of points for incremental near-neighbour queries.
+
+    Every cell is a list of (x, y, item) entries, a query visits only the cells a radius around the
+    point covers, so inserting and querying cost O(1) for evenly spread points. A cell_size of 0 or
+    less, e.g. a duplicate tolerance of 0, makes cells of 1 - a query with such a radius finds nothing.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size if cell_size > 0 else 1
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, Any]]] = defaultdict(list)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, x: float, y: float, item: Any) -> None:
+        self._cells[self._cell(x, y)].append((x, y, item))
+        self._count += 1
+
+    def query(self, x: float, y: float, radius: float) -> List[Any]:
+        """Items closer than radius (exclusive) to x, y on both axes."""
+        (low_x, low_y), (high_x, high_y) = self._cell(x - radius, y - radius), self._cell(x + radius, y + radius)
+        found = []
+        for cell_x in range(low_x, high_x + 1):
+            for cell_y in range(low_y, high_y + 1):
+                cell = self._cells.get((cell_x, cell_y))
+                if cell:
+                    found.extend(
+                        item for item_x, item_y, item in cell if abs(item_x - x) < radius and abs(item_y - y) < radius
+                    )
+        return found
@@ -1,4 +1,4 @@
-import re
+import argparse
 import cv2
 from pic2block.definitions import RESIZED_SHAPES_PNG
 from pic2block.config_log import logger
@@ -28,36 +28,42 @@ class ImageCoordinates:
         self.centre_coordinates: List = []
         self.default_quadrilateral_sequence = default_quadrilateral_sequence
 
-    def check_centre_points(self, list_with_string_coordinates: List) -> None:
+    def check_centre_points(self, list_with_coordinates: List, show: bool = False):
         """Start calling private methods for drawing points in picture SHAPES_DIR.
-        :param list_with_string_coordinates: a list with parsed coordinates by recognition.py
+        :param list_with_coordinates: lists with Shape records (or x, y pairs) from recognition.py
+        :param show: display the output picture in a window and wait for a key.
+        :return: the output picture, None without coordinates.
         """
-        if list_with_string_coordinates:
+        if list_with_coordinates:
             self.centre_coordinates = self._get_centre_coordinates(
-                list_with_string_coordinates
+                list_with_coordinates
             )
-            self._draw_coordinates_on_picture()
-        else:
-            logger.warning("List with coordinates is required!")
+            image = self._draw_coordinates_on_picture()
+            if show:
+                cv2.imshow("output", image)
+                cv2.waitKey(0)
+            return image
+        logger.warning("List with coordinates is required!")
+        return None
 
     def _get_centre_coordinates(
-        self, list_with_string_coordinates: List
+        self, list_with_coordinates: List
     ) -> List[Tuple]:
         """
         Create a list of int x,y coordinates.
-         :param list_with_string_coordinates: a list with parsed coordinates by recognition.py
+         :param list_with_coordinates: lists with Shape records (or x, y pairs) from recognition.py
          The example list is:
             [[[1025, 251], [338, 251], [1975, 359], [1647, 160]],
             [[1416, 879], [426, 730], [1067, 658]], [[2044, 660], [2349, 887]]].
         """
-        for shape in list_with_string_coordinates:
+        for shape in list_with_coordinates:
             self.centre_coordinates.append(
                 list(self._parse_numbers_from_coordinates(shape))
             )
         return self.centre_coordinates
 
     def _draw_coordinates_on_picture(self):
-        """Draw coordinates on the picture from SHAPES_DIR. Type x,y coordinates and type of quadrilateral."""
+        """Draw coordinates on the picture from SHAPES_DIR. Type x,y coordinates and type of quadrilateral. Return the picture."""
         logger.debug(f"Parsed quadrilateral: {self.centre_coordinates}")
         image = cv2.imread(self.imagepath)
 
@@ -86,28 +92,28 @@ class ImageCoordinates:
                     2,
                 )
 
-        cv2.imshow("output", image)
-        cv2.waitKey(0)
+        return image
 
     @staticmethod
-    def _parse_numbers_from_coordinates(string_shape: List[AnyStr]) -> Tuple:
-        """Iterate through all 3 lists. Regex match x,y coordinates."""
-        for element in string_shape:
-            list_of_centre_coordinates = []
-            x_cord = int((re.search("c\.x:([0-9]*)", element).group(1)))
-            logger.debug(f"x_cord: {x_cord}")
-            y_cord = int((re.search("c\.y:([0-9]*)", element).group(1)))
-            logger.debug(f"y_cord: {y_cord}")
-            list_of_centre_coordinates.append(x_cord)
-            list_of_centre_coordinates.append(y_cord)
-            yield list_of_centre_coordinates
+    def _parse_numbers_from_coordinates(shapes: List) -> Tuple:
+        """Iterate through all 3 lists. Take x,y coordinates from Shape records or x, y pairs."""
+        for element in shapes:
+            yield list(getattr(element, "centre", element))
 
 
-check_coordinates = ImageCoordinates()
 list_a = [
-    ["c.x:99, c.y:73", "c.x:580, c.y:105", "c.x:484, c.y:47", "c.x:301, c.y:73"],
-    ["c.x:124, c.y:213", "c.x:415, c.y:257", "c.x:313, c.y:193"],
-    ["c.x:690, c.y:259", "c.x:483, c.y:46", "c.x:600, c.y:193"],
+    [(99, 73), (580, 105), (484, 47), (301, 73)],
+    [(124, 213), (415, 257), (313, 193)],
+    [(690, 259), (483, 46), (600, 193)],
 ]  # testing set
 # TODO - Send testing set from recognition.py and validate it. https://github.com/Dadoheh/pic2block/issues/12
-check_coordinates.check_centre_points(list_with_string_coordinates=list_a)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Draw the testing set of centre points on the sample picture.")
+    parser.add_argument("--show", action="store_true", help="Display the output picture in a window.")
+    parser.add_argument("-o", "--output", help="Write the output picture to this file.")
+    args = parser.parse_args()
+    output = ImageCoordinates().check_centre_points(list_with_coordinates=list_a, show=args.show)
+    if args.output:
+        cv2.imwrite(args.output, output)
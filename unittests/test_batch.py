@@ -0,0 +1,37 @@
+import io
+import os
+import unittest
+from pic2block.batch import expand_inputs, recognise_file, run_batch, write_json_lines
+from pic2block.definitions import RESIZED_SHAPES_PNG, SHAPES_DIR
+from pic2block.metrics import MetricsRegistry
+
+
+class TestBatch(unittest.TestCase):
+    def test_expand_inputs(self):
+        paths = expand_inputs([SHAPES_DIR, os.path.join(SHAPES_DIR, "*.jpg"), "missing.png"])
+        self.assertIn(RESIZED_SHAPES_PNG, paths)
+        self.assertEqual(paths.count(os.path.join(SHAPES_DIR, "sb_liniowy.jpg")), 2)
+        self.assertEqual(paths[-1], "missing.png")
+
+    def test_recognise_file_reports_failure(self):
+        record = recognise_file("missing.png")
+        self.assertFalse(record["ok"])
+        self.assertIn("Cannot read image", record["error"])
+
+    def test_run_batch_keeps_order(self):
+        records = list(run_batch([RESIZED_SHAPES_PNG, "missing.png"], workers=1, ordered=True))
+        self.assertEqual([record["path"] for record in records], [RESIZED_SHAPES_PNG, "missing.png"])
+        self.assertEqual([record["ok"] for record in records], [True, False])
+        self.assertIn("Diamond", {shape["kind"] for shape in records[0]["shapes"]})
+
+    def test_run_batch_metrics(self):
+        registry = MetricsRegistry()
+        records = run_batch([RESIZED_SHAPES_PNG, "missing.png"], workers=1, metrics=True)
+        summary = write_json_lines(records, io.StringIO(), registry)
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(registry.images, 1)
+        self.assertEqual(registry.metrics.counts["shapes"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+import cv2
+from pic2block.cache import ResultCache
+from pic2block.definitions import RESIZED_SHAPES_PNG
+from pic2block.recognition import Recognition
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image = cv2.imread(RESIZED_SHAPES_PNG)
+        self.result = Recognition().recognise(self.image)
+
+    def test_key_depends_on_pixels_and_parameters(self):
+        key = ResultCache.key(self.image, {"duplicate_tolerance": 5})
+        self.assertEqual(key, ResultCache.key(self.image.copy(), {"duplicate_tolerance": 5}))
+        self.assertNotEqual(key, ResultCache.key(self.image, {"duplicate_tolerance": 6}))
+        self.assertNotEqual(key, ResultCache.key(self.image[1:], {"duplicate_tolerance": 5}))
+
+    def test_memory_lru(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", self.result)
+        cache.put("b", self.result)
+        cache.get("a")
+        cache.put("c", self.result)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").to_dict(), self.result.to_dict())
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ResultCache(directory=directory).put("a", self.result)
+            cache = ResultCache(directory=directory)
+            self.assertEqual(cache.get("a").to_dict(), self.result.to_dict())
+            self.assertEqual(cache.disk_hits, 1)
+
+            size = os.path.getsize(os.path.join(directory, "a.json"))
+            cache = ResultCache(directory=directory, max_bytes=int(size * 1.5))
+            cache.put("b", self.result)
+            self.assertEqual(os.listdir(directory), ["b.json"])
+
+    def test_rewritten_entries_count_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ResultCache(directory=directory).put("a", self.result)
+            size = os.path.getsize(os.path.join(directory, "a.json"))
+            cache = ResultCache(directory=directory, max_bytes=size * 10)
+            for _ in range(5):
+                cache.put("a", self.result)
+                self.assertEqual(cache.stats()["disk_bytes"], size)
+            cache.put("b", self.result)
+            self.assertEqual(sorted(os.listdir(directory)), ["a.json", "b.json"])
+            self.assertEqual(cache.stats()["disk_bytes"], 2 * size)
+
+    def test_recognition_uses_cache(self):
+        recognition = Recognition(cache=ResultCache())
+        first = recognition.recognise(self.image)
+        second = recognition.recognise(self.image.copy())
+
+        self.assertEqual(first.to_dict(), second.to_dict())
+        self.assertEqual(recognition.cache.stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
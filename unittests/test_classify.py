@@ -0,0 +1,69 @@
+import unittest
+import cv2
+from numpy import array, roll
+from pic2block.benchmarks.ellipsoid_classifier import _stadium
+from pic2block.classify import canonicalise_quadrilaterals, classify_ellipsoids, classify_quadrilaterals
+
+QUADRILATERALS = array(
+    [
+        [[1639, 289], [1639, 430], [2311, 430], [2311, 289]],  # rectangle
+        [[1416, 762], [1285, 879], [1416, 997], [1547, 880]],  # diamond
+        [[2872, 799], [2565, 979], [1835, 972], [2141, 795]],  # hand drawn input
+        [[0, 0], [100, 40], [30, 200], [10, 90]],
+    ]
+)
+
+
+class TestClassifyQuadrilaterals(unittest.TestCase):
+    def test_labels(self):
+        self.assertEqual(
+            classify_quadrilaterals(QUADRILATERALS).tolist(),
+            ["Rectangle", "Diamond", "Input", "Quadrilateral"],
+        )
+
+    def test_any_vertex_order(self):
+        for shift in range(4):
+            shifted = roll(QUADRILATERALS, shift, axis=1)
+            self.assertEqual(
+                classify_quadrilaterals(shifted[:, ::-1]).tolist(),
+                classify_quadrilaterals(QUADRILATERALS).tolist(),
+            )
+            self.assertEqual(
+                canonicalise_quadrilaterals(shifted[:, ::-1]).tolist(),
+                canonicalise_quadrilaterals(QUADRILATERALS).tolist(),
+            )
+
+    def test_canonical_order_starts_at_top(self):
+        self.assertEqual(
+            canonicalise_quadrilaterals(QUADRILATERALS[1:2]).tolist(),
+            [[[1416, 762], [1285, 879], [1416, 997], [1547, 880]]],
+        )
+
+
+class TestClassifyEllipsoids(unittest.TestCase):
+    def test_ellipses_and_stadiums(self):
+        outlines = [
+            cv2.ellipse2Poly((300, 200), (150, 50), 0, 0, 360, 20),
+            cv2.ellipse2Poly((900, 400), (100, 70), 30, 0, 360, 15),
+            cv2.ellipse2Poly((100, 100), (40, 40), 0, 0, 360, 20),
+            _stadium(600, 300, 300, 100, 0, 16).round().astype("int32"),
+            array([[0, 0], [100, 0], [100, 60], [60, 60], [60, 100], [0, 100], [0, 70], [20, 50], [0, 30],
+                   [10, 20], [5, 10]]),  # noisy L-shaped contour
+        ]
+        accepted, ellipses = classify_ellipsoids(outlines)
+        self.assertEqual(accepted.tolist(), [True, True, True, True, False])
+        cx, cy, width, height, angle = ellipses[1]
+        self.assertAlmostEqual(cx, 900, delta=1)
+        self.assertAlmostEqual(cy, 400, delta=1)
+        self.assertAlmostEqual(width, 200, delta=4)
+        self.assertAlmostEqual(height, 140, delta=4)
+        self.assertAlmostEqual(angle % 180, 30, delta=2)
+
+    def test_empty(self):
+        accepted, ellipses = classify_ellipsoids([])
+        self.assertEqual(accepted.shape, (0,))
+        self.assertEqual(ellipses.shape, (0, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
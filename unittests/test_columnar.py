@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy
+from pic2block.batch import recognise_file, write_columnar
+from pic2block.columnar import PARQUET, ColumnarWriter, parquet_available, read_index, read_shards
+from pic2block.definitions import RESIZED_SHAPES_PNG
+from pic2block.main import main
+from pic2block.recognition import Recognition
+
+
+class TestColumnar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.record = recognise_file(RESIZED_SHAPES_PNG)
+        cls.failed = recognise_file("missing.png")
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        with ColumnarWriter(self.path, shard_images=2) as writer:
+            self.assertEqual([writer.append(record) for record in (self.record, self.failed, self.record)], [0, 1, 2])
+        shards = list(read_shards(self.path))
+        self.assertEqual([shard.first_image for shard in shards], [0, 2])
+        self.assertEqual(read_index(self.path)["shapes"], 18)
+        first = shards[0]
+        self.assertEqual(list(first["ok"]), [True, False])
+        self.assertEqual(first.image_path(1), "missing.png")
+        rows = first.image_rows(0)
+        shapes = self.record["shapes"]
+        self.assertEqual(first["centre"][rows].tolist(), [shape["centre"] for shape in shapes])
+        self.assertEqual([first.kinds[code] for code in first["kind"][rows]], [shape["kind"] for shape in shapes])
+        for row, shape in enumerate(shapes):
+            self.assertEqual(first.vertices(row).tolist(), shape["vertices"])
+        self.assertEqual(first.image_rows(1), slice(9, 9))
+
+    def test_appends_to_existing_shards(self):
+        write_columnar([self.record], self.path)
+        with ColumnarWriter(self.path) as writer:
+            self.assertEqual(writer.append_result(Recognition().recognise(RESIZED_SHAPES_PNG), "again.png"), 1)
+        index = read_index(self.path)
+        self.assertEqual((index["images"], len(index["shards"])), (2, 2))
+        self.assertEqual(list(read_shards(self.path))[1]["image"].tolist(), [1] * 9)
+        with self.assertRaisesRegex(ValueError, "npy shards"):
+            ColumnarWriter(self.path, PARQUET)
+
+    def test_filter_by_kind_and_region(self):
+        write_columnar([self.record], self.path)
+        shard = next(read_shards(self.path))
+        diamonds = [shape["centre"] for shape in self.record["shapes"] if shape["kind"] == "Diamond"]
+        self.assertEqual(shard["centre"][shard.rows(kinds=["Diamond"])].tolist(), diamonds)
+        x, y = diamonds[0]
+        self.assertEqual(shard["centre"][shard.rows(region=(x, y, 1, 1))].tolist(), [diamonds[0]])
+        self.assertEqual(len(shard.rows(kinds=["Diamond"], region=(0, 0, 1, 1))), 0)
+        self.assertIsInstance(shard["centre"], numpy.memmap)
+
+    def test_batch_option(self):
+        directory = os.path.join(self.path, "shards")
+        self.assertEqual(main([RESIZED_SHAPES_PNG, "missing.png", "-j", "1", "-w", "--columnar", directory]), 1)
+        shard = next(read_shards(directory))
+        self.assertEqual((len(shard["ok"]), len(shard)), (2, 9))
+
+    @unittest.skipUnless(parquet_available(), "needs pyarrow")
+    def test_parquet(self):
+        from pyarrow import parquet
+
+        write_columnar([self.record, self.failed], self.path, PARQUET)
+        shapes = parquet.read_table(os.path.join(self.path, "shard-00000.parquet")).to_pylist()
+        expected = self.record["shapes"]
+        self.assertEqual([shape["vertices"] for shape in shapes], [shape["vertices"] for shape in expected])
+        self.assertEqual([shape["kind"] for shape in shapes], [shape["kind"] for shape in expected])
+        images = parquet.read_table(os.path.join(self.path, "shard-00000.images.parquet")).to_pylist()
+        self.assertEqual([(image["ok"], image["shapes"]) for image in images], [(True, 9), (False, 0)])
+        with open(os.path.join(self.path, "index.json")) as index:
+            self.assertEqual(json.load(index)["format"], PARQUET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import unittest
+from pic2block.benchmarks.synthetic import render_flowchart
+from pic2block.connectors import Connector, ConnectorDetector, adjacency
+from pic2block.definitions import SHAPES_DIR
+from pic2block.recognition import Recognition
+from pic2block.result import Result
+
+
+class TestConnectors(unittest.TestCase):
+    def test_synthetic_arrows(self):
+        image, expected = render_flowchart(12, connectors=True)
+        result = Recognition(connector_detector=ConnectorDetector()).recognise(image)
+        centres = {shape.id: list(shape.centre) for shape in result.shapes}
+        found = sorted(
+            [centres[connector.source], centres[connector.target]]
+            for connector in result.connectors if connector.directed
+        )
+        self.assertEqual(len(result.connectors), len(expected["edges"]))
+        self.assertEqual(found, sorted(expected["edges"]))
+
+    def test_flowchart_graph(self):
+        result = Recognition(connector_detector=ConnectorDetector()).recognise(
+            os.path.join(SHAPES_DIR, "sb_liniowy.jpg")
+        )
+        by_height = sorted(result.shapes, key=lambda shape: shape.y)
+        chain = {upper.id: [lower.id] for upper, lower in zip(by_height, by_height[1:])}
+        self.assertEqual(adjacency(result.connectors), chain)
+
+    def test_without_detector(self):
+        result = Recognition().recognise(os.path.join(SHAPES_DIR, "sb_liniowy.jpg"))
+        self.assertIsNone(result.connectors)
+        self.assertIsNone(result.to_dict()["connectors"])
+
+    def test_result_round_trip(self):
+        connectors = [Connector(0, 1, (10, 20), (10, 60), id=0), Connector(1, 2, (10, 90), (50, 90), False, 1)]
+        result = Result.from_dict(Result([], (100, 100), connectors=connectors).to_dict())
+        self.assertEqual([connector.to_dict() for connector in result.connectors],
+                         [connector.to_dict() for connector in connectors])
+        self.assertEqual(adjacency(result.connectors), {0: [1], 1: [2], 2: [1]})
+
+
+if __name__ == "__main__":
+    unittest.main()
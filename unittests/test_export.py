@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from xml.dom import minidom
+from pic2block.batch import run_batch
+from pic2block.connectors import ConnectorDetector
+from pic2block.definitions import SHAPES_DIR
+from pic2block.export import DRAWIO, export_path, export_result, write_drawio, write_graph_json, write_vsdx
+from pic2block.recognition import Recognition
+
+FLOWCHART = os.path.join(SHAPES_DIR, "sb_liniowy.jpg")
+
+
+class TestExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.result = Recognition(connector_detector=ConnectorDetector()).recognise(FLOWCHART)
+        cls.result.shapes[0].text = 'P = a * b & "x < y"'
+
+    def test_vsdx(self):
+        output = io.BytesIO()
+        write_vsdx(self.result, output)
+        with zipfile.ZipFile(output) as archive:
+            for name in archive.namelist():
+                minidom.parseString(archive.read(name))  # every part is well formed
+            page = minidom.parseString(archive.read("visio/pages/page1.xml"))
+            self.assertIn("[Content_Types].xml", archive.namelist())
+        self.assertEqual(
+            len(page.getElementsByTagName("Shape")), len(self.result.shapes) + len(self.result.connectors)
+        )
+        self.assertEqual(len(page.getElementsByTagName("Connect")), 2 * len(self.result.connectors))
+        self.assertEqual(page.getElementsByTagName("Text")[0].firstChild.data, self.result.shapes[0].text)
+
+    def test_drawio(self):
+        output = io.StringIO()
+        write_drawio(self.result, output)
+        cells = minidom.parseString(output.getvalue()).getElementsByTagName("mxCell")
+        vertices = [cell for cell in cells if cell.getAttribute("vertex")]
+        edges = [cell for cell in cells if cell.getAttribute("edge")]
+        self.assertEqual(len(vertices), len(self.result.shapes))
+        self.assertEqual(vertices[0].getAttribute("value"), self.result.shapes[0].text)
+        self.assertEqual(
+            [(edge.getAttribute("source"), edge.getAttribute("target")) for edge in edges],
+            [(f"s{connector.source}", f"s{connector.target}") for connector in self.result.connectors],
+        )
+
+    def test_graph_json(self):
+        output = io.StringIO()
+        write_graph_json(self.result, output)
+        graph = json.loads(output.getvalue())
+        self.assertEqual([node["id"] for node in graph["nodes"]], [shape.id for shape in self.result.shapes])
+        self.assertEqual(len(graph["links"]), 4)
+        self.assertTrue(all(link["directed"] for link in graph["links"]))
+
+    def test_export_result_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            export_result(self.result, os.path.join(directory, "chart.xml"))
+            export_result(self.result, os.path.join(directory, "chart.vsdx"))
+            self.assertTrue(zipfile.is_zipfile(os.path.join(directory, "chart.vsdx")))
+            with open(os.path.join(directory, "chart.xml")) as file:
+                self.assertTrue(file.read().startswith("<mxfile"))
+            with self.assertRaises(ValueError):
+                export_result(self.result, os.path.join(directory, "chart.png"))
+
+    def test_export_path(self):
+        self.assertEqual(export_path(os.path.join("scans", "a", "1.png"), "out"), os.path.join("out", "scans", "a", "1.vsdx"))
+        self.assertEqual(export_path(os.path.join("..", "1.png"), "out", DRAWIO), os.path.join("out", "_", "1.drawio"))
+
+    def test_batch_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            records = list(run_batch([FLOWCHART], workers=1, connectors=True, export_dir=directory))
+            self.assertTrue(records[0]["ok"])
+            self.assertEqual(len(records[0]["connectors"]), 4)
+            self.assertTrue(records[0]["export"].startswith(directory))
+            self.assertTrue(zipfile.is_zipfile(records[0]["export"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+import unittest
+import cv2
+import numpy
+from pic2block.batch import run_sequences
+from pic2block.benchmarks.synthetic import RESOLUTIONS, render_flowchart
+from pic2block.frames import FrameChanges, changed_frames, iter_frames, read_ahead, recognise_frames
+
+
+class TestFrames(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.chart, cls.expected = render_flowchart(10, seed=1, size=RESOLUTIONS["720p"])
+        blank = numpy.full_like(cls.chart, 255)
+        cls.tiff = os.path.join(cls.directory.name, "pages.tiff")
+        cv2.imwritemulti(cls.tiff, [blank, cls.chart, cls.chart, blank])
+
+        cls.video = os.path.join(cls.directory.name, "board.avi")
+        writer = cv2.VideoWriter(cls.video, cv2.VideoWriter_fourcc(*"MJPG"), 10, (640, 360))
+        small = cv2.resize(cls.chart, (640, 360), interpolation=cv2.INTER_AREA)
+        rng = numpy.random.default_rng(0)
+        for index in range(30):
+            frame = small if index >= 12 else numpy.full_like(small, 255)
+            noise = rng.integers(-3, 4, frame.shape)
+            writer.write(numpy.clip(frame.astype(numpy.int16) + noise, 0, 255).astype(numpy.uint8))
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_pages_one_at_a_time(self):
+        self.assertEqual([index for index, _ in iter_frames(self.tiff)], [0, 1, 2, 3])
+        self.assertEqual([index for index, _ in iter_frames(self.tiff, step=2)], [0, 2])
+        _, page = next(iter_frames(self.tiff, step=3))
+        self.assertEqual(page.shape, self.chart.shape)
+
+    def test_unreadable_sources(self):
+        with self.assertRaisesRegex(ValueError, "PDF"):
+            next(iter_frames("scan.pdf"))
+        with self.assertRaisesRegex(ValueError, "Cannot read image"):
+            next(iter_frames("missing.tiff"))
+        with self.assertRaisesRegex(ValueError, "Cannot open video"):
+            next(iter_frames("missing.mp4"))
+
+    def test_unchanged_frames_are_skipped(self):
+        self.assertEqual([index for index, _ in changed_frames(iter_frames(self.tiff))], [0, 1, 3])
+        self.assertEqual([index for index, _ in changed_frames(iter_frames(self.video))], [0, 12])
+        self.assertEqual([index for index, _ in changed_frames(iter_frames(self.video), FrameChanges(1.0))], [0])
+
+    def test_recognise_frames(self):
+        results = list(recognise_frames(self.video))
+        self.assertEqual([index for index, _ in results], [0, 12])
+        self.assertEqual(len(results[0][1].shapes), 0)
+        self.assertEqual(len(results[1][1].shapes), sum(self.expected.values()))
+
+    def test_read_ahead_is_bounded_and_raises(self):
+        taken = []
+
+        def items():
+            for item in range(100):
+                taken.append(item)
+                yield item
+            raise RuntimeError("broken")
+
+        ahead = read_ahead(items(), size=2)
+        self.assertEqual(next(ahead), 0)
+        time.sleep(0.2)
+        self.assertLessEqual(len(taken), 4)  # the one taken, two in the queue, one waiting to be put
+        rest = []
+        with self.assertRaisesRegex(RuntimeError, "broken"):
+            for item in ahead:
+                rest.append(item)
+        self.assertEqual(rest, list(range(1, 100)))
+
+    def test_run_sequences(self):
+        records = list(run_sequences([self.tiff, "missing.tiff"], workers=1, ordered=True))
+        recognised = [record for record in records if record["ok"]]
+        self.assertEqual(
+            [(record["path"], record["frame"]) for record in recognised], [(self.tiff, 0), (self.tiff, 1), (self.tiff, 3)]
+        )
+        self.assertEqual([record["path"] for record in records if not record["ok"]], ["missing.tiff"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+import cv2
+from pic2block.definitions import RESIZED_SHAPES_PNG
+from pic2block.image_input import load_image
+
+
+class TestLoadImage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image = cv2.imread(RESIZED_SHAPES_PNG)
+        with open(RESIZED_SHAPES_PNG, "rb") as picture:
+            self.encoded = picture.read()
+
+    def test_path(self):
+        self.assertTrue((load_image(RESIZED_SHAPES_PNG) == self.image).all())
+
+    def test_encoded_bytes(self):
+        for source in (self.encoded, bytearray(self.encoded), memoryview(self.encoded)):
+            self.assertTrue((load_image(source) == self.image).all())
+
+    def test_arrays(self):
+        self.assertIs(load_image(self.image), self.image)
+        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        self.assertEqual(load_image(gray).shape, self.image.shape)
+
+    def test_errors(self):
+        self.assertRaises(ValueError, load_image, "missing.png")
+        self.assertRaises(ValueError, load_image, b"not a picture")
+        self.assertRaises(TypeError, load_image, 42)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+from pic2block.benchmarks.import_time import HEAVY
+from pic2block.lazy import LazyModule
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter with the same import path."""
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    )
+
+
+class TestImports(unittest.TestCase):
+    def test_no_heavy_imports(self):
+        process = run_python(
+            "-c",
+            "import sys, pic2block.main, pic2block.incremental, pic2block.service; "
+            f"print(','.join(name for name in {HEAVY!r} if name in sys.modules))",
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), "")
+
+    def test_no_logging_handlers_on_import(self):
+        process = run_python(
+            "-c",
+            "import logging, pic2block.recognition; from pic2block.config_log import logger; "
+            "print(all(isinstance(handler, logging.NullHandler) for handler in logger.handlers)); "
+            "logger.warning('not printed')",
+        )
+        self.assertEqual(process.stdout.strip(), "True")
+        self.assertEqual(process.stderr, "")
+
+    def test_command(self):
+        process = run_python("-m", "pic2block", "--help")
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertTrue(process.stdout.startswith("usage: pic2block"))
+
+    def test_lazy_module(self):
+        colorsys = LazyModule("colorsys")
+        self.assertNotIn("rgb_to_hsv", vars(colorsys))
+        self.assertEqual(colorsys.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn("rgb_to_hsv", vars(colorsys))
+
+
+if __name__ == "__main__":
+    unittest.main()
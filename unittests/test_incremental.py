@@ -0,0 +1,156 @@
+import os
+import unittest
+from unittest.mock import patch
+import cv2
+from pic2block.benchmarks.synthetic import render_flowchart
+from pic2block.connectors import ConnectorDetector
+from pic2block.definitions import SHAPES_DIR
+from pic2block.fingerprint import Fingerprint
+from pic2block.incremental import IncrementalRecognition
+from pic2block.metrics import MetricsRegistry
+from pic2block.preprocess import PreprocessConfig
+from pic2block.recognition import Recognition
+from pic2block.result import Result
+
+
+def summary(result):
+    return sorted((shape.kind, shape.x, shape.y) for shape in result.shapes)
+
+
+def edges(result):
+    centres = {shape.id: shape.centre for shape in result.shapes}
+    return sorted(
+        (centres[connector.source], centres[connector.target])
+        if connector.directed else tuple(sorted((centres[connector.source], centres[connector.target])))
+        for connector in result.connectors
+    )
+
+
+def redraw_block(image, shape):
+    x, y, w, h = shape.bbox
+    edited = image.copy()
+    edited[y - 8:y + h + 8, x - 8:x + w + 8] = 255
+    cv2.rectangle(edited, (x, y), (x + w, y + h), (0, 0, 0), 3)
+    return edited
+
+
+class TestIncrementalRecognition(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.image, _ = render_flowchart(100)
+        cls.incremental = IncrementalRecognition(Recognition(metrics=MetricsRegistry()))
+        cls.previous = Result.from_dict(cls.incremental.recognise(cls.image).to_dict())
+
+    def test_unchanged(self):
+        result = self.incremental.recognise(self.image, self.previous)
+        self.assertEqual(result.metrics.counts["dirty_regions"], 0)
+        self.assertNotIn("find_contours", result.metrics.seconds)
+        self.assertEqual([shape.to_dict() for shape in result.shapes],
+                         [shape.to_dict() for shape in self.previous.shapes])
+
+    def test_edited_block(self):
+        removed = self.previous.shapes[40]
+        edited = redraw_block(self.image, removed)
+        result = self.incremental.recognise(edited, self.previous)
+        self.assertEqual(summary(result), summary(Recognition().recognise(edited)))
+        self.assertEqual(result.metrics.counts["dirty_regions"], 1)
+        before = {shape.id: (shape.kind, shape.centre) for shape in self.previous.shapes}
+        after = {shape.id: (shape.kind, shape.centre) for shape in result.shapes}
+        self.assertEqual([index for index in before if before[index] != after.get(index)], [removed.id])
+        self.assertEqual(after[removed.id][0], "Rectangle")
+
+    def test_preprocessed_once(self):
+        recognition = self.incremental.recognition
+        edited = redraw_block(self.image, self.previous.shapes[40])
+        with patch.object(recognition, "_preprocess", wraps=recognition._preprocess) as preprocess:
+            self.incremental.recognise(edited, self.previous)
+        preprocess.assert_called_once()
+
+    def test_downscaled(self):
+        recognition = Recognition(preprocess=PreprocessConfig(max_dimension=self.image.shape[1] // 2))
+        incremental = IncrementalRecognition(recognition)
+        previous = incremental.recognise(self.image)
+        height, width = self.image.shape[:2]
+        self.assertEqual(previous.fingerprint.size, (width // 2, height // 2))
+        edited = redraw_block(self.image, previous.shapes[40])
+        self.assertEqual(summary(incremental.recognise(edited, previous)), summary(recognition.recognise(edited)))
+
+    def test_connectors(self):
+        image, _ = render_flowchart(30, connectors=True)
+        recognition = Recognition(connector_detector=ConnectorDetector(), metrics=MetricsRegistry())
+        incremental = IncrementalRecognition(recognition)
+        previous = Result.from_dict(incremental.recognise(image).to_dict())
+        for shape in previous.shapes[::7]:
+            edited = redraw_block(image, shape)
+            with patch.object(ConnectorDetector, "detect") as detect:
+                result = incremental.recognise(edited, previous)
+            detect.assert_not_called()
+            self.assertEqual(result.metrics.counts["dirty_regions"], 1)
+            found = edges(result)
+            result.connectors = ConnectorDetector().detect(edited, result.shapes)  # in the whole image
+            self.assertEqual(found, edges(result))
+        self.assertEqual(edges(incremental.recognise(image, previous)), edges(previous))
+
+    def test_broken_connector(self):
+        image, _ = render_flowchart(30, scale=3, connectors=True)
+        incremental = IncrementalRecognition(Recognition(connector_detector=ConnectorDetector()))
+        previous = incremental.recognise(image)
+        broken = previous.connectors[0]
+        x, y = (broken.tail[0] + broken.head[0]) // 2, (broken.tail[1] + broken.head[1]) // 2
+        edited = image.copy()
+        edited[y - 6:y + 7, x - 6:x + 7] = 255
+        result = incremental.recognise(edited, previous)
+        self.assertEqual(summary(result), summary(previous))
+        centres = {shape.id: shape.centre for shape in previous.shapes}
+        self.assertTrue(broken.directed)
+        expected = [edge for edge in edges(previous) if edge != (centres[broken.source], centres[broken.target])]
+        self.assertEqual(edges(result), expected)
+
+    def test_ids_of_deleted_blocks_are_not_reused(self):
+        last = self.previous.shapes[-1]
+        x, y, w, h = last.bbox
+        deleted = self.image.copy()
+        deleted[y - 8:y + h + 8, x - 8:x + w + 8] = 255
+        without = Result.from_dict(self.incremental.recognise(deleted, self.previous).to_dict())
+        self.assertNotIn(last.id, [shape.id for shape in without.shapes])
+        self.assertEqual(without.next_id, last.id + 1)
+
+        restored = self.incremental.recognise(self.image, without)  # a new block where the deleted one was
+        added = [shape for shape in restored.shapes if shape.id not in {shape.id for shape in without.shapes}]
+        self.assertEqual([(shape.id, shape.centre) for shape in added], [(last.id + 1, last.centre)])
+        self.assertEqual(restored.next_id, last.id + 2)
+
+    def test_text_inside_large_block(self):
+        image = cv2.imread(os.path.join(SHAPES_DIR, "shapes.png"))
+        edited = image.copy()
+        cv2.putText(edited, "abc", (1940, 370), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        for preprocess in (PreprocessConfig(), PreprocessConfig(max_area=0.5)):
+            recognition = Recognition(preprocess=preprocess, metrics=MetricsRegistry())
+            incremental = IncrementalRecognition(recognition)
+            result = incremental.recognise(edited, incremental.recognise(image))
+            self.assertEqual(result.metrics.counts["dirty_regions"], 1)
+            self.assertIn(("Rectangle", 1975, 359), summary(result))
+            self.assertEqual(summary(result), summary(Recognition(preprocess=preprocess).recognise(edited)))
+
+    def test_full_pass_without_fingerprint(self):
+        previous = Result(self.previous.shapes, self.previous.size)
+        result = self.incremental.recognise(self.image, previous)
+        self.assertEqual(result.metrics.counts["dirty_regions"], 1)
+        self.assertEqual(summary(result), summary(self.previous))
+        self.assertEqual([shape.id for shape in result.shapes], [shape.id for shape in self.previous.shapes])
+
+    def test_fingerprint(self):
+        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        fingerprint = Fingerprint.of(gray, {})
+        restored = Fingerprint.from_dict(fingerprint.to_dict())
+        self.assertFalse(restored.dirty_tiles(fingerprint).any())
+        gray = gray.copy()
+        gray[100, 70] = 255 - gray[100, 70]
+        dirty = Fingerprint.of(gray, {}).dirty_tiles(fingerprint)
+        self.assertEqual(dirty.sum(), 1)
+        self.assertTrue(dirty[100 // 32, 70 // 32])
+        self.assertIsNone(Fingerprint.of(gray, {"threshold": 1}).dirty_tiles(fingerprint))
+
+
+if __name__ == "__main__":
+    unittest.main()
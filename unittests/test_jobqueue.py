@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from pic2block.batch import recognise_queued, run_queue
+from pic2block.definitions import RESIZED_SHAPES_PNG
+from pic2block.jobqueue import DONE, FAILED, PENDING, RUNNING, JobQueue, LeaseKeeper
+from pic2block.main import main
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "jobs.db")
+        self.queue = JobQueue(self.path, lease_seconds=60, max_attempts=2, retry_delay=0)
+
+    def tearDown(self):
+        self.queue.close()
+        self.directory.cleanup()
+
+    def test_enqueue_skips_known_paths(self):
+        self.assertEqual(self.queue.enqueue(["a.png", "b.png", "a.png"], chunk_size=2), 2)
+        job = self.queue.claim("w1")[0]
+        self.queue.complete(job, "w1", {"path": job.path, "ok": True})
+        self.assertEqual(self.queue.enqueue(["a.png", "b.png", "c.png"]), 1)
+        self.assertEqual([job.path for job in self.queue.claim("w1", 5)], ["b.png", "c.png"])
+        self.assertEqual(list(self.queue.records()), [{"path": "a.png", "ok": True}])
+
+    def test_jobs_are_claimed_once(self):
+        self.queue.enqueue(["a.png", "b.png", "c.png"])
+        other = JobQueue(self.path)
+        first, second = self.queue.claim("w1", 2), other.claim("w2", 2)
+        other.close()
+        self.assertEqual([job.path for job in first], ["a.png", "b.png"])
+        self.assertEqual([job.path for job in second], ["c.png"])
+        self.assertEqual(self.queue.claim("w1"), [])
+
+    def test_expired_lease_is_claimed_again(self):
+        self.queue.lease_seconds = 0.05
+        self.queue.enqueue(["a.png"])
+        job = self.queue.claim("w1")[0]
+        time.sleep(0.1)
+        again = self.queue.claim("w2")
+        self.assertEqual([(job.path, job.attempts) for job in again], [("a.png", 2)])
+        self.assertFalse(self.queue.complete(job, "w1", {}))  # w1 lost its lease
+        time.sleep(0.1)
+        self.assertEqual(self.queue.claim("w3"), [])  # no attempts left
+        self.assertEqual(self.queue.stats()[FAILED], 1)
+
+    def test_leases_are_renewed_while_held(self):
+        self.queue.lease_seconds = 0.3
+        self.queue.enqueue(["a.png", "b.png"])
+        first, second = self.queue.claim("w1", 2)
+        with LeaseKeeper(self.path, "w1", lease_seconds=0.3) as leases:
+            leases.hold([first, second])
+            time.sleep(0.5)
+            self.assertEqual(self.queue.claim("w2"), [])  # both leases were renewed
+            leases.release(first)
+            self.assertTrue(self.queue.complete(first, "w1", {}))
+            time.sleep(0.5)
+            self.assertEqual(self.queue.claim("w2"), [])
+        time.sleep(0.4)
+        self.assertEqual([job.path for job in self.queue.claim("w2")], ["b.png"])
+
+    def test_export_does_not_block_workers(self):
+        self.queue.enqueue(["a.png", "b.png", "c.png"])
+        for job in self.queue.claim("w1", 2):
+            self.queue.complete(job, "w1", {"path": job.path})
+        job = self.queue.claim("w1")[0]
+        records = self.queue.records(page_size=1)
+        self.assertEqual(next(records), {"path": "a.png"})
+        other = JobQueue(self.path, timeout=0.1)
+        self.assertTrue(other.complete(job, "w1", {"path": job.path}))  # while the export is still running
+        other.close()
+        self.assertEqual(list(records), [{"path": "b.png"}, {"path": "c.png"}])
+
+    def test_fail_retries_then_gives_up(self):
+        self.queue.enqueue(["a.png"])
+        self.assertTrue(self.queue.fail(self.queue.claim("w1")[0], "w1", "IOError"))
+        self.assertEqual(self.queue.stats()[PENDING], 1)
+        self.assertTrue(self.queue.fail(self.queue.claim("w1")[0], "w1", "IOError"))
+        stats = self.queue.stats()
+        self.assertEqual((stats[PENDING], stats[FAILED], stats["errors"]), (0, 1, {"IOError": 1}))
+        self.assertEqual(self.queue.retry_failed(), 1)
+        self.assertEqual(len(self.queue.claim("w1")), 1)
+
+    def test_recognise_queued(self):
+        self.queue.enqueue([RESIZED_SHAPES_PNG, "missing.png"])
+        summary = recognise_queued(self.path, lease_seconds=60, max_attempts=1)
+        self.assertEqual((summary["done"], summary["failed"]), (1, 1))
+        stats = self.queue.stats()
+        self.assertEqual((stats[DONE], stats[FAILED], stats[RUNNING]), (1, 1, 0))
+        self.assertGreater(stats["images_per_second"], 0)
+        record = next(self.queue.records())
+        self.assertEqual(record["path"], RESIZED_SHAPES_PNG)
+        self.assertEqual(len(record["shapes"]), 9)
+
+    def test_run_queue_skips_done_images(self):
+        self.queue.enqueue([RESIZED_SHAPES_PNG])
+        self.assertEqual(sum(summary["done"] for summary in run_queue(self.path, workers=2)), 1)
+        self.queue.enqueue([RESIZED_SHAPES_PNG])
+        self.assertEqual(sum(summary["done"] for summary in run_queue(self.path, workers=1)), 0)
+
+
+    def test_worker_metrics_out(self):
+        metrics = os.path.join(self.directory.name, "metrics.json")
+        arguments = ["--queue", self.path, "-j", "1", "-w", "--metrics-out", metrics]
+        self.assertEqual(main(arguments + ["--worker", RESIZED_SHAPES_PNG]), 0)
+        with open(metrics) as file:
+            data = json.load(file)
+        self.assertEqual((data["images"], data["counts"]["shapes"]), (1, 9))
+        os.remove(metrics)
+        self.assertEqual(main(arguments + ["--results", "--output", os.devnull]), 0)
+        with open(metrics) as file:
+            self.assertEqual(json.load(file)["counts"]["shapes"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+from pic2block.cache import ResultCache
+from pic2block.definitions import RESIZED_SHAPES_PNG
+from pic2block.metrics import NULL_METRICS, Metrics, MetricsRegistry
+from pic2block.recognition import Recognition
+
+
+class TestMetrics(unittest.TestCase):
+    def test_off_by_default(self):
+        result = Recognition().recognise(RESIZED_SHAPES_PNG)
+        self.assertIsNone(result.metrics)
+        self.assertEqual(NULL_METRICS.to_dict(), {})
+
+    def test_result_metrics(self):
+        registry = MetricsRegistry()
+        result = Recognition(metrics=registry).recognise(RESIZED_SHAPES_PNG)
+        metrics = result.metrics
+        for stage in ("load", "preprocess", "find_contours", "approx", "classify", "dedup", "total"):
+            self.assertGreaterEqual(metrics.seconds[stage], 0.0)
+        self.assertNotIn("draw", metrics.seconds)
+        self.assertEqual(metrics.counts["shapes"], len(result))
+        self.assertGreaterEqual(metrics.counts["contours"], metrics.counts["candidates"])
+        self.assertEqual(sum(metrics.kinds.values()), metrics.counts["candidates"])
+        self.assertEqual(
+            metrics.counts["candidates"] - metrics.kinds.get("Quadrilateral", 0),
+            metrics.counts["shapes"] + metrics.counts["duplicates"],
+        )
+        self.assertEqual(Metrics.from_dict(json.loads(json.dumps(metrics.to_dict()))).to_dict(), metrics.to_dict())
+
+    def test_registry(self):
+        registry = MetricsRegistry()
+        recognition = Recognition(metrics=registry, cache=ResultCache())
+        first = recognition.recognise(RESIZED_SHAPES_PNG)
+        second = recognition.recognise(RESIZED_SHAPES_PNG)
+        self.assertEqual(second.metrics.counts, {"cache_hits": 1})
+        registry.add(first.metrics.to_dict())
+
+        data = registry.to_dict()
+        self.assertEqual(data["images"], 3)
+        self.assertEqual(data["counts"]["shapes"], 2 * len(first))
+        self.assertEqual(data["counts"]["cache_hits"], 1)
+
+        text = registry.to_prometheus()
+        self.assertIn("# TYPE pic2block_stage_seconds_total counter", text)
+        self.assertIn(f"pic2block_shapes_total {2 * len(first)}", text)
+        self.assertIn('pic2block_candidates_by_kind_total{kind="Rectangle"}', text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            registry.write(os.path.join(directory, "metrics.json"))
+            registry.write(os.path.join(directory, "metrics.prom"))
+            with open(os.path.join(directory, "metrics.json")) as file:
+                self.assertEqual(json.load(file), data)
+            with open(os.path.join(directory, "metrics.prom")) as file:
+                self.assertEqual(file.read(), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import cv2
+import numpy
+from pic2block.definitions import RESIZED_SHAPES_PNG
+from pic2block.preprocess import OTSU, PreprocessConfig, downscale, iter_tiles
+from pic2block.recognition import Recognition
+
+
+class TestPreprocess(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image = cv2.imread(RESIZED_SHAPES_PNG)
+        self.expected = sorted((shape.kind, shape.x, shape.y) for shape in Recognition().recognise(self.image).shapes)
+
+    def test_downscale(self):
+        self.assertIs(downscale(self.image, None)[0], self.image)
+        small, scale = downscale(self.image, 100)
+        self.assertEqual(max(small.shape[:2]), 100)
+        self.assertAlmostEqual(scale, 100 / max(self.image.shape[:2]))
+
+    def test_tiles_cover_image(self):
+        covered = numpy.zeros((1000, 700), bool)
+        for x0, y0, x1, y1 in iter_tiles(1000, 700, 300, 100):
+            self.assertLessEqual(x1 - x0, 300)
+            self.assertLessEqual(y1 - y0, 300)
+            covered[y0:y1, x0:x1] = True
+        self.assertTrue(covered.all())
+        self.assertEqual(list(iter_tiles(1000, 700, None, 100)), [(0, 0, 700, 1000)])
+
+    def test_input_not_modified(self):
+        image = self.image.copy()
+        Recognition().recognise(image)
+        self.assertTrue((image == self.image).all())
+        Recognition(preprocess=PreprocessConfig(draw=True)).recognise(image)
+        self.assertFalse((image == self.image).all())
+
+    def assertSameShapes(self, shapes, factor=1):
+        """Same kinds as in the full resolution image, centres within 2 pixels."""
+        found = sorted((shape.kind, shape.x, shape.y) for shape in shapes)
+        self.assertEqual([kind for kind, _, _ in found], [kind for kind, _, _ in self.expected])
+        for (_, x, y), (_, expected_x, expected_y) in zip(found, self.expected):
+            self.assertLessEqual(abs(x - factor * expected_x), 2)
+            self.assertLessEqual(abs(y - factor * expected_y), 2)
+
+    def test_same_shapes(self):
+        height, width = self.image.shape[:2]
+        for config in (
+            PreprocessConfig(threshold=OTSU),
+            PreprocessConfig(tile_size=max(height, width) // 2 + 50, tile_overlap=max(height, width) // 2),
+        ):
+            self.assertSameShapes(Recognition(preprocess=config).recognise(self.image).shapes)
+
+    def test_downscaled_coordinates(self):
+        large = cv2.resize(self.image, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+        config = PreprocessConfig(max_dimension=max(large.shape[:2]) // 2)
+        self.assertSameShapes(Recognition(preprocess=config).recognise(large).shapes, factor=2)
+
+    def test_single_block(self):
+        image = numpy.full((240, 400, 3), 255, numpy.uint8)
+        cv2.rectangle(image, (10, 10), (389, 229), (0, 0, 0), 3)
+        cv2.putText(image, "x = 42", (140, 130), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+        self.assertEqual([shape.kind for shape in Recognition().recognise(image).shapes], ["Rectangle"])
+        config = PreprocessConfig(max_area=0.5)
+        self.assertEqual(Recognition(preprocess=config).recognise(image).shapes, [])
+
+    def test_unknown_threshold(self):
+        self.assertRaises(ValueError, PreprocessConfig, threshold="magic")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import cv2
+import numpy
+from pic2block.benchmarks.synthetic import RESOLUTIONS, render_flowchart
+from pic2block.metrics import MetricsRegistry
+from pic2block.preprocess import PreprocessConfig
+from pic2block.prune import contour_features, parents_first, prune_contours
+from pic2block.recognition import Recognition
+
+
+class TestPrune(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image, self.expected = render_flowchart(40, size=RESOLUTIONS["1080p"], labels=True)
+        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        _, threshold = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+        self.contours, self.hierarchy = cv2.findContours(threshold, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+
+    def counts(self, result):
+        return {
+            "rectangles": len(result.rectangles),
+            "diamonds": len(result.diamonds),
+            "inputs": len(result.inputs),
+            "start_stop": len(result.start_stop),
+        }
+
+    def test_contour_features(self):
+        bboxes, areas = contour_features(self.contours)
+        self.assertEqual(bboxes.tolist(), [list(cv2.boundingRect(contour)) for contour in self.contours])
+        numpy.testing.assert_allclose(areas, [cv2.contourArea(contour) for contour in self.contours])
+
+    def test_parents_first(self):
+        parents = numpy.array([-1, 2, 0, 1, -1])
+        order = parents_first(parents).tolist()
+        for index, parent in enumerate(parents):
+            if parent >= 0:
+                self.assertLess(order.index(parent), order.index(index))
+        parents = self.hierarchy[0][:, 3]
+        self.assertEqual(parents_first(parents).tolist(), list(range(len(parents))))
+
+    def test_prune_contours(self):
+        width, height = RESOLUTIONS["1080p"]
+        keep, border = prune_contours(self.contours, (0, 0, width, height), (width, height), 200, width * height, 15, 0.8)
+        self.assertFalse(border.any())
+        self.assertFalse(keep[0])  # the frame of the image
+        self.assertLess(keep.sum(), len(self.contours) / 4)  # text glyphs are gone
+        self.assertGreaterEqual(keep.sum(), sum(self.expected.values()))
+
+    def test_text_inside_blocks(self):
+        registry = MetricsRegistry()
+        result = Recognition(metrics=registry).recognise(self.image)
+        self.assertEqual(self.counts(result), self.expected)
+        counts = registry.metrics.counts
+        self.assertGreater(counts["pruned"] + counts["nested"], counts["contours"] / 2)
+
+    def test_page_frame_does_not_hide_blocks(self):
+        framed = self.image.copy()
+        height, width = framed.shape[:2]
+        cv2.rectangle(framed, (5, 5), (width - 6, height - 6), (0, 0, 0), 3)
+        result = Recognition(preprocess=PreprocessConfig(max_area=0.5)).recognise(framed)
+        self.assertEqual(self.counts(result), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
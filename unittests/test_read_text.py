@@ -0,0 +1,52 @@
+import unittest
+import numpy
+from pic2block.benchmarks.synthetic import RESOLUTIONS, render_flowchart
+from pic2block.read_text import TextReader, assign_words, crop_regions, pack_sheets, tesseract_available
+from pic2block.recognition import Recognition
+
+
+class TestReadText(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image, _ = render_flowchart(8, size=RESOLUTIONS["720p"], labels=True)
+        self.blank, _ = render_flowchart(8, size=RESOLUTIONS["720p"])
+        self.shapes = Recognition().recognise(self.image).shapes
+
+    def test_crop_regions_drop_outline(self):
+        for crop in crop_regions(self.blank, self.shapes):
+            self.assertTrue((crop == 255).all())
+        for crop in crop_regions(self.image, self.shapes):
+            self.assertLess(crop.min(), 128)  # the label
+
+    def test_pack_sheets(self):
+        crops = [numpy.full((30 + index, 200 + 10 * index), index, numpy.uint8) for index in range(40)]
+        sheets = pack_sheets(crops, max_width=1000, max_height=400, gap=20)
+        self.assertGreater(len(sheets), 1)
+        placed = sorted(index for _, layout in sheets for index, _ in layout)
+        self.assertEqual(placed, list(range(40)))
+        for sheet, layout in sheets:
+            self.assertLessEqual(sheet.shape[1], 1000)
+            for index, (x, y, w, h) in layout:
+                self.assertTrue((sheet[y:y + h, x:x + w] == index).all())
+
+    def test_assign_words(self):
+        layout = [(0, (20, 20, 200, 100)), (1, (240, 20, 200, 100))]
+        data = {
+            "text": ["", "read", "x", "=", "42", "noise"],
+            "conf": [-1, 90, 91, 92, 93, 10],
+            "left": [0, 300, 40, 60, 80, 100],
+            "top": [0, 50, 30, 30, 60, 60],
+            "width": [0, 40, 10, 10, 20, 30],
+            "height": [0, 20, 20, 20, 20, 20],
+        }
+        self.assertEqual(assign_words(data, layout), {0: "x =\n42", 1: "read"})
+
+    @unittest.skipUnless(tesseract_available(), "needs pytesseract and the tesseract program")
+    def test_read(self):
+        with TextReader() as reader:
+            result = Recognition(text_reader=reader).recognise(self.image)
+            self.assertEqual(reader.stats()["sheets"], 1)
+        self.assertIn("Start", {shape.text for shape in result.shapes})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+import cv2
 from numpy import array
 from unittest.mock import Mock, MagicMock, patch
+from pic2block.benchmarks.synthetic import KINDS, RESOLUTIONS, render_flowchart
+from pic2block.definitions import RESIZED_SHAPES_PNG
 from pic2block.recognition import Recognition
 
 
@@ -20,7 +24,73 @@ class TestRecognition(unittest.TestCase):
 
         self.assertEqual(output_1,
                          {'c.x:0, c.y:0': {'Quadrilateral': [[[844, 234]], [[754, 287]], [[539, 286]], [[628, 233]]]}})
-        
+
+
+    def test_recognise_shape_stores_shape_record(self):
+        self.object.x, self.object.y = 691, 260
+        approx = array([[[844, 234]], [[754, 287]], [[539, 286]], [[628, 233]]])
+        self.object.recognise_shape(approx, classify=False)
+
+        shape = self.object.shapes[(691, 260)]
+        self.assertEqual(shape.kind, "Quadrilateral")
+        self.assertEqual(shape.vertices.tolist(), [[844, 234], [754, 287], [539, 286], [628, 233]])
+        self.assertEqual(shape.bbox, (539, 233, 306, 55))
+        self.assertEqual(shape.key, "c.x:691, c.y:260")
+
+    def test_iter_shapes_is_lazy(self):
+        shapes = self.object.iter_shapes(cv2.imread(RESIZED_SHAPES_PNG), chunk_size=1)
+        first = next(shapes)
+        self.assertEqual(first.id, 0)
+        self.assertEqual(len(list(shapes)), 8)
+
+    def test_recognise_can_be_reused(self):
+        image = cv2.imread(RESIZED_SHAPES_PNG)
+        first = self.object.recognise(image)
+        second = self.object.recognise(image)
+
+        self.assertEqual(first.size, (863, 303))
+        self.assertEqual(len(first.rectangles), 4)
+        self.assertEqual(len(first.diamonds), 3)
+        self.assertEqual(len(first.inputs), 2)
+        self.assertEqual(first.to_dict(), second.to_dict())
+        self.assertEqual(self.object.shapes, {})
+
+    def test_without_duplicate_suppression(self):
+        expected = self.object.recognise(RESIZED_SHAPES_PNG).to_dict()
+        for tolerance in (0, -1):
+            result = Recognition(duplicate_tolerance=tolerance).recognise(RESIZED_SHAPES_PNG)
+            self.assertEqual(result.to_dict(), expected)
+
+    def test_recognise_concurrently_from_bytes(self):
+        with open(RESIZED_SHAPES_PNG, "rb") as picture:
+            encoded = picture.read()
+        expected = self.object.recognise(RESIZED_SHAPES_PNG).to_dict()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(self.object.recognise, [encoded] * 8))
+        self.assertTrue(all(result.to_dict() == expected for result in results))
+
+    def test_synthetic_flowchart_counts(self):
+        for n_shapes, size in ((10, RESOLUTIONS["720p"]), (200, RESOLUTIONS["1080p"])):
+            image, expected = render_flowchart(n_shapes, seed=1, size=size)
+            result = self.object.recognise(image)
+            self.assertEqual(image.shape[:2], size[::-1])
+            self.assertEqual(
+                (len(result.rectangles), len(result.diamonds), len(result.inputs), len(result.start_stop)),
+                tuple(expected[kind] for kind in KINDS),
+            )
+
+    def test_start_stop_blocks_keep_their_ellipse(self):
+        image, expected = render_flowchart(10, seed=1, size=RESOLUTIONS["720p"])
+        result = self.object.recognise(image)
+
+        self.assertEqual(len(result.start_stop), expected["start_stop"])
+        for shape in result.start_stop:
+            cx, cy, width, height, _ = shape.ellipse
+            x, y, w, h = shape.bbox
+            self.assertAlmostEqual(cx, x + w / 2, delta=2)
+            self.assertAlmostEqual(cy, y + h / 2, delta=2)
+            self.assertAlmostEqual(max(width, height), w, delta=4)
+            self.assertEqual(shape.to_dict()["vertices"], [])
 
     def test_read_image(self):
         pass
@@ -0,0 +1,117 @@
+import http.client
+import json
+import threading
+import unittest
+from pic2block.definitions import RESIZED_SHAPES_PNG
+from pic2block.recognition import Recognition
+from pic2block.service import RecognitionService
+
+
+class BlockedRecognition(Recognition):
+    """Recognition which waits for release, to fill the service queue."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def recognise(self, image):
+        self.release.wait(10)
+        return super().recognise(image)
+
+
+class BrokenRecognition(Recognition):
+    """Recognition failing with an error of its own, not of the upload."""
+
+    def recognise(self, image):
+        raise ValueError("broken classifier")
+
+
+class TestService(unittest.TestCase):
+    def start(self, service: RecognitionService):
+        self.service = service
+        self.host, self.port = service.start_in_thread()
+        self.addCleanup(service.stop_thread)
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        try:
+            connection.request(method, path, body, headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def setUp(self):
+        with open(RESIZED_SHAPES_PNG, "rb") as file:
+            self.image = file.read()
+
+    def test_recognise(self):
+        self.start(RecognitionService(workers=2))
+        status, body = self.request("POST", "/recognise", self.image, {"Content-Type": "image/png"})
+        self.assertEqual(status, 200)
+        record = json.loads(body)
+        self.assertTrue(record["ok"])
+        self.assertEqual(len(record["shapes"]), 9)
+        self.assertIn("total", record["metrics"]["seconds"])
+
+        status, body = self.request("GET", "/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn("pic2block_images_total 1", body.decode())
+        self.assertIn('pic2block_http_responses_total{code="200"} 1', body.decode())
+
+    def test_multipart_upload(self):
+        self.start(RecognitionService(workers=1))
+        boundary = "pic2block-boundary"
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"shapes.png\"\r\n"
+            f"Content-Type: image/png\r\n\r\n"
+        ).encode() + self.image + f"\r\n--{boundary}--\r\n".encode()
+        status, body = self.request(
+            "POST", "/recognise", body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(body)["shapes"]), 9)
+
+    def test_errors(self):
+        self.start(RecognitionService(workers=1, max_body=1024))
+        self.assertEqual(self.request("POST", "/recognise", b"not an image")[0], 400)
+        self.assertEqual(self.request("POST", "/recognise", self.image)[0], 413)
+        self.assertEqual(self.request("GET", "/recognise")[0], 405)
+        self.assertEqual(self.request("GET", "/missing")[0], 404)
+
+    def test_internal_error(self):
+        self.start(RecognitionService(BrokenRecognition(), workers=1))
+        with self.assertLogs("pic2block", "ERROR"):
+            status, body = self.request("POST", "/recognise", self.image)
+        self.assertEqual(status, 500)
+        self.assertIn("broken classifier", json.loads(body)["error"])
+
+    def test_full_queue_is_rejected(self):
+        recognition = BlockedRecognition()
+        self.start(RecognitionService(recognition, workers=1, queue_size=1))
+        statuses = []
+        threads = [
+            threading.Thread(target=lambda: statuses.append(self.request("POST", "/recognise", self.image)[0]))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for _ in range(100):  # wait until both are accepted
+            if self.service.pending == 2:
+                break
+            threading.Event().wait(0.05)
+
+        status, _ = self.request("POST", "/recognise", self.image)
+        self.assertEqual(status, 429)
+        health = json.loads(self.request("GET", "/health")[1])
+        self.assertEqual((health["running"], health["queued"]), (1, 1))
+
+        recognition.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(self.service.rejected, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+import numpy
+from pic2block.batch import run_frames
+from pic2block.benchmarks.synthetic import render_flowchart
+from pic2block.shared_frames import FramePool, attach_frame
+
+
+class TestFramePool(unittest.TestCase):
+    def test_round_trip(self):
+        frame = numpy.arange(2 * 3 * 3, dtype=numpy.uint8).reshape(2, 3, 3)
+        with FramePool(1) as pool:
+            ref = pool.put(frame)
+            numpy.testing.assert_array_equal(attach_frame(ref), frame)
+            pool.release(ref)
+            self.assertEqual(pool.put(frame[:1]).name, ref.name)  # smaller frames reuse the buffer
+            pool.release(ref)
+            bigger = pool.put(numpy.ones((4, 4, 3), numpy.uint16))
+            self.assertNotEqual(bigger.name, ref.name)
+            self.assertEqual(attach_frame(bigger).sum(), 48)
+
+    def test_attach_from_another_program(self):
+        frame = numpy.full((8, 8), 7, numpy.uint8)
+        with FramePool(1) as pool:
+            ref = pool.put(frame)
+            process = subprocess.run(
+                [sys.executable, "-c",
+                 "import sys; from pic2block.shared_frames import FrameRef, attach_frame; "
+                 f"sys.exit(int(attach_frame(FrameRef(*{tuple(ref)!r})).sum()) != 448)"],
+                capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+            )
+            self.assertEqual(process.returncode, 0, process.stderr)
+            self.assertEqual(process.stderr, "")  # its resource tracker did not take the buffer for a leak
+            numpy.testing.assert_array_equal(attach_frame(ref), frame)
+
+
+class TestRunFrames(unittest.TestCase):
+    def test_run_frames(self):
+        frames = [render_flowchart(10, seed=seed)[0] for seed in range(3)]
+        frames.insert(1, numpy.zeros((0, 0, 3), numpy.uint8))
+        records = list(run_frames(frames, workers=2, ordered=True, slots=2))
+        self.assertEqual([record["frame"] for record in records], [0, 1, 2, 3])
+        self.assertEqual([record["ok"] for record in records], [True, False, True, True])
+        self.assertEqual([len(record.get("shapes", [])) for record in records], [10, 0, 10, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
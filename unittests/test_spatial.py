@@ -0,0 +1,49 @@
+import unittest
+from numpy import array
+from pic2block.spatial import GridIndex, suppress_near_duplicates
+
+
+class TestSuppressNearDuplicates(unittest.TestCase):
+    def test_earlier_points_win(self):
+        points = array([[2349, 887], [2044, 660], [2350, 887], [2044, 659], [1025, 251]])
+        self.assertEqual(suppress_near_duplicates(points).tolist(), [True, True, False, False, True])
+
+    def test_both_axes_must_be_close(self):
+        points = array([[100, 100], [102, 300], [300, 101]])
+        self.assertEqual(suppress_near_duplicates(points).tolist(), [True, True, True])
+
+    def test_point_next_to_dropped_one_is_kept(self):
+        points = array([[0, 0], [3, 3], [6, 6]])
+        self.assertEqual(suppress_near_duplicates(points).tolist(), [True, False, True])
+        self.assertEqual(suppress_near_duplicates(points, tolerance=10).tolist(), [True, False, False])
+
+    def test_chain(self):
+        points = array([[4 * index, 0] for index in range(1000)])
+        self.assertEqual(suppress_near_duplicates(points).tolist(), [index % 2 == 0 for index in range(1000)])
+        self.assertEqual(suppress_near_duplicates(points[::-1]).tolist(), [index % 2 == 0 for index in range(1000)])
+
+    def test_empty_input(self):
+        self.assertEqual(suppress_near_duplicates(array([])).tolist(), [])
+
+
+class TestGridIndex(unittest.TestCase):
+    def test_query(self):
+        index = GridIndex(cell_size=5)
+        index.insert(10, 10, "a")
+        index.insert(14, 6, "b")
+        index.insert(-3, 40, "c")
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(sorted(index.query(12, 8, 5)), ["a", "b"])
+        self.assertEqual(index.query(-1, 38, 5), ["c"])
+        self.assertEqual(index.query(-1, 38, 2), [])
+
+    def test_zero_cell_size(self):
+        index = GridIndex(cell_size=0)
+        index.insert(10, 10, "a")
+        self.assertEqual(index.query(10, 10, 0), [])
+        self.assertEqual(index.query(10, 10, 1), ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()